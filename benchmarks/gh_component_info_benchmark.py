@@ -0,0 +1,276 @@
+"""Benchmark get_component_info of the Grasshopper bridge on a stubbed GH object model.
+
+The bridge script targets IronPython inside Rhino, so the Rhino, Grasshopper,
+System, clr and scriptcontext modules are replaced with plain Python stubs
+before it is loaded. A wide component (many parameters, each with many wires)
+is serialized with the current single-pass implementation and with the former
+two-pass one (re-implemented below, with plain str() guid conversion), and the
+results are checked for equality before timing.
+
+Run with:
+    python benchmarks/gh_component_info_benchmark.py [--inputs 60] [--outputs 30] [--wires 20]
+"""
+import argparse
+import builtins
+import os
+import sys
+import timeit
+import types
+import uuid
+
+BRIDGE_PATH = os.path.join(os.path.dirname(__file__), "..", "rhino_scripts", "grasshopper_mcp_bridge.py")
+
+
+# --- Stub .NET / Rhino / Grasshopper modules ---
+class _StubMeta(type):
+    """Classes whose unknown attributes are further stub classes (enums, nested types, ...)"""
+
+    def __getattr__(cls, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        stub = _StubMeta(name, (_Stub,), {})
+        setattr(cls, name, stub)
+        return stub
+
+
+class _Stub(metaclass=_StubMeta):
+    def __init__(self, *args, **kwargs):
+        self.args = args
+
+
+def _stub_module(name):
+    if name in sys.modules:
+        return sys.modules[name]
+    module = types.ModuleType(name)
+
+    def __getattr__(attr):
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        stub = _StubMeta(attr, (_Stub,), {})
+        setattr(module, attr, stub)
+        return stub
+
+    module.__getattr__ = __getattr__
+    sys.modules[name] = module
+    if "." in name:
+        parent, _, child = name.rpartition(".")
+        setattr(_stub_module(parent), child, module)
+    return module
+
+
+def install_stubs():
+    for name in ("clr", "Rhino", "Rhino.Geometry", "Rhino.Display", "System", "System.Drawing",
+                 "System.Collections.Generic", "Grasshopper", "Grasshopper.Kernel",
+                 "Grasshopper.Kernel.Parameters", "Grasshopper.Kernel.Special", "Grasshopper.Kernel.Data"):
+        _stub_module(name)
+    sys.modules["clr"].AddReference = lambda *args: None
+    sys.modules["scriptcontext"] = types.SimpleNamespace(sticky={}, doc=None)
+    grasshopper = sys.modules["Grasshopper"]
+    kernel = sys.modules["Grasshopper.Kernel"]
+    kernel.IGH_Component = FakeComponent
+    kernel.IGH_Param = FakeParam
+    grasshopper.Kernel = kernel
+    # IronPython builtins the bridge relies on
+    builtins.intern = sys.intern
+    builtins.unicode = str
+
+
+def load_bridge():
+    install_stubs()
+    module = types.ModuleType("grasshopper_mcp_bridge")
+    module.__file__ = BRIDGE_PATH
+    with open(BRIDGE_PATH, encoding="utf-8-sig") as f:
+        exec(compile(f.read(), BRIDGE_PATH, "exec"), module.__dict__)
+    return module
+
+
+# --- Stub GH object model ---
+class FakeGuid(object):
+    """Stands in for System.Guid; str() is the costly interop call being counted"""
+    conversions = 0
+
+    def __init__(self):
+        self._value = uuid.uuid4()
+
+    def __str__(self):
+        FakeGuid.conversions += 1
+        return str(self._value)
+
+    def __hash__(self):
+        return hash(self._value)
+
+    def __eq__(self, other):
+        return isinstance(other, FakeGuid) and self._value == other._value
+
+
+class FakePoint(object):
+    def __init__(self, x, y):
+        self.X, self.Y = x, y
+
+
+class FakeRect(object):
+    def __init__(self, x, y, w, h):
+        self.X, self.Y, self.Width, self.Height = x, y, w, h
+
+
+class FakeAttributes(object):
+    def __init__(self, parent=None):
+        self.Bounds = FakeRect(0.0, 0.0, 50.0, 20.0)
+        self.Pivot = FakePoint(10.0, 10.0)
+        self.Parent = parent
+
+
+class FakeParam(object):
+    def __init__(self, name, parent=None):
+        self.InstanceGuid = FakeGuid()
+        self.Name = name
+        self.NickName = name
+        self.Description = "Parameter " + name
+        self.Sources = []
+        self.Recipients = []
+        self.Attributes = FakeAttributes(parent)
+        self.Access = "list"
+        self.Optional = False
+        self.TypeName = "Number"
+        self.VolatileDataCount = 3
+
+
+class FakeParams(object):
+    def __init__(self):
+        self.Input = []
+        self.Output = []
+
+
+class FakeComponent(object):
+    def __init__(self, name):
+        self.InstanceGuid = FakeGuid()
+        self.Name = name
+        self.NickName = name
+        self.Description = "Component " + name
+        self.Kind = "component"
+        self.Attributes = FakeAttributes()
+        self.Params = FakeParams()
+        self.RuntimeMessageLevel = "Blank"
+
+    def RuntimeMessages(self, level):
+        return []
+
+
+def build_wide_component(inputs, outputs, wires):
+    comp = FakeComponent("Wide")
+    for i in range(inputs):
+        p = FakeParam("in{0}".format(i), comp)
+        p.Sources = [FakeParam("src{0}_{1}".format(i, j)) for j in range(wires)]
+        comp.Params.Input.append(p)
+    for i in range(outputs):
+        p = FakeParam("out{0}".format(i), comp)
+        p.Recipients = [FakeParam("tgt{0}_{1}".format(i, j)) for j in range(wires)]
+        comp.Params.Output.append(p)
+    return comp
+
+
+# --- Former two-pass implementation ---
+def legacy_component_info(bridge, comp, is_selected=False, simplified=False):
+    """get_component_info as it was before parameters were serialized in a single pass"""
+    guid_str = str(comp.InstanceGuid)
+    nick_name = comp.NickName or comp.Name
+    aggregated_sources = set()
+    aggregated_targets = set()
+    param_guids = set()
+    pivot_pt = bridge.rg.Point3d(comp.Attributes.Pivot.X, comp.Attributes.Pivot.Y * -1, 0)
+    messages = comp.RuntimeMessages(comp.RuntimeMessageLevel)
+    runtime_messages = [str(m) for m in messages] if messages else []
+
+    for p in comp.Params.Input:
+        param_guids.add(str(p.InstanceGuid))
+        info = bridge.get_param_info(p, is_input=True, parent_instance_guid=comp.InstanceGuid, simplified=True)
+        if info: aggregated_sources.update(info.get("sources", []))
+    for p in comp.Params.Output:
+        param_guids.add(str(p.InstanceGuid))
+        info = bridge.get_param_info(p, is_input=False, parent_instance_guid=comp.InstanceGuid, simplified=True)
+        if info: aggregated_targets.update(info.get("targets", []))
+
+    final_sources = list(s for s in aggregated_sources if s != guid_str and s not in param_guids)
+    final_targets = list(t for t in aggregated_targets if t != guid_str and t not in param_guids)
+    kind = str(comp.Kind)
+
+    if simplified:
+        return {
+            "instanceGuid": guid_str, "name": comp.Name, "nickName": nick_name,
+            "description": comp.Description, "kind": kind, "pivot": pivot_pt,
+            "sources": final_sources, "targets": final_targets,
+            "isSelected": is_selected, "runtimeMessages": runtime_messages
+        }
+
+    bounds = comp.Attributes.Bounds
+    comp_info = {
+        "instanceGuid": guid_str, "name": comp.Name, "nickName": nick_name,
+        "description": comp.Description, "kind": kind,
+        "bounds": bridge.RectangleF(bounds.X, (bounds.Y * -1) - bounds.Height, bounds.Width, bounds.Height),
+        "pivot": pivot_pt, "isSelected": is_selected, "runtimeMessages": runtime_messages,
+        "Inputs": [], "Outputs": [], "sources": final_sources, "targets": final_targets,
+    }
+    for p in comp.Params.Input:
+        info = bridge.get_param_info(p, is_input=True, parent_instance_guid=comp.InstanceGuid, simplified=False)
+        if info: comp_info["Inputs"].append(info)
+    for p in comp.Params.Output:
+        info = bridge.get_param_info(p, is_input=False, parent_instance_guid=comp.InstanceGuid, simplified=False)
+        if info: comp_info["Outputs"].append(info)
+    return comp_info
+
+
+def _comparable(info):
+    """Info dict without the stub geometry objects, with wire lists order-independent"""
+    if isinstance(info, dict):
+        return dict((k, _comparable(v)) for k, v in info.items() if k not in ("pivot", "bounds"))
+    if isinstance(info, list):
+        items = [_comparable(v) for v in info]
+        return sorted(items, key=repr) if all(isinstance(v, str) for v in items) else items
+    return info
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--inputs", type=int, default=60)
+    parser.add_argument("--outputs", type=int, default=30)
+    parser.add_argument("--wires", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args()
+
+    bridge = load_bridge()
+    comp = build_wide_component(args.inputs, args.outputs, args.wires)
+    current_guid_str_of = bridge.guid_str_of
+
+    def run_legacy(simplified):
+        # The former code converted guids with str() on every use
+        bridge.guid_str_of = str
+        try:
+            return legacy_component_info(bridge, comp, simplified=simplified)
+        finally:
+            bridge.guid_str_of = current_guid_str_of
+
+    def run_current(simplified):
+        return bridge.get_component_info(comp, simplified=simplified)
+
+    print("Wide component: {0} inputs, {1} outputs, {2} wires per parameter".format(
+        args.inputs, args.outputs, args.wires))
+    for simplified in (False, True):
+        if _comparable(run_legacy(simplified)) != _comparable(run_current(simplified)):
+            raise SystemExit("Output mismatch between legacy and current (simplified={0})".format(simplified))
+
+        results = {}
+        for label, func in (("two-pass", run_legacy), ("single-pass", run_current)):
+            FakeGuid.conversions = 0
+            bridge._guid_strings.clear()
+            func(simplified)
+            conversions = FakeGuid.conversions
+            best = min(timeit.repeat(lambda: func(simplified), repeat=args.repeat, number=args.number)) / args.number
+            results[label] = best
+            print("  simplified={0!s:5} {1:11} {2:8.3f} ms/call  {3:6d} guid conversions on first call".format(
+                simplified, label, best * 1000.0, conversions))
+        print("  simplified={0!s:5} speedup {1:.2f}x".format(simplified, results["two-pass"] / results["single-pass"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,9 @@ import System
 import os
 import platform
 import subprocess
+import collections
+import hashlib
+import re
 from System import Guid, Action
 from System.Collections.Generic import List
 from System.Drawing import RectangleF
@@ -156,18 +159,32 @@ def create_gh_output_param(param_def, default_description="Output parameter"):
     return param
 
 # --- Grasshopper Object Info ---
+# Interned guid strings, shared by every info dict that mentions the same object
+GUID_STRING_CACHE_SIZE = 50000
+_guid_strings = {}
+
+def guid_str_of(guid):
+    """str(guid), computed once per guid and interned."""
+    text = _guid_strings.get(guid)
+    if text is None:
+        if len(_guid_strings) >= GUID_STRING_CACHE_SIZE:
+            _guid_strings.clear()
+        text = intern(str(guid))
+        _guid_strings[guid] = text
+    return text
+
 def get_param_info(param, is_input=True, parent_instance_guid=None, is_selected=False, simplified=False):
-    guid_str = str(param.InstanceGuid)
-    parent_guid_str = str(parent_instance_guid) if parent_instance_guid else None
+    guid_str = guid_str_of(param.InstanceGuid)
+    parent_guid_str = guid_str_of(parent_instance_guid) if parent_instance_guid else None
     nick_name = param.NickName or param.Name
     
     sources_list = []
     targets_list = []
     try:
         if hasattr(param, "Sources"):
-            sources_list = [str(src.InstanceGuid) for src in param.Sources if src]
+            sources_list = [guid_str_of(src.InstanceGuid) for src in param.Sources if src]
         if hasattr(param, "Recipients"):
-            targets_list = [str(tgt.InstanceGuid) for tgt in param.Recipients if tgt]
+            targets_list = [guid_str_of(tgt.InstanceGuid) for tgt in param.Recipients if tgt]
         
         if parent_guid_str:
             if is_input:
@@ -238,7 +255,7 @@ def get_param_info(param, is_input=True, parent_instance_guid=None, is_selected=
     return param_info
 
 def get_component_info(comp, is_selected=False, simplified=False):
-    guid_str = str(comp.InstanceGuid)
+    guid_str = guid_str_of(comp.InstanceGuid)
     nick_name = comp.NickName or comp.Name
     
     pivot_pt = {}
@@ -246,6 +263,8 @@ def get_component_info(comp, is_selected=False, simplified=False):
     aggregated_targets = set()
     runtime_messages = []
     param_guids = set()
+    inputs = []
+    outputs = []
 
     if hasattr(comp, "Attributes") and comp.Attributes:
         pivot_pt = rg.Point3d(comp.Attributes.Pivot.X, comp.Attributes.Pivot.Y * -1, 0)
@@ -255,19 +274,22 @@ def get_component_info(comp, is_selected=False, simplified=False):
         runtime_messages = [str(m) for m in messages] if messages else []
     except: pass
 
+    # One pass per param: its record feeds both the aggregate wiring and the detail lists
     if hasattr(comp, "Params"):
         if hasattr(comp.Params, "Input"):
             for p in comp.Params.Input:
-                p_guid = str(p.InstanceGuid)
-                param_guids.add(p_guid)
-                param_info_temp = get_param_info(p, is_input=True, parent_instance_guid=comp.InstanceGuid, simplified=True)
-                if param_info_temp: aggregated_sources.update(param_info_temp.get("sources", []))
+                p_info = get_param_info(p, is_input=True, parent_instance_guid=comp.InstanceGuid, simplified=simplified)
+                if not p_info: continue
+                param_guids.add(p_info["instanceGuid"])
+                aggregated_sources.update(p_info["sources"])
+                inputs.append(p_info)
         if hasattr(comp.Params, "Output"):
             for p in comp.Params.Output:
-                p_guid = str(p.InstanceGuid)
-                param_guids.add(p_guid)
-                param_info_temp = get_param_info(p, is_input=False, parent_instance_guid=comp.InstanceGuid, simplified=True)
-                if param_info_temp: aggregated_targets.update(param_info_temp.get("targets", []))
+                p_info = get_param_info(p, is_input=False, parent_instance_guid=comp.InstanceGuid, simplified=simplified)
+                if not p_info: continue
+                param_guids.add(p_info["instanceGuid"])
+                aggregated_targets.update(p_info["targets"])
+                outputs.append(p_info)
 
     final_sources = list(s for s in aggregated_sources if s != guid_str and s not in param_guids)
     final_targets = list(t for t in aggregated_targets if t != guid_str and t not in param_guids)
@@ -303,8 +325,8 @@ def get_component_info(comp, is_selected=False, simplified=False):
         "pivot": pivot_pt,
         "isSelected": is_selected,
         "runtimeMessages": runtime_messages,
-        "Inputs": [],
-        "Outputs": [],
+        "Inputs": inputs,
+        "Outputs": outputs,
         "sources": final_sources,
         "targets": final_targets,
     }
@@ -323,82 +345,693 @@ def get_component_info(comp, is_selected=False, simplified=False):
                      if path_data and len(path_data) > 0:
                         comp_info["codeReferencePath"] = str(path_data[0])
 
-    if hasattr(comp, "Params"):
-        if hasattr(comp.Params, "Input"):
-            for p in comp.Params.Input:
-                p_info = get_param_info(p, is_input=True, parent_instance_guid=comp.InstanceGuid, simplified=False)
-                if p_info: comp_info["Inputs"].append(p_info)
-        if hasattr(comp.Params, "Output"):
-            for p in comp.Params.Output:
-                p_info = get_param_info(p, is_input=False, parent_instance_guid=comp.InstanceGuid, simplified=False)
-                if p_info: comp_info["Outputs"].append(p_info)
-
     return comp_info
 
+# --- Object Info Cache ---
+CONTEXT_CACHE_KEY = "gh_mcp_context_cache"
+
+def build_object_info(obj, simplified=False):
+    """Info dict of a top-level document object, or None for objects we do not describe."""
+    if isinstance(obj, Grasshopper.Kernel.IGH_Component):
+        return get_component_info(obj, simplified=simplified)
+    elif isinstance(obj, Grasshopper.Kernel.IGH_Param):
+        parent_comp = obj.Attributes.Parent if hasattr(obj, "Attributes") and obj.Attributes else None
+        if not parent_comp:
+            return get_param_info(obj, is_input=False, parent_instance_guid=None, simplified=simplified)
+    return None
+
+def _top_level_guid(param):
+    """Guid string of the object owning a parameter on the canvas."""
+    attrs = param.Attributes if hasattr(param, "Attributes") else None
+    if attrs is not None and attrs.GetTopLevel is not None and attrs.GetTopLevel.DocObject is not None:
+        return guid_str_of(attrs.GetTopLevel.DocObject.InstanceGuid)
+    return guid_str_of(param.InstanceGuid)
+
+def build_adjacency(doc):
+    """Top-level objects of doc with the owners wired into and out of them.
+    
+    Returns a dict of guid -> (object, set of source guids, set of target guids),
+    read from Sources only without serializing anything.
+    """
+    index = {}
+    for obj in doc.Objects:
+        if not hasattr(obj, "InstanceGuid"): continue
+        if isinstance(obj, Grasshopper.Kernel.IGH_Component):
+            inputs = obj.Params.Input
+        elif isinstance(obj, Grasshopper.Kernel.IGH_Param):
+            inputs = [obj]
+        else:
+            continue
+        guid_str = str(obj.InstanceGuid)
+        entry = index.setdefault(guid_str, [None, set(), set()])
+        entry[0] = obj
+        for p in inputs:
+            for src in p.Sources:
+                src_guid = _top_level_guid(src)
+                if src_guid == guid_str: continue
+                entry[1].add(src_guid)
+                index.setdefault(src_guid, [None, set(), set()])[2].add(guid_str)
+    return dict((k, tuple(v)) for k, v in index.items() if v[0] is not None)
+
+class GHContextCache(object):
+    """Per-object info dicts of one GH document, invalidated through document and object events.
+    
+    Entries are built lazily on the server thread and dropped on the UI thread
+    when GH reports that an object was added, deleted, expired, changed or moved.
+    Dropping an entry also drops its wired neighbours since their sources/targets
+    lists mention it. Selection is applied per query, never cached.
+    """
+    
+    def __init__(self, doc):
+        self.doc = doc
+        self.document_id = str(doc.DocumentID)
+        self.entries = {}
+        self.adjacency = None
+        self.subscribed = {}
+        self.expired = set()
+        self.epoch = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.RLock()
+        # Keep the delegates so that exactly these handlers can be removed again
+        self._on_objects_added = lambda sender, e: self._invalidate_objects(e.Objects)
+        self._on_objects_deleted = lambda sender, e: self._remove_objects(e.Objects)
+        self._on_solution_end = lambda sender, e: self._solution_end()
+        self._on_object_expired = lambda sender, e: self._object_expired(sender)
+        self._on_object_changed = lambda sender, e: self.invalidate(sender)
+        doc.ObjectsAdded += self._on_objects_added
+        doc.ObjectsDeleted += self._on_objects_deleted
+        doc.SolutionEnd += self._on_solution_end
+    
+    def detach(self):
+        with self.lock:
+            try:
+                self.doc.ObjectsAdded -= self._on_objects_added
+                self.doc.ObjectsDeleted -= self._on_objects_deleted
+                self.doc.SolutionEnd -= self._on_solution_end
+            except Exception:
+                pass
+            for obj in list(self.subscribed.values()):
+                self._unsubscribe(obj)
+            self.subscribed.clear()
+            self.entries.clear()
+    
+    def _subscribe(self, obj):
+        guid_str = str(obj.InstanceGuid)
+        if guid_str in self.subscribed:
+            return
+        obj.SolutionExpired += self._on_object_expired
+        obj.ObjectChanged += self._on_object_changed
+        obj.AttributesChanged += self._on_object_changed
+        self.subscribed[guid_str] = obj
+    
+    def _unsubscribe(self, obj):
+        try:
+            obj.SolutionExpired -= self._on_object_expired
+            obj.ObjectChanged -= self._on_object_changed
+            obj.AttributesChanged -= self._on_object_changed
+        except Exception:
+            pass
+    
+    def _neighbour_guids(self, obj):
+        """Owners currently wired to obj, read live from its parameters."""
+        neighbours = set()
+        params = []
+        if isinstance(obj, Grasshopper.Kernel.IGH_Component):
+            params = list(obj.Params.Input) + list(obj.Params.Output)
+        elif isinstance(obj, Grasshopper.Kernel.IGH_Param):
+            params = [obj]
+        for p in params:
+            for src in p.Sources:
+                neighbours.add(_top_level_guid(src))
+            for tgt in p.Recipients:
+                neighbours.add(_top_level_guid(tgt))
+        return neighbours
+    
+    def _drop(self, guid_str):
+        for key in ((guid_str, False), (guid_str, True)):
+            info = self.entries.pop(key, None)
+            if info:
+                # Neighbours cached earlier still list this object (or a removed wire)
+                for other in info.get("sources", []) + info.get("targets", []):
+                    self.entries.pop((other, False), None)
+                    self.entries.pop((other, True), None)
+    
+    def invalidate(self, obj):
+        """Drop the cached info of obj and of everything wired to it."""
+        with self.lock:
+            self.epoch += 1
+            self.adjacency = None
+            guid_str = str(obj.InstanceGuid)
+            self._drop(guid_str)
+            try:
+                for other in self._neighbour_guids(obj):
+                    self._drop(other)
+            except Exception:
+                pass
+    
+    def _object_expired(self, obj):
+        self.invalidate(obj)
+        with self.lock:
+            self.expired.add(str(obj.InstanceGuid))
+    
+    def _solution_end(self):
+        # Data counts and runtime messages of expired objects are only final now.
+        # Wires may also have changed between objects that were never serialized
+        # (and so are not subscribed), so the wire index is rebuilt as well.
+        with self.lock:
+            self.epoch += 1
+            self.adjacency = None
+            for guid_str in self.expired:
+                self._drop(guid_str)
+            self.expired.clear()
+    
+    def _invalidate_objects(self, objects):
+        with self.lock:
+            self.epoch += 1
+            self.adjacency = None
+            for obj in objects:
+                self.invalidate(obj)
+    
+    def _remove_objects(self, objects):
+        with self.lock:
+            self.epoch += 1
+            self.adjacency = None
+            for obj in objects:
+                self.invalidate(obj)
+                sub = self.subscribed.pop(str(obj.InstanceGuid), None)
+                if sub is not None:
+                    self._unsubscribe(sub)
+    
+    def get(self, obj, simplified=False):
+        """Cached info of a top-level object (None for objects without info)."""
+        key = (str(obj.InstanceGuid), bool(simplified))
+        with self.lock:
+            if key in self.entries:
+                self.hits += 1
+                return self.entries[key]
+            epoch = self.epoch
+            self.misses += 1
+        
+        info = build_object_info(obj, simplified)
+        with self.lock:
+            # Only keep the entry if nothing was invalidated while it was built
+            if self.epoch == epoch:
+                self.entries[key] = info
+                self._subscribe(obj)
+        return info
+    
+    def get_adjacency(self):
+        """build_adjacency of the document, kept until the next invalidation."""
+        with self.lock:
+            if self.adjacency is not None:
+                return self.adjacency
+            epoch = self.epoch
+        
+        adjacency = build_adjacency(self.doc)
+        
+        with self.lock:
+            if self.epoch == epoch:
+                self.adjacency = adjacency
+        return adjacency
+    
+    def stats(self):
+        with self.lock:
+            return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses}
+
+def get_context_cache(doc):
+    """Cache for doc, replacing the cache of a previously active document."""
+    cache = sc.sticky.get(CONTEXT_CACHE_KEY)
+    if cache is not None and cache.document_id == str(doc.DocumentID) and cache.doc is doc:
+        return cache
+    if cache is not None:
+        cache.detach()
+    cache = GHContextCache(doc)
+    sc.sticky[CONTEXT_CACHE_KEY] = cache
+    return cache
+
+# Handlers of a cache created by a previous run of this script point at stale code
+if sc.sticky.get(CONTEXT_CACHE_KEY) is not None:
+    try:
+        sc.sticky[CONTEXT_CACHE_KEY].detach()
+    except Exception:
+        pass
+    sc.sticky[CONTEXT_CACHE_KEY] = None
+
+# --- Change Log ---
+CHANGE_LOG_KEY = "gh_mcp_change_log"
+CHANGE_LOG_SIZE = 2000
+CHANGE_LOG_MAX_RETURN = 500
+
+def _wire_snapshot(obj):
+    """Sorted (input nickName, source owner guid) pairs of a top-level object."""
+    if isinstance(obj, Grasshopper.Kernel.IGH_Component):
+        inputs = obj.Params.Input
+    elif isinstance(obj, Grasshopper.Kernel.IGH_Param):
+        inputs = [obj]
+    else:
+        return ()
+    wires = set()
+    for p in inputs:
+        nick = p.NickName if p is not obj else ""
+        for src in p.Sources:
+            wires.add((nick, _top_level_guid(src)))
+    return tuple(sorted(wires))
+
+def _message_snapshot(obj):
+    try:
+        level = obj.RuntimeMessageLevel
+        return (str(level), tuple(str(m) for m in obj.RuntimeMessages(level)))
+    except Exception:
+        return ("Blank", ())
+
+class GHChangeLog(object):
+    """Revision counter and bounded log of changes to one GH document.
+    
+    Document events record added and removed objects. Objects that expire are
+    compared against their last wire and runtime message snapshot when the
+    solution ends, so only real differences are logged. Consecutive solution
+    records are merged into one.
+    """
+    
+    def __init__(self, doc, first_revision=1):
+        self.doc = doc
+        self.document_id = str(doc.DocumentID)
+        self.first_revision = first_revision
+        self.revision = first_revision - 1
+        self.changes = collections.deque(maxlen=CHANGE_LOG_SIZE)
+        self.snapshots = {}
+        self.subscribed = {}
+        self.dirty = set()
+        self.lock = threading.RLock()
+        self._on_objects_added = lambda sender, e: self._objects_added(e.Objects)
+        self._on_objects_deleted = lambda sender, e: self._objects_deleted(e.Objects)
+        self._on_solution_end = lambda sender, e: self._solution_end(e)
+        self._on_object_expired = lambda sender, e: self._mark_dirty(sender)
+        self._on_object_changed = lambda sender, e: self._object_changed(sender, e)
+        with self.lock:
+            for obj in doc.Objects:
+                self._track(obj)
+        doc.ObjectsAdded += self._on_objects_added
+        doc.ObjectsDeleted += self._on_objects_deleted
+        doc.SolutionEnd += self._on_solution_end
+    
+    def detach(self):
+        with self.lock:
+            try:
+                self.doc.ObjectsAdded -= self._on_objects_added
+                self.doc.ObjectsDeleted -= self._on_objects_deleted
+                self.doc.SolutionEnd -= self._on_solution_end
+            except Exception:
+                pass
+            for obj in list(self.subscribed.values()):
+                self._untrack(obj)
+            self.subscribed.clear()
+    
+    def _track(self, obj):
+        if not isinstance(obj, (Grasshopper.Kernel.IGH_Component, Grasshopper.Kernel.IGH_Param)): return
+        guid_str = str(obj.InstanceGuid)
+        if guid_str in self.subscribed: return
+        obj.SolutionExpired += self._on_object_expired
+        obj.ObjectChanged += self._on_object_changed
+        self.subscribed[guid_str] = obj
+        self.snapshots[guid_str] = (_wire_snapshot(obj), _message_snapshot(obj))
+    
+    def _untrack(self, obj):
+        try:
+            obj.SolutionExpired -= self._on_object_expired
+            obj.ObjectChanged -= self._on_object_changed
+        except Exception:
+            pass
+    
+    def _record(self, change):
+        self.revision += 1
+        change["rev"] = self.revision
+        self.changes.append(change)
+    
+    def _objects_added(self, objects):
+        with self.lock:
+            for obj in objects:
+                if not hasattr(obj, "InstanceGuid"): continue
+                self._track(obj)
+                self._record({"type": "added", "guid": str(obj.InstanceGuid),
+                              "name": obj.Name, "nickName": obj.NickName})
+    
+    def _objects_deleted(self, objects):
+        with self.lock:
+            for obj in objects:
+                if not hasattr(obj, "InstanceGuid"): continue
+                guid_str = str(obj.InstanceGuid)
+                sub = self.subscribed.pop(guid_str, None)
+                if sub is not None:
+                    self._untrack(sub)
+                self.snapshots.pop(guid_str, None)
+                self.dirty.discard(guid_str)
+                self._record({"type": "removed", "guid": guid_str, "name": obj.Name})
+    
+    def _mark_dirty(self, obj):
+        with self.lock:
+            self.dirty.add(str(obj.InstanceGuid))
+    
+    def _object_changed(self, obj, e):
+        what = str(e.Type) if hasattr(e, "Type") else "Unknown"
+        with self.lock:
+            self.dirty.add(str(obj.InstanceGuid))
+            last = self.changes[-1] if self.changes else None
+            if last and last["type"] == "changed" and last["guid"] == str(obj.InstanceGuid) and last["what"] == what:
+                return
+            self._record({"type": "changed", "guid": str(obj.InstanceGuid), "what": what,
+                          "nickName": obj.NickName})
+    
+    def _solution_end(self, e):
+        with self.lock:
+            for guid_str in self.dirty:
+                obj = self.subscribed.get(guid_str)
+                if obj is None: continue
+                wires, messages = _wire_snapshot(obj), _message_snapshot(obj)
+                old_wires, old_messages = self.snapshots.get(guid_str, ((), ("Blank", ())))
+                if wires != old_wires:
+                    self._record({"type": "wires", "guid": guid_str,
+                                  "added": [list(w) for w in wires if w not in old_wires],
+                                  "removed": [list(w) for w in old_wires if w not in wires]})
+                if messages != old_messages:
+                    self._record({"type": "messages", "guid": guid_str,
+                                  "level": messages[0], "messages": list(messages[1])})
+                self.snapshots[guid_str] = (wires, messages)
+            self.dirty.clear()
+            
+            duration_ms = None
+            try: duration_ms = round(e.Duration.TotalMilliseconds, 1)
+            except Exception: pass
+            last = self.changes[-1] if self.changes else None
+            count = 1
+            if last and last["type"] == "solution":
+                # Merge consecutive solutions (e.g. while a slider is dragged)
+                self.changes.pop()
+                count = last["count"] + 1
+            self._record({"type": "solution", "duration_ms": duration_ms, "count": count})
+    
+    def get_changes(self, since=None, limit=CHANGE_LOG_MAX_RETURN):
+        """Changes after revision since.
+        
+        Without since only the current revision is returned. "complete" is False
+        when changes after since were already dropped from the log (or belong to
+        another document); the caller should then re-read the whole context.
+        """
+        with self.lock:
+            result = {"revision": self.revision, "document_id": self.document_id}
+            if since is None:
+                result["changes"] = []
+                result["complete"] = True
+                return result
+            since = int(since)
+            oldest = self.changes[0]["rev"] if self.changes else self.revision + 1
+            result["complete"] = since >= self.first_revision - 1 and since >= oldest - 1
+            changes = [dict(c) for c in self.changes if c["rev"] > since]
+            if len(changes) > limit:
+                changes = changes[:limit]
+                # Continue from the last returned change
+                result["revision"] = changes[-1]["rev"]
+                result["truncated"] = True
+            result["changes"] = changes
+            return result
+
+def get_change_log(doc):
+    """Change log of doc; revisions keep counting up when the document switches."""
+    log = sc.sticky.get(CHANGE_LOG_KEY)
+    if log is not None and log.document_id == str(doc.DocumentID) and log.doc is doc:
+        return log
+    first_revision = 1
+    if log is not None:
+        log.detach()
+        first_revision = log.revision + 1
+    log = GHChangeLog(doc, first_revision)
+    sc.sticky[CHANGE_LOG_KEY] = log
+    return log
+
+if sc.sticky.get(CHANGE_LOG_KEY) is not None:
+    try:
+        sc.sticky[CHANGE_LOG_KEY].detach()
+    except Exception:
+        pass
+    sc.sticky[CHANGE_LOG_KEY] = None
+
 # --- Document Traversal ---
 def get_all_relevant_objects_info(doc, selected_guids_set=None, simplified=False):
     graph = {}
     if selected_guids_set is None: selected_guids_set = set()
+    cache = get_context_cache(doc)
     for obj in doc.Objects:
         if not hasattr(obj, "InstanceGuid"): continue
+        info = cache.get(obj, simplified)
+        if not info: continue
         guid_str = str(obj.InstanceGuid)
-        is_selected = guid_str in selected_guids_set
-        info = None
-        if isinstance(obj, Grasshopper.Kernel.IGH_Component):
-            info = get_component_info(obj, is_selected=is_selected, simplified=simplified)
-        elif isinstance(obj, Grasshopper.Kernel.IGH_Param):
-            parent_comp = obj.Attributes.Parent if hasattr(obj, "Attributes") and obj.Attributes else None
-            if not parent_comp:
-                info = get_param_info(obj, is_input=False, parent_instance_guid=None, is_selected=is_selected, simplified=simplified)
-        if info: graph[guid_str] = info
+        # Copy so that per-query selection never leaks into the cache
+        info = dict(info)
+        info["isSelected"] = guid_str in selected_guids_set
+        graph[guid_str] = info
     return graph
 
 def get_objects_with_context(target_guids, context_depth=0, simplified=False):
     doc = get_active_gh_doc()
     if not doc: return {}
-    target_guids_set = set(str(g) for g in target_guids)
-    all_objects_info = get_all_relevant_objects_info(doc, selected_guids_set=target_guids_set, simplified=simplified)
+    cache = get_context_cache(doc)
+    adjacency = cache.get_adjacency()
     
-    result_graph = {}
     guids_to_include = set()
-
-    for guid_str in target_guids_set:
-        if guid_str in all_objects_info:
+    for guid_str in set(str(g) for g in target_guids):
+        if guid_str in adjacency:
             guids_to_include.add(guid_str)
         else:
             # Try finding if it's a child param
-            obj = doc.FindObject(Guid.Parse(guid_str), True)
+            try:
+                obj = doc.FindObject(Guid.Parse(guid_str), True)
+            except Exception:
+                obj = None
             if obj and isinstance(obj, IGH_Param):
-                parent = obj.Attributes.Parent
-                if parent and str(parent.InstanceGuid) in all_objects_info:
-                    p_guid = str(parent.InstanceGuid)
+                p_guid = _top_level_guid(obj)
+                if p_guid in adjacency:
                     guids_to_include.add(p_guid)
-                    if not all_objects_info[p_guid]['isSelected']: all_objects_info[p_guid]['isSelected'] = True
+    selected = set(guids_to_include)
 
+    # Breadth-first walk over the wire index, serializing only what is reached
     if context_depth > 0 and guids_to_include:
         max_depth = min(int(context_depth), 3)
         current_level = set(guids_to_include)
-        visited = set(guids_to_include)
         for _ in range(max_depth):
             next_level = set()
             for guid in current_level:
-                if guid not in all_objects_info: continue
-                node = all_objects_info[guid]
-                neighbors = set(node.get("sources", [])) | set(node.get("targets", []))
-                for n_guid in neighbors:
-                    if n_guid in all_objects_info and n_guid not in visited:
+                _, sources, targets = adjacency[guid]
+                for n_guid in sources | targets:
+                    if n_guid in adjacency and n_guid not in guids_to_include:
                         next_level.add(n_guid)
-                        visited.add(n_guid)
                         guids_to_include.add(n_guid)
             if not next_level: break
             current_level = next_level
 
+    result_graph = {}
     for guid in guids_to_include:
-        if guid in all_objects_info:
-            result_graph[guid] = all_objects_info[guid]
+        info = cache.get(adjacency[guid][0], simplified)
+        if not info: continue
+        info = dict(info)
+        info["isSelected"] = guid in selected
+        result_graph[guid] = info
     return result_graph
 
+# --- Compact Encoding ---
+def encode_compact(graph):
+    """Encode an object graph as a compact table.
+    
+    Every guid appears once in "guids"; objects and edges refer to guids by
+    their index. Wires become [source_id, target_id] pairs between objects and
+    input parameters list their sources as [owner_id, output nickName]. Empty
+    fields, bounds and descriptions are left out.
+    """
+    ids = {}
+    guids = []
+    def gid(guid_str):
+        index = ids.get(guid_str)
+        if index is None:
+            index = ids[guid_str] = len(guids)
+            guids.append(guid_str)
+        return index
+    
+    # Component parameter guid -> (owner guid, nickName) so wires resolve to objects
+    owners = {}
+    for guid_str, info in graph.items():
+        for p_info in info.get("Inputs", []) + info.get("Outputs", []):
+            owners[p_info["instanceGuid"]] = (guid_str, p_info.get("nickName"))
+    def owner_id(param_guid):
+        return gid(owners[param_guid][0] if param_guid in owners else param_guid)
+    
+    objects = []
+    edges = set()
+    for guid_str in sorted(graph):
+        info = graph[guid_str]
+        entry = {"id": gid(guid_str), "name": info.get("name")}
+        if info.get("nickName") and info.get("nickName") != info.get("name"):
+            entry["nickName"] = info["nickName"]
+        if info.get("kind") and info.get("kind") != "component":
+            entry["kind"] = info["kind"]
+        pivot = info.get("pivot")
+        if isinstance(pivot, rg.Point3d):
+            entry["pivot"] = [int(round(pivot.X)), int(round(pivot.Y))]
+        if info.get("isSelected"):
+            entry["selected"] = True
+        if info.get("runtimeMessages"):
+            entry["messages"] = info["runtimeMessages"]
+        for key in ("slider", "panelContent", "Code", "codeReferencePath"):
+            if info.get(key):
+                entry[key] = info[key]
+        if "dataCount" in info and info["dataCount"]:
+            entry["count"] = info["dataCount"]
+        
+        for key, name in (("Inputs", "in"), ("Outputs", "out")):
+            params = []
+            for p_info in info.get(key, []):
+                p_entry = {"name": p_info.get("nickName")}
+                if p_info.get("dataType"):
+                    p_entry["type"] = p_info["dataType"]
+                if p_info.get("dataCount"):
+                    p_entry["count"] = p_info["dataCount"]
+                if key == "Inputs":
+                    sources = []
+                    for src in p_info.get("sources", []):
+                        if src == guid_str: continue
+                        if src in owners:
+                            sources.append([gid(owners[src][0]), owners[src][1]])
+                        else:
+                            sources.append([gid(src)])
+                    if sources:
+                        p_entry["from"] = sources
+                params.append(p_entry)
+            if params:
+                entry[name] = params
+        objects.append(entry)
+        
+        for src in info.get("sources", []):
+            edges.add((owner_id(src), entry["id"]))
+        for tgt in info.get("targets", []):
+            edges.add((entry["id"], owner_id(tgt)))
+    edges = set(edge for edge in edges if edge[0] != edge[1])
+    
+    return {
+        "format": "compact",
+        "guids": guids,
+        "objects": objects,
+        "edges": [list(edge) for edge in sorted(edges)]
+    }
+
+def encode_graph(graph, fmt):
+    return encode_compact(graph) if fmt == "compact" else graph
+
 # --- Operations ---
+# Edits within this window are solved together
+SOLVE_DEBOUNCE_MS = 100
+
+def schedule_solution(doc, *objects):
+    """Expire objects without solving and let GH solve once for a burst of edits."""
+    for obj in objects:
+        obj.ExpireSolution(False)
+    doc.ScheduleSolution(SOLVE_DEBOUNCE_MS)
+
+def _solve_now_ui(expire_all=False):
+    doc = get_active_gh_doc()
+    if not doc: return {"status": "error", "result": "No active document"}
+    if not doc.Enabled: return {"status": "error", "result": "The solver is disabled"}
+    start = time.time()
+    doc.NewSolution(bool(expire_all))
+    errors = warnings = 0
+    for obj in doc.Objects:
+        level = getattr(obj, "RuntimeMessageLevel", None)
+        if level == GH_RuntimeMessageLevel.Error: errors += 1
+        elif level == GH_RuntimeMessageLevel.Warning: warnings += 1
+    return {"status": "success", "result": {
+        "duration_ms": round((time.time() - start) * 1000.0, 1),
+        "errors": errors,
+        "warnings": warnings
+    }}
+
+def _profile_solution_ui(top=20):
+    """Recompute everything and rank components by ProcessorTime.
+    
+    Cumulative time is the object's own time plus the slowest upstream chain
+    feeding it; the chain behind the largest cumulative time is the critical path.
+    """
+    doc = get_active_gh_doc()
+    if not doc: return {"status": "error", "result": "No active document"}
+    if not doc.Enabled: return {"status": "error", "result": "The solver is disabled"}
+    
+    start = time.time()
+    doc.NewSolution(True)
+    wall_ms = (time.time() - start) * 1000.0
+    
+    # Read the wires fresh; this pass visits every object anyway
+    adjacency = build_adjacency(doc)
+    own = {}
+    records = {}
+    for guid_str, (obj, sources, targets) in adjacency.items():
+        try: ms = obj.ProcessorTime.TotalMilliseconds
+        except Exception: ms = 0.0
+        if isinstance(obj, Grasshopper.Kernel.IGH_Component):
+            data_count = sum(p.VolatileDataCount for p in obj.Params.Output)
+        else:
+            data_count = obj.VolatileDataCount
+        own[guid_str] = ms
+        records[guid_str] = {
+            "guid": guid_str,
+            "name": obj.Name,
+            "nickName": obj.NickName,
+            "ms": round(ms, 3),
+            "data_count": data_count,
+            "level": str(obj.RuntimeMessageLevel)
+        }
+        messages = _runtime_messages(obj)
+        if messages: records[guid_str]["messages"] = messages[:3]
+    
+    # Longest upstream chain per object, in topological order (Kahn) over the wire index
+    pending = dict((g, len([src for src in entry[1] if src in adjacency])) for g, entry in adjacency.items())
+    ready = [g for g, count in pending.items() if count == 0]
+    cumulative = {}
+    best_source = {}
+    while ready:
+        guid_str = ready.pop()
+        upstream = [(cumulative[src], src) for src in adjacency[guid_str][1] if src in cumulative]
+        longest = max(upstream) if upstream else (0.0, None)
+        cumulative[guid_str] = own[guid_str] + longest[0]
+        best_source[guid_str] = longest[1]
+        for tgt in adjacency[guid_str][2]:
+            if tgt in pending:
+                pending[tgt] -= 1
+                if pending[tgt] == 0: ready.append(tgt)
+    
+    total_ms = sum(own.values())
+    for guid_str, record in records.items():
+        record["cumulative_ms"] = round(cumulative.get(guid_str, 0.0), 3)
+        record["percent"] = round(100.0 * own[guid_str] / total_ms, 1) if total_ms else 0.0
+    
+    hotspots = sorted(records.values(), key=lambda r: -r["ms"])[:top]
+    critical = []
+    if cumulative:
+        guid_str = max(cumulative, key=lambda g: cumulative[g])
+        while guid_str is not None:
+            critical.append({"guid": guid_str, "name": records[guid_str]["name"], "ms": records[guid_str]["ms"]})
+            guid_str = best_source.get(guid_str)
+        critical.reverse()
+    
+    return {"status": "success", "result": {
+        "solve_wall_ms": round(wall_ms, 1),
+        "total_processor_ms": round(total_ms, 3),
+        "object_count": len(records),
+        "errors": sum(1 for r in records.values() if r["level"] == "Error"),
+        "warnings": sum(1 for r in records.values() if r["level"] == "Warning"),
+        "hotspots": hotspots,
+        "critical_path": {
+            "ms": round(max(cumulative.values()), 3) if cumulative else 0.0,
+            "chain": critical
+        }
+    }}
+
 def expire_grasshopper_component(doc, instance_guid_str):
     if not doc: return {"status": "error", "result": "No document"}
     try:
@@ -495,7 +1128,7 @@ def _update_script_component_on_ui_thread(instance_guid_str, code, description,
                     out_p.AddVolatileData(Grasshopper.Kernel.Data.GH_Path(0), 0, str(message_to_user))
 
             if hasattr(comp, "Attributes"): comp.Attributes.ExpireLayout()
-            comp.ExpireSolution(True)
+            schedule_solution(doc, comp)
             return {"status": "success", "result": "Updated successfully"}
 
         except Exception as e:
@@ -598,7 +1231,7 @@ def _update_code_ref_ui(instance_guid_str, file_path, param_definitions, descrip
                     code_param.AddVolatileData(Grasshopper.Kernel.Data.GH_Path(0), 0, str(file_path))
             
             if hasattr(comp, "Attributes"): comp.Attributes.ExpireLayout()
-            comp.ExpireSolution(True)
+            schedule_solution(doc, comp)
             return {"status": "success", "result": "Updated Ref"}
             
         finally:
@@ -616,35 +1249,174 @@ def update_script_with_code_reference(instance_guid, **kwargs):
 
 # --- Extended Tool Helper Functions ---
 
+# --- Component Index ---
+_TOKEN_SPLIT = re.compile(r"[^0-9a-z]+")
+
+def _tokens(text):
+    return set(t for t in _TOKEN_SPLIT.split(text.lower()) if t)
+
+def _trigrams(text):
+    text = " " + text.lower() + " "
+    return set(text[i:i + 3] for i in range(len(text) - 2))
+
+class ComponentIndex(object):
+    """Lookup maps and a token/trigram index over ComponentServer.ObjectProxies.
+    
+    Built once and rebuilt when the number of proxies changes (a plugin was
+    loaded). Exact and case-insensitive name/nickname lookups are dict hits,
+    searches only score the candidates sharing a token or trigram with the query.
+    """
+    
+    def __init__(self, proxies):
+        self.count = proxies.Count
+        self.records = []
+        self.by_name = {}
+        self.by_name_lower = {}
+        self.by_nick = {}
+        self.by_nick_lower = {}
+        self.name_tokens = {}
+        self.desc_tokens = {}
+        self.trigrams = {}
+        for proxy in proxies:
+            desc = proxy.Desc
+            if not desc: continue
+            index = len(self.records)
+            name, nick = desc.Name or "", desc.NickName or ""
+            description = desc.Description or ""
+            record = {
+                "proxy": proxy,
+                "name": name,
+                "nickname": nick,
+                "description": description,
+                "category": desc.Category,
+                "subcategory": desc.SubCategory,
+                "name_lower": name.lower(),
+                "nick_lower": nick.lower(),
+                "desc_lower": description.lower(),
+                "tokens": _tokens(name) | _tokens(nick) | _tokens(desc.Category or "") | _tokens(desc.SubCategory or ""),
+                "desc_tokens": _tokens(description),
+                "name_trigrams": _trigrams(name),
+            }
+            self.records.append(record)
+            # First proxy wins, as with the linear scans this replaces
+            self.by_name.setdefault(name, proxy)
+            self.by_name_lower.setdefault(record["name_lower"], proxy)
+            self.by_nick.setdefault(nick, proxy)
+            self.by_nick_lower.setdefault(record["nick_lower"], proxy)
+            for token in record["tokens"]:
+                self.name_tokens.setdefault(token, set()).add(index)
+            for token in record["desc_tokens"]:
+                self.desc_tokens.setdefault(token, set()).add(index)
+            for gram in record["name_trigrams"] | _trigrams(nick):
+                self.trigrams.setdefault(gram, set()).add(index)
+    
+    def find(self, name):
+        """Proxy by exact name, name ignoring case, exact nickname, nickname ignoring case."""
+        lower = name.lower()
+        for table, key in ((self.by_name, name), (self.by_name_lower, lower),
+                           (self.by_nick, name), (self.by_nick_lower, lower)):
+            proxy = table.get(key)
+            if proxy is not None:
+                return proxy
+        return None
+    
+    def _score(self, record, q, q_tokens, q_grams):
+        score = 0.0
+        if record["name_lower"] == q: score += 100
+        elif record["nick_lower"] == q: score += 90
+        elif record["name_lower"].startswith(q): score += 60
+        elif q in record["name_lower"]: score += 40
+        elif q in record["nick_lower"]: score += 35
+        elif q in record["desc_lower"]: score += 10
+        for token in q_tokens:
+            if token in record["tokens"]: score += 20
+            elif token in record["desc_tokens"]: score += 5
+        if q_grams:
+            grams = record["name_trigrams"]
+            score += 30.0 * len(q_grams & grams) / len(q_grams | grams)
+        return score
+    
+    def search(self, query, limit=10):
+        """Records ranked by relevance to query, best first."""
+        q = (query or "").strip().lower()
+        if not q: return []
+        q_tokens = _tokens(q)
+        q_grams = _trigrams(q)
+        candidates = set()
+        for token in q_tokens:
+            candidates |= self.name_tokens.get(token, set())
+            candidates |= self.desc_tokens.get(token, set())
+        for gram in q_grams:
+            candidates |= self.trigrams.get(gram, set())
+        scored = []
+        for index in candidates:
+            score = self._score(self.records[index], q, q_tokens, q_grams)
+            if score >= 10:
+                scored.append((-score, self.records[index]["name"], index))
+        scored.sort()
+        return [(self.records[index], -neg) for neg, _, index in scored[:limit]]
+
+_component_index = None
+_component_index_lock = threading.Lock()
+
+def get_component_index():
+    """Component index, rebuilt when plugins added proxies since it was built."""
+    global _component_index
+    proxies = Grasshopper.Instances.ComponentServer.ObjectProxies
+    with _component_index_lock:
+        if _component_index is None or _component_index.count != proxies.Count:
+            _component_index = ComponentIndex(proxies)
+        return _component_index
+
 def find_component_proxy(name):
     """Find a component proxy by name or nickname."""
-    proxies = Grasshopper.Instances.ComponentServer.ObjectProxies
-    # 1. Exact Name match
-    for proxy in proxies:
-        if proxy.Desc.Name == name: return proxy
-    # 2. Case-insensitive Name match
-    for proxy in proxies:
-        if proxy.Desc.Name.lower() == name.lower(): return proxy
-    # 3. Exact NickName match
-    for proxy in proxies:
-        if proxy.Desc.NickName == name: return proxy
-    # 4. Case-insensitive NickName match
-    for proxy in proxies:
-        if proxy.Desc.NickName.lower() == name.lower(): return proxy
-    # 5. Partial match (if unique?) - maybe too risky
+    return get_component_index().find(name)
+
+def resolve_output_param(obj, param=None):
+    """Output parameter of obj by name/nickname or index, defaulting to the first."""
+    if isinstance(obj, Grasshopper.Kernel.IGH_Param):
+        return obj
+    if not isinstance(obj, Grasshopper.Kernel.IGH_Component):
+        return None
+    if param:
+        for p in obj.Params.Output:
+            if p.Name == param or p.NickName == param:
+                return p
+    if str(param).isdigit():
+        idx = int(param)
+        if idx < obj.Params.Output.Count:
+            return obj.Params.Output[idx]
+    if obj.Params.Output.Count > 0:
+        return obj.Params.Output[0]
     return None
 
-def _create_component_ui(name, x, y):
-    doc = get_active_gh_doc()
-    if not doc: return {"status": "error", "result": "No active document"}
-    
+def resolve_input_param(obj, param=None, default_first=True):
+    """Input parameter of obj by name/nickname or index, optionally defaulting to the first."""
+    if isinstance(obj, Grasshopper.Kernel.IGH_Param):
+        return obj
+    if not isinstance(obj, Grasshopper.Kernel.IGH_Component):
+        return None
+    if param:
+        for p in obj.Params.Input:
+            if p.Name == param or p.NickName == param:
+                return p
+    if str(param).isdigit():
+        idx = int(param)
+        if idx < obj.Params.Input.Count:
+            return obj.Params.Input[idx]
+    if default_first and obj.Params.Input.Count > 0:
+        return obj.Params.Input[0]
+    return None
+
+def instantiate_component(doc, name, x, y):
+    """Create a component by name and add it to doc without solving. Returns (obj, error)."""
     proxy = find_component_proxy(name)
     if not proxy:
-        return {"status": "error", "result": "Component '{}' not found".format(name)}
+        return None, "Component '{}' not found".format(name)
     
     obj = proxy.CreateInstance()
     if not obj:
-        return {"status": "error", "result": "Failed to create instance of '{}'".format(name)}
+        return None, "Failed to create instance of '{}'".format(name)
     
     # Ensure attributes exist (fixes NoneType error for objects like Sliders)
     if obj.Attributes is None:
@@ -655,10 +1427,19 @@ def _create_component_ui(name, x, y):
     
     # Auto-layout if it has params (optional, usually GH does this)
     obj.Attributes.ExpireLayout()
+    return obj, None
+
+def _create_component_ui(name, x, y):
+    doc = get_active_gh_doc()
+    if not doc: return {"status": "error", "result": "No active document"}
+    
+    obj, error = instantiate_component(doc, name, x, y)
+    if error:
+        return {"status": "error", "result": error}
     
     return {"status": "success", "result": get_component_info(obj) if isinstance(obj, Grasshopper.Kernel.IGH_Component) else get_param_info(obj, is_input=False)}
 
-def _connect_components_ui(source_id, source_param, target_id, target_param):
+def _connect_components_ui(source_id, source_param, target_id, target_param, solve=False):
     doc = get_active_gh_doc()
     if not doc: return {"status": "error", "result": "No active document"}
     
@@ -669,66 +1450,32 @@ def _connect_components_ui(source_id, source_param, target_id, target_param):
         if not source_obj: return {"status": "error", "result": "Source object not found: " + str(source_id)}
         if not target_obj: return {"status": "error", "result": "Target object not found: " + str(target_id)}
         
-        # Resolve Source Param (Output)
-        src_p = None
-        if isinstance(source_obj, Grasshopper.Kernel.IGH_Param):
-            src_p = source_obj
-        elif isinstance(source_obj, Grasshopper.Kernel.IGH_Component):
-            # Try by name/nickname
-            if source_param:
-                for p in source_obj.Params.Output:
-                    if p.Name == source_param or p.NickName == source_param:
-                        src_p = p
-                        break
-            # Try by index
-            if not src_p and str(source_param).isdigit():
-                idx = int(source_param)
-                if idx < source_obj.Params.Output.Count:
-                    src_p = source_obj.Params.Output[idx]
-            # Default to first
-            if not src_p and source_obj.Params.Output.Count > 0:
-                src_p = source_obj.Params.Output[0]
-        
+        src_p = resolve_output_param(source_obj, source_param)
         if not src_p: return {"status": "error", "result": "Source parameter not found"}
 
-        # Resolve Target Param (Input)
-        tgt_p = None
-        if isinstance(target_obj, Grasshopper.Kernel.IGH_Param):
-            tgt_p = target_obj
-        elif isinstance(target_obj, Grasshopper.Kernel.IGH_Component):
-            if target_param:
-                for p in target_obj.Params.Input:
-                    if p.Name == target_param or p.NickName == target_param:
-                        tgt_p = p
-                        break
-            if not tgt_p and str(target_param).isdigit():
-                idx = int(target_param)
-                if idx < target_obj.Params.Input.Count:
-                    tgt_p = target_obj.Params.Input[idx]
-            if not tgt_p and target_obj.Params.Input.Count > 0:
-                tgt_p = target_obj.Params.Input[0]
-        
+        tgt_p = resolve_input_param(target_obj, target_param)
         if not tgt_p: return {"status": "error", "result": "Target parameter not found"}
         
         # Connect
         tgt_p.AddSource(src_p)
-        source_obj.ExpireSolution(True)
-        target_obj.ExpireSolution(True)
+        if solve:
+            target_obj.ExpireSolution(False)
+            doc.NewSolution(False)
+        else:
+            schedule_solution(doc, target_obj)
         
-        # Check for runtime messages on target object after connection
-        runtime_messages = []
-        try:
-            if hasattr(target_obj, "RuntimeMessages") and hasattr(target_obj, "RuntimeMessageLevel"):
-                messages = target_obj.RuntimeMessages(target_obj.RuntimeMessageLevel)
-                runtime_messages = [str(m) for m in messages] if messages else []
-        except:
-            pass
-
-        return {
-            "status": "success", 
-            "result": "Connected", 
-            "target_runtime_messages": runtime_messages
-        }
+        response = {"status": "success", "result": "Connected", "solved": bool(solve)}
+        # Messages read before the scheduled solution ran would describe the old state
+        if solve:
+            runtime_messages = []
+            try:
+                if hasattr(target_obj, "RuntimeMessages") and hasattr(target_obj, "RuntimeMessageLevel"):
+                    messages = target_obj.RuntimeMessages(target_obj.RuntimeMessageLevel)
+                    runtime_messages = [str(m) for m in messages] if messages else []
+            except:
+                pass
+            response["target_runtime_messages"] = runtime_messages
+        return response
         
     except Exception as e:
         return {"status": "error", "result": str(e)}
@@ -739,20 +1486,7 @@ def _disconnect_components_ui(target_id, target_param, source_id=None):
         target_obj = doc.FindObject(Guid.Parse(target_id), False)
         if not target_obj: return {"status": "error", "result": "Target object not found"}
 
-        tgt_p = None
-        if isinstance(target_obj, Grasshopper.Kernel.IGH_Param):
-            tgt_p = target_obj
-        elif isinstance(target_obj, Grasshopper.Kernel.IGH_Component):
-            if target_param:
-                for p in target_obj.Params.Input:
-                    if p.Name == target_param or p.NickName == target_param:
-                        tgt_p = p
-                        break
-            if not tgt_p and str(target_param).isdigit():
-                idx = int(target_param)
-                if idx < target_obj.Params.Input.Count:
-                    tgt_p = target_obj.Params.Input[idx]
-
+        tgt_p = resolve_input_param(target_obj, target_param, default_first=False)
         if not tgt_p: return {"status": "error", "result": "Target parameter not found"}
 
         if source_id:
@@ -777,52 +1511,58 @@ def _disconnect_components_ui(target_id, target_param, source_id=None):
             # Disconnect all
             tgt_p.RemoveAllSources()
 
-        tgt_p.ExpireSolution(True)
+        schedule_solution(doc, tgt_p)
         return {"status": "success", "result": "Disconnected"}
 
     except Exception as e:
         return {"status": "error", "result": str(e)}
 
+def apply_component_value(obj, value):
+    """Set the value of a slider, panel or toggle without expiring it. Returns an error or None."""
+    if isinstance(obj, Grasshopper.Kernel.Special.GH_NumberSlider):
+        # Check if value is a dict or a JSON string representing a dict
+        props = None
+        if isinstance(value, dict):
+            props = value
+        elif isinstance(value, (str, unicode)):
+            try:
+                props = json.loads(value)
+                if not isinstance(props, dict): props = None
+            except:
+                pass
+        
+        if props:
+            # Advanced update: { "value": 10, "min": 0, "max": 100, "decimals": 0 }
+            s = obj.Slider
+            if "min" in props: s.Minimum = System.Decimal(float(props["min"]))
+            if "max" in props: s.Maximum = System.Decimal(float(props["max"]))
+            if "decimals" in props: s.DecimalPlaces = int(props["decimals"])
+            if "value" in props: obj.SetSliderValue(System.Decimal(float(props["value"])))
+        else:
+            obj.SetSliderValue(System.Decimal(float(value)))
+    elif isinstance(obj, Grasshopper.Kernel.Special.GH_Panel):
+        obj.SetUserText(str(value))
+    elif isinstance(obj, Grasshopper.Kernel.Special.GH_BooleanToggle):
+        # Handle string "True"/"False" or bool
+        val = value
+        if isinstance(val, (str, unicode)):
+            val = val.lower() == "true"
+        obj.Value = bool(val)
+    else:
+        return "Setting value not supported for this type: " + str(type(obj))
+    return None
+
 def _set_component_value_ui(instance_guid, value):
     doc = get_active_gh_doc()
     try:
         obj = doc.FindObject(Guid.Parse(instance_guid), False)
         if not obj: return {"status": "error", "result": "Object not found"}
 
-        if isinstance(obj, Grasshopper.Kernel.Special.GH_NumberSlider):
-            # Check if value is a dict or a JSON string representing a dict
-            props = None
-            if isinstance(value, dict):
-                props = value
-            elif isinstance(value, (str, unicode)):
-                try:
-                    import json
-                    props = json.loads(value)
-                    if not isinstance(props, dict): props = None
-                except:
-                    pass
-            
-            if props:
-                # Advanced update: { "value": 10, "min": 0, "max": 100, "decimals": 0 }
-                s = obj.Slider
-                if "min" in props: s.Minimum = System.Decimal(float(props["min"]))
-                if "max" in props: s.Maximum = System.Decimal(float(props["max"]))
-                if "decimals" in props: s.DecimalPlaces = int(props["decimals"])
-                if "value" in props: obj.SetSliderValue(System.Decimal(float(props["value"])))
-            else:
-                obj.SetSliderValue(System.Decimal(float(value)))
-        elif isinstance(obj, Grasshopper.Kernel.Special.GH_Panel):
-            obj.SetUserText(str(value))
-        elif isinstance(obj, Grasshopper.Kernel.Special.GH_BooleanToggle):
-            # Handle string "True"/"False" or bool
-            val = value
-            if isinstance(val, (str, unicode)):
-                val = val.lower() == "true"
-            obj.Value = bool(val)
-        else:
-            return {"status": "error", "result": "Setting value not supported for this type: " + str(type(obj))}
+        error = apply_component_value(obj, value)
+        if error:
+            return {"status": "error", "result": error}
             
-        obj.ExpireSolution(True)
+        schedule_solution(doc, obj)
         return {"status": "success", "result": "Value updated"}
     except Exception as e:
         return {"status": "error", "result": str(e)}
@@ -874,11 +1614,115 @@ def _set_component_state_ui(instance_guid, preview, enabled, locked, wire_displa
             elif wd == "faint": obj.Attributes.WireDisplay = Grasshopper.GUI.Canvas.GH_WireDisplay.faint
             else: obj.Attributes.WireDisplay = Grasshopper.GUI.Canvas.GH_WireDisplay.default
             
-        obj.ExpireSolution(True)
+        schedule_solution(doc, obj)
         return {"status": "success", "result": "State updated"}
     except Exception as e:
         return {"status": "error", "result": str(e)}
 
+def _runtime_messages(obj):
+    try:
+        level = obj.RuntimeMessageLevel
+        if level == GH_RuntimeMessageLevel.Blank: return []
+        return [str(m) for m in obj.RuntimeMessages(level)]
+    except Exception:
+        return []
+
+def _build_graph_ui(components, connections, values, solve=True):
+    """Create components, wires and values in one UI action with a single solution.
+    
+    components: [{"alias"|"id", "name"|"type", "x", "y", "value"|"settings"}]
+    connections: [{"source", "sourceParam", "target", "targetParam"}]; source and
+        target are aliases or GUIDs of existing objects
+    values: [{"target", "value"}]
+    
+    On any error the created objects and added wires are removed again. Values
+    already applied to pre-existing objects are not restored.
+    """
+    doc = get_active_gh_doc()
+    if not doc: return {"status": "error", "result": "No active document"}
+    
+    aliases = {}
+    created = []
+    wires = []
+    touched = []
+    was_enabled = doc.Enabled
+    
+    def resolve(ref):
+        if ref in aliases: return aliases[ref]
+        try:
+            obj = doc.FindObject(Guid.Parse(str(ref)), False)
+        except Exception:
+            obj = None
+        if obj is None:
+            raise ValueError("Unknown alias or GUID: {}".format(ref))
+        return obj
+    
+    try:
+        # Keep the solver quiet until everything is in place
+        doc.Enabled = False
+        for i, spec in enumerate(components or []):
+            name = spec.get("name") or spec.get("type")
+            alias = spec.get("alias") or spec.get("id") or "{}_{}".format(name, i)
+            if alias in aliases:
+                raise ValueError("Duplicate alias: {}".format(alias))
+            obj, error = instantiate_component(doc, name, spec.get("x", 100 + 150 * i), spec.get("y", 100))
+            if error:
+                raise ValueError("Component {}: {}".format(alias, error))
+            created.append((alias, spec, obj))
+            aliases[alias] = obj
+            if spec.get("nickName"):
+                obj.NickName = spec["nickName"]
+        
+        for conn in connections or []:
+            source_obj, target_obj = resolve(conn.get("source")), resolve(conn.get("target"))
+            src_p = resolve_output_param(source_obj, conn.get("sourceParam"))
+            tgt_p = resolve_input_param(target_obj, conn.get("targetParam"))
+            if not src_p or not tgt_p:
+                raise ValueError("Parameter not found for connection {} -> {}".format(conn.get("source"), conn.get("target")))
+            tgt_p.AddSource(src_p)
+            wires.append((tgt_p, src_p))
+            touched.append(target_obj)
+        
+        value_specs = [{"target": alias, "value": spec.get("value", spec.get("settings"))}
+                       for alias, spec, _ in created
+                       if spec.get("value", spec.get("settings")) is not None]
+        for spec in value_specs + list(values or []):
+            obj = resolve(spec.get("target"))
+            error = apply_component_value(obj, spec.get("value"))
+            if error:
+                raise ValueError("Value for {}: {}".format(spec.get("target"), error))
+            touched.append(obj)
+    except Exception as e:
+        for tgt_p, src_p in reversed(wires):
+            try: tgt_p.RemoveSource(src_p)
+            except Exception: pass
+        for _, _, obj in created:
+            doc.RemoveObject(obj, False)
+        doc.Enabled = was_enabled
+        return {"status": "error", "result": "build_graph rolled back: {}".format(e)}
+    
+    doc.Enabled = was_enabled
+    for obj in [c[2] for c in created] + touched:
+        obj.ExpireSolution(False)
+    if solve and was_enabled:
+        doc.NewSolution(False)
+    
+    solved = bool(solve and was_enabled)
+    result = {
+        "aliases": dict((alias, str(obj.InstanceGuid)) for alias, obj in aliases.items()),
+        "created": len(created),
+        "connected": len(wires),
+        "solved": solved
+    }
+    # Without a solution the messages would still describe the state before the edit
+    if solved:
+        messages = {}
+        for alias, obj in aliases.items():
+            msgs = _runtime_messages(obj)
+            if msgs: messages[alias] = msgs
+        result["runtime_messages"] = messages
+    return {"status": "success", "result": result}
+
 def _create_group_ui(component_ids, group_name):
     doc = get_active_gh_doc()
     try:
@@ -969,37 +1813,112 @@ def get_gh_canvas_stats():
         "object_count": doc.ObjectCount,
         "selected_count": doc.SelectedCount,
         "file_name": doc.DisplayName,
-        "document_id": str(doc.DocumentID)
+        "document_id": str(doc.DocumentID),
+        "context_cache": get_context_cache(doc).stats()
     }}
 
 def search_gh_components(query, limit=10):
     try:
-        proxies = Grasshopper.Instances.ComponentServer.ObjectProxies
         results = []
-        q = query.lower()
-        count = 0
-        for proxy in proxies:
-            if not proxy.Desc: continue
-            if q in proxy.Desc.Name.lower() or q in proxy.Desc.NickName.lower() or q in proxy.Desc.Description.lower():
-                results.append({
-                    "name": proxy.Desc.Name,
-                    "nickname": proxy.Desc.NickName,
-                    "description": proxy.Desc.Description,
-                    "category": proxy.Desc.Category,
-                    "guid": str(proxy.Guid)
-                })
-                count += 1
-                if count >= limit: break
+        for record, score in get_component_index().search(query, limit):
+            results.append({
+                "name": record["name"],
+                "nickname": record["nickname"],
+                "description": record["description"],
+                "category": record["category"],
+                "guid": str(record["proxy"].Guid),
+                "score": round(score, 1)
+            })
         return results
     except Exception as e:
         return []
 
+# --- Component Catalog ---
+CATALOG_PAGE_SIZE = 500
+# Components instantiated per signature request (each one blocks the UI thread briefly)
+SIGNATURE_BATCH_SIZE = 25
+
+def get_catalog_fingerprint():
+    """Hash of the Rhino/GH versions and loaded libraries; changes when plugins change."""
+    server = Grasshopper.Instances.ComponentServer
+    parts = [str(Rhino.RhinoApp.Version),
+             str(clr.GetClrType(Grasshopper.Instances).Assembly.GetName().Version),
+             str(server.ObjectProxies.Count)]
+    libraries = []
+    for lib in server.Libraries:
+        try: libraries.append("{0}:{1}".format(lib.Id, lib.Version))
+        except Exception: pass
+    parts.extend(sorted(libraries))
+    return hashlib.sha1("|".join(parts)).hexdigest()
+
+def _param_signature(param):
+    return {
+        "name": param.Name,
+        "nickName": param.NickName,
+        "type": str(param.TypeName),
+        "access": get_access_string(param.Access),
+        "optional": bool(param.Optional)
+    }
+
+def get_component_catalog(offset=0, limit=CATALOG_PAGE_SIZE):
+    """One page of the component catalog, read from the proxy descriptions only.
+    
+    Nothing is instantiated, so pages are cheap and safe off the UI thread;
+    parameter signatures are fetched separately for the components a client
+    actually needs (see _get_component_signatures_ui).
+    """
+    records = get_component_index().records
+    offset, limit = max(0, int(offset)), max(1, min(int(limit), CATALOG_PAGE_SIZE))
+    components = []
+    for record in records[offset:offset + limit]:
+        proxy = record["proxy"]
+        components.append({
+            "guid": str(proxy.Guid),
+            "name": record["name"],
+            "nickname": record["nickname"],
+            "description": record["description"],
+            "category": record["category"],
+            "subcategory": record["subcategory"],
+            "obsolete": bool(proxy.Obsolete)
+        })
+    return {
+        "fingerprint": get_catalog_fingerprint(),
+        "total": len(records),
+        "offset": offset,
+        "components": components
+    }
+
+def _get_component_signatures_ui(guids):
+    """Parameter signatures of a few components by proxy guid.
+    
+    Each one needs a throwaway instance, created on the UI thread, so the
+    batch is capped at SIGNATURE_BATCH_SIZE to keep the canvas responsive.
+    Components that cannot be instantiated get empty signatures.
+    """
+    server = Grasshopper.Instances.ComponentServer
+    signatures = {}
+    for guid in (guids or [])[:SIGNATURE_BATCH_SIZE]:
+        entry = {"inputs": [], "outputs": []}
+        try:
+            proxy = server.EmitObjectProxy(System.Guid(str(guid)))
+            instance = proxy.CreateInstance() if proxy else None
+            if isinstance(instance, Grasshopper.Kernel.IGH_Component):
+                entry["inputs"] = [_param_signature(p) for p in instance.Params.Input]
+                entry["outputs"] = [_param_signature(p) for p in instance.Params.Output]
+            elif isinstance(instance, IGH_Param):
+                entry["outputs"] = [_param_signature(instance)]
+        except Exception:
+            pass
+        signatures[str(guid)] = entry
+    return {"status": "success", "result": signatures}
+
 # --- Command Processing ---
 def process_command(cmd):
     ctype = cmd.get("type")
     
     # --- Helper to run UI action ---
     def run_ui(func, *args, **kwargs):
+        timeout = kwargs.pop("_ui_timeout", 5.0)
         res_container = {}
         # Wait event for synchronization
         evt = threading.Event()
@@ -1014,8 +1933,8 @@ def process_command(cmd):
                 
         Rhino.RhinoApp.InvokeOnUiThread(Action(_action))
         
-        # Wait for UI thread to complete (timeout 5s)
-        if not evt.wait(5.0):
+        # Wait for UI thread to complete (timeout 5s unless the command needs longer)
+        if not evt.wait(timeout):
              return {"status": "error", "result": "UI action timed out"}
              
         return res_container.get("val", {"status": "error", "result": "UI call failed"})
@@ -1026,7 +1945,15 @@ def process_command(cmd):
     elif ctype == "get_context":
         doc = get_active_gh_doc()
         if not doc: return {"status": "error", "result": "No Active Document"}
-        return {"status": "success", "result": get_all_relevant_objects_info(doc, simplified=cmd.get("simplified", False))}
+        # Start logging changes once an agent has seen the document
+        get_change_log(doc)
+        return {"status": "success", "result": encode_graph(get_all_relevant_objects_info(doc, simplified=cmd.get("simplified", False)), cmd.get("format"))}
+    
+    elif ctype == "get_changes":
+        doc = get_active_gh_doc()
+        if not doc: return {"status": "error", "result": "No Active Document"}
+        limit = int(cmd.get("limit") or CHANGE_LOG_MAX_RETURN)
+        return {"status": "success", "result": get_change_log(doc).get_changes(cmd.get("since"), limit)}
     
     elif ctype == "expire_component":
         doc = get_active_gh_doc()
@@ -1035,13 +1962,13 @@ def process_command(cmd):
         return run_ui(_exp) # expire needs UI thread? Safe to do so.
         
     elif ctype == "get_objects":
-        return {"status": "success", "result": get_objects_with_context(cmd.get("instance_guids", []), cmd.get("context_depth", 0), cmd.get("simplified", False))}
+        return {"status": "success", "result": encode_graph(get_objects_with_context(cmd.get("instance_guids", []), cmd.get("context_depth", 0), cmd.get("simplified", False)), cmd.get("format"))}
         
     elif ctype == "get_selected":
         doc = get_active_gh_doc()
         if not doc: return {"status": "error", "result": "No Doc"}
         selected = [str(o.InstanceGuid) for o in doc.Objects if o.Attributes.Selected]
-        return {"status": "success", "result": get_objects_with_context(selected, cmd.get("context_depth", 0), cmd.get("simplified", False))}
+        return {"status": "success", "result": encode_graph(get_objects_with_context(selected, cmd.get("context_depth", 0), cmd.get("simplified", False)), cmd.get("format"))}
         
     elif ctype == "update_script":
         return update_script_component(**cmd)
@@ -1061,8 +1988,19 @@ def process_command(cmd):
     elif ctype == "create_component":
         return run_ui(_create_component_ui, cmd.get("name"), cmd.get("x", 0), cmd.get("y", 0))
         
+    elif ctype == "build_graph":
+        return run_ui(_build_graph_ui, cmd.get("components", []), cmd.get("connections", []), cmd.get("values", []),
+                      cmd.get("solve", True), _ui_timeout=float(cmd.get("timeout", 25)))
+        
     elif ctype == "connect_components":
-        return run_ui(_connect_components_ui, cmd.get("source_id"), cmd.get("source_param"), cmd.get("target_id"), cmd.get("target_param"))
+        return run_ui(_connect_components_ui, cmd.get("source_id"), cmd.get("source_param"), cmd.get("target_id"), cmd.get("target_param"),
+                      cmd.get("solve", False), _ui_timeout=25.0 if cmd.get("solve") else 5.0)
+    
+    elif ctype == "profile_solution":
+        return run_ui(_profile_solution_ui, int(cmd.get("top", 20)), _ui_timeout=float(cmd.get("timeout", 25)))
+    
+    elif ctype == "solve_now":
+        return run_ui(_solve_now_ui, cmd.get("expire_all", False), _ui_timeout=float(cmd.get("timeout", 25)))
         
     elif ctype == "disconnect_components":
         return run_ui(_disconnect_components_ui, cmd.get("target_id"), cmd.get("target_param"), cmd.get("source_id"))
@@ -1095,6 +2033,16 @@ def process_command(cmd):
         # I need to implement search_gh_components helper in the block above
         return {"status": "success", "result": search_gh_components(cmd.get("query"), cmd.get("limit", 10))}
 
+    elif ctype == "get_catalog_fingerprint":
+        return {"status": "success", "result": {"fingerprint": get_catalog_fingerprint(),
+                                                "total": len(get_component_index().records)}}
+    
+    elif ctype == "get_component_catalog":
+        return {"status": "success", "result": get_component_catalog(cmd.get("offset", 0), cmd.get("limit", CATALOG_PAGE_SIZE))}
+    
+    elif ctype == "get_component_signatures":
+        return run_ui(_get_component_signatures_ui, cmd.get("guids", []))
+
     elif ctype == "get_server_status":
         is_headless = False
         try:
@@ -1267,6 +2215,10 @@ def server_loop():
         server.listen(5)
         server.setblocking(0)
         Rhino.RhinoApp.WriteLine(get_message('server_started', HOST, PORT))
+        try:
+            get_component_index()
+        except Exception as e:
+            Rhino.RhinoApp.WriteLine("[MCP] Component index not built: {}".format(e))
         
         while sc.sticky["gh_mcp_run_server"]:
             try:
@@ -18,6 +18,11 @@ import traceback
 import sys
 import base64
 import subprocess
+import math
+import array
+import types
+import hashlib
+from collections import OrderedDict
 from System.Drawing import Bitmap
 from System.Drawing.Imaging import ImageFormat
 from System.IO import MemoryStream
@@ -31,6 +36,58 @@ LANGUAGE = 'ja'  # 'en' for English, 'ja' for Japanese
 # Add constant for annotation layer
 ANNOTATION_LAYER = "MCP_Annotations"
 
+# Standard capture views: camera direction (target -> camera), camera up, perspective projection
+STANDARD_VIEWS = {
+    "top": ((0, 0, 1), (0, 1, 0), False),
+    "bottom": ((0, 0, -1), (0, 1, 0), False),
+    "right": ((1, 0, 0), (0, 0, 1), False),
+    "left": ((-1, 0, 0), (0, 0, 1), False),
+    "front": ((0, -1, 0), (0, 0, 1), False),
+    "back": ((0, 1, 0), (0, 0, 1), False),
+    # 右斜め手前上空から45度で見下ろすアングル (Right-Front-Top)
+    "perspective": ((1, -1, 1.4142), (0, 0, 1), True),
+}
+PERSPECTIVE_LENS_LENGTH = 50.0
+CAPTURE_PADDING = 1.05
+# Longest side of float32 depth captures, which read the Z-buffer one pixel per call
+DEPTH_FLOAT_MAX_SIZE = 512
+
+# Helper module preinstalled into the namespace of every execute_code call
+EXEC_HELPER_MODULE = "rhino_mcp_helpers"
+# Number of compiled code objects kept for repeated snippets
+CODE_CACHE_SIZE = 128
+
+# Variable export limits for execute_code (serialized JSON sizes)
+EXPORT_MAX_VALUE_BYTES = 16 * 1024
+EXPORT_MAX_TOTAL_BYTES = 256 * 1024
+EXPORT_MAX_ITEMS = 10000
+EXPORT_MAX_DEPTH = 4
+
+# Seconds a background execution waits for a commit() step on the UI thread
+COMMIT_TIMEOUT = 60.0
+
+# Job table limits: output kept per job and finished jobs kept for status queries
+JOB_OUTPUT_MAX_CHARS = 256 * 1024
+JOB_MAX_FINISHED = 50
+
+# Job commands answered straight from the client thread, never waiting for the UI
+JOB_COMMANDS = ("submit_job", "get_job_status", "get_job_output", "cancel_job")
+
+# Printed output kept per execution and the minimum interval between streamed stdout frames
+EXEC_STDOUT_MAX_CHARS = 64 * 1024
+STDOUT_FRAME_INTERVAL = 0.25
+
+# Upper bound on worker threads used by parallel_map()
+PARALLEL_MAX_WORKERS = max(1, System.Environment.ProcessorCount)
+
+# Longest message written to the command line and log file
+LOG_MAX_CHARS = 2000
+
+# Named execution sessions: idle lifetime, count limit and estimated memory budget
+SESSION_TTL = 1800
+SESSION_MAX_COUNT = 16
+SESSION_MAX_BYTES = 256 * 1024 * 1024
+
 MESSAGES = {
     'en': {
         'zombie_killed_socket': "[Rhino MCP] Detected zombie process (Headless Server) on port {0}. Stopped it successfully. Retrying bind...",
@@ -101,6 +158,9 @@ def get_log_dir():
 
 def log_message(message):
     """Log a message to both Rhino's command line and log file"""
+    if len(message) > LOG_MAX_CHARS:
+        message = message[:LOG_MAX_CHARS] + "... [{0} more chars]".format(len(message) - LOG_MAX_CHARS)
+    
     # Print to Rhino's command line
     Rhino.RhinoApp.WriteLine(message)
     
@@ -130,6 +190,251 @@ def log_message(message):
     except Exception as e:
         Rhino.RhinoApp.WriteLine("Failed to write to log file: {0}".format(str(e)))
 
+class _ImageCollector(object):
+    """Collects captured images, or streams each one as a frame when emit is set"""
+
+    def __init__(self, total, emit=None):
+        self.total = total
+        self.emit = emit
+        self.images = []
+        self.count = 0
+
+    def add(self, image):
+        if self.emit:
+            self.emit({
+                "type": "frame",
+                "index": self.count,
+                "total": self.total,
+                "image": image
+            })
+        else:
+            self.images.append(image)
+        self.count += 1
+
+    def response(self):
+        response = {
+            "type": "multi_image",
+            "images": self.images
+        }
+        if self.emit:
+            response["streamed"] = self.count
+        return response
+
+class _DocTransaction(object):
+    """Runs a block of document edits with redraw off, as a single undo record.
+    
+    Document changes are counted through RhinoDoc events so that a rollback only
+    calls Undo when the transaction actually changed something.
+    """
+    
+    def __init__(self, doc, description):
+        self.doc = doc
+        self.description = description
+        self.undo_record = 0
+        self.changes = 0
+        self.state = "pending"
+        self.redraw_was_enabled = True
+    
+    def _on_change(self, sender, e):
+        self.changes += 1
+    
+    def _subscribe(self, attach):
+        events = (Rhino.RhinoDoc.AddRhinoObject, Rhino.RhinoDoc.DeleteRhinoObject,
+                  Rhino.RhinoDoc.ReplaceRhinoObject, Rhino.RhinoDoc.ModifyObjectAttributes)
+        for event in events:
+            if attach:
+                event += self._on_change
+            else:
+                event -= self._on_change
+    
+    def begin(self):
+        self.redraw_was_enabled = self.doc.Views.RedrawEnabled
+        self.doc.Views.RedrawEnabled = False
+        self._subscribe(True)
+        self.undo_record = self.doc.BeginUndoRecord(self.description)
+        self.state = "open"
+    
+    def _close(self):
+        if self.undo_record:
+            self.doc.EndUndoRecord(self.undo_record)
+        self._subscribe(False)
+    
+    def _restore_redraw(self):
+        self.doc.Views.RedrawEnabled = self.redraw_was_enabled
+        self.doc.Views.Redraw()
+    
+    def commit(self):
+        if self.state != "open":
+            return
+        try:
+            self._close()
+        finally:
+            self.state = "committed"
+            self._restore_redraw()
+    
+    def rollback(self):
+        if self.state != "open":
+            return
+        try:
+            self._close()
+            if self.changes and self.undo_record:
+                self.doc.Undo()
+        finally:
+            self.state = "rolled_back"
+            self._restore_redraw()
+    
+    def info(self):
+        return {"state": self.state, "undo_record": self.undo_record, "changes": self.changes}
+
+class JobCancelled(Exception):
+    """Raised by check_cancel() inside a job that has been cancelled"""
+    pass
+
+class ParallelMapError(Exception):
+    """Raised by parallel_map() when items failed, keeping every failure and the partial results"""
+    
+    def __init__(self, errors, results):
+        index, first = errors[0]
+        Exception.__init__(self, "{0} of {1} item(s) failed, first at index {2}: {3}: {4}".format(
+            len(errors), len(results), index, type(first).__name__, str(first)))
+        self.errors = errors
+        self.results = results
+
+class _OutputBuffer(object):
+    """Bounded text buffer addressed by absolute offsets.
+    
+    Readers pass the offset they have seen so far; text that was dropped to stay
+    within max_chars is reported instead of silently skipped.
+    """
+    
+    def __init__(self, max_chars):
+        self.max_chars = max_chars
+        self.text = ""
+        self.start = 0
+        self.lock = threading.Lock()
+    
+    def write(self, text):
+        with self.lock:
+            self.text += text
+            overflow = len(self.text) - self.max_chars
+            if overflow > 0:
+                self.text = self.text[overflow:]
+                self.start += overflow
+    
+    def end(self):
+        with self.lock:
+            return self.start + len(self.text)
+    
+    def read(self, since=0):
+        """Return (text, next_offset, dropped_chars) for everything after since"""
+        with self.lock:
+            since = max(0, since)
+            dropped = max(0, self.start - since)
+            begin = max(since, self.start) - self.start
+            return self.text[begin:], self.start + len(self.text), dropped
+
+class _ThreadRoutedStdout(object):
+    """sys.stdout replacement that sends each thread's prints to its registered buffer"""
+    
+    def __init__(self, original):
+        self.original = original
+        self.buffers = {}
+    
+    def register(self, buffer):
+        """Route this thread's prints to buffer, returning the buffer it replaces"""
+        ident = threading.current_thread().ident
+        previous = self.buffers.get(ident)
+        self.buffers[ident] = buffer
+        return previous
+    
+    def unregister(self, previous=None):
+        """Stop routing this thread's prints, restoring the previous buffer if any"""
+        ident = threading.current_thread().ident
+        if previous is not None:
+            self.buffers[ident] = previous
+        else:
+            self.buffers.pop(ident, None)
+    
+    def write(self, text):
+        buffer = self.buffers.get(threading.current_thread().ident)
+        if buffer is not None:
+            buffer.write(text)
+        elif self.original is not None:
+            self.original.write(text)
+    
+    def flush(self):
+        if self.original is not None and hasattr(self.original, "flush"):
+            self.original.flush()
+
+class _ExecutionOutput(_OutputBuffer):
+    """Output buffer of a single execution.
+    
+    Text is also passed to the enclosing buffer (a job's output) and, for
+    streaming clients, sent as stdout frames at most every STDOUT_FRAME_INTERVAL.
+    """
+    
+    def __init__(self, max_chars, emit=None, parent=None):
+        _OutputBuffer.__init__(self, max_chars)
+        self.emit = emit
+        self.parent = parent
+        self.sent = 0
+        self.last_emit = 0.0
+        # Worker threads of parallel_map may write (and flush) concurrently
+        self.emit_lock = threading.Lock()
+    
+    def write(self, text):
+        _OutputBuffer.write(self, text)
+        if self.parent is not None:
+            self.parent.write(text)
+        if self.emit is not None and time.time() - self.last_emit >= STDOUT_FRAME_INTERVAL:
+            self.flush_frames()
+    
+    def flush_frames(self):
+        """Send everything written since the last frame"""
+        if self.emit is None:
+            return
+        with self.emit_lock:
+            text, end, dropped = self.read(self.sent)
+            if not text:
+                return
+            self.emit({"type": "frame", "kind": "stdout", "offset": self.sent + dropped, "text": text})
+            self.sent = end
+            self.last_emit = time.time()
+
+class _Job(object):
+    """A long-running execute_code call tracked in the job table"""
+    
+    def __init__(self, job_id, params):
+        self.id = job_id
+        self.params = params
+        self.mode = params.get("mode") or "background"
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.progress = None
+        self.progress_message = None
+        self.response = None
+        self.output = _OutputBuffer(JOB_OUTPUT_MAX_CHARS)
+        self.cancel_event = threading.Event()
+    
+    def info(self):
+        now = time.time()
+        info = {
+            "job_id": self.id,
+            "status": self.status,
+            "mode": self.mode,
+            "created_at": self.created_at,
+            "elapsed": round((self.finished_at or now) - (self.started_at or now), 2),
+            "progress": self.progress,
+            "progress_message": self.progress_message,
+            "output_chars": self.output.end(),
+            "cancel_requested": self.cancel_event.is_set()
+        }
+        if self.response is not None:
+            info["response"] = self.response
+        return info
+
 class RhinoMCPServer:
     def __init__(self, host='localhost', port=9876):
         self.host = host
@@ -137,6 +442,16 @@ class RhinoMCPServer:
         self.running = False
         self.socket = None
         self.server_thread = None
+        self._exec_globals = None
+        self._code_cache = OrderedDict()
+        self._code_cache_lock = threading.Lock()
+        self._sessions = OrderedDict()
+        self._sessions_lock = threading.RLock()
+        self._functions = {}
+        self._jobs = OrderedDict()
+        self._jobs_lock = threading.Lock()
+        self._job_context = threading.local()
+        self._stdout_router = None
     
     def start(self):
         if self.running:
@@ -318,6 +633,12 @@ class RhinoMCPServer:
 
         self.running = False
         
+        # Ask running jobs to stop and give prints back to Rhino
+        with self._jobs_lock:
+            for job in self._jobs.values():
+                job.cancel_event.set()
+        self._uninstall_stdout_router()
+        
         # Close socket
         if self.socket:
             try:
@@ -375,11 +696,19 @@ class RhinoMCPServer:
                     if cmd_type != "get_server_status":
                         log_message("[Rhino MCP] コマンド受信: {0}".format(cmd_type))
                     
+                    # Streaming clients read newline-delimited JSON frames followed by the final response
+                    stream = bool((command.get("params") or {}).get("stream"))
+                    
+                    def emit(frame):
+                        client.sendall((json.dumps(frame) + "\n").encode('utf-8'))
+                    
                     # Create a closure to capture the client connection
                     def execute_wrapper():
                         try:
-                            response = self.execute_command(command)
+                            response = self.execute_command(command, emit if stream else None)
                             response_json = json.dumps(response)
+                            if stream:
+                                response_json += "\n"
                             # Split large responses into chunks if needed
                             chunk_size = 14485760  # 10MB chunks
                             response_bytes = response_json.encode('utf-8')
@@ -395,12 +724,18 @@ class RhinoMCPServer:
                                 "message": str(e)
                             }
                             try:
-                                client.sendall(json.dumps(error_response).encode('utf-8'))
+                                client.sendall((json.dumps(error_response) + ("\n" if stream else "")).encode('utf-8'))
                             except Exception as e:
                                 log_message("[Rhino MCP] Failed to send error response: {0}".format(str(e)))
                                 return False  # Signal connection should be closed
                         return True  # Signal connection should stay open
                     
+                    # Background executions and job queries run right here on the client thread, keeping the UI free
+                    if cmd_type in JOB_COMMANDS or (cmd_type == "execute_code" and (command.get("params") or {}).get("mode") == "background"):
+                        if not execute_wrapper():
+                            break
+                        continue
+                    
                     # Use RhinoApp.Idle event for IronPython 2.7 compatibility
                     def idle_handler(sender, e):
                         if not execute_wrapper():
@@ -435,8 +770,11 @@ class RhinoMCPServer:
             except:
                 pass
     
-    def execute_command(self, command):
-        """Execute a command received from the client"""
+    def execute_command(self, command, emit=None):
+        """Execute a command received from the client.
+
+        emit, when given, sends an intermediate frame to a streaming client.
+        """
         try:
             command_type = command.get("type")
             params = command.get("params", {})
@@ -471,11 +809,31 @@ class RhinoMCPServer:
             elif command_type == "get_layers":
                 return self._get_layers()
             elif command_type == "execute_code":
-                return self._execute_code(params)
+                return self._execute_code(params, emit)
+            elif command_type == "submit_job":
+                return self._submit_job(params)
+            elif command_type == "get_job_status":
+                return self._get_job_status(params)
+            elif command_type == "get_job_output":
+                return self._get_job_output(params)
+            elif command_type == "cancel_job":
+                return self._cancel_job(params)
+            elif command_type == "register_function":
+                return self._register_function(params)
+            elif command_type == "call_function":
+                return self._call_function(params)
+            elif command_type == "create_session":
+                return self._create_session(params)
+            elif command_type == "list_sessions":
+                return self._list_sessions()
+            elif command_type == "drop_session":
+                return self._drop_session(params)
             elif command_type == "get_objects_with_metadata":
                 return self._get_objects_with_metadata(params)
             elif command_type == "capture_viewport":
-                return self._capture_viewport(params)
+                return self._capture_viewport(params, emit)
+            elif command_type == "capture_depth":
+                return self._capture_depth(params)
             elif command_type == "add_metadata":
                 return self._add_object_metadata(
                     params.get("object_id"), 
@@ -613,8 +971,132 @@ class RhinoMCPServer:
         except Exception as e:
             return {"status": "error", "message": str(e)}
     
-    def _execute_code(self, params):
-        """Execute arbitrary Python code"""
+    def _get_exec_globals(self):
+        """Install the helper module once and return the shared exec namespace"""
+        if self._exec_globals is None:
+            helpers = types.ModuleType(EXEC_HELPER_MODULE)
+            helpers.__dict__.update({
+                "rs": rs,
+                "sc": sc,
+                "json": json,
+                "time": time,
+                "datetime": datetime,
+                "add_object_metadata": self._add_object_metadata,
+                "commit": self._run_on_ui_thread,
+                "check_cancel": self._check_cancel,
+                "job_progress": self._job_progress,
+                "JobCancelled": JobCancelled,
+                "parallel_map": self._parallel_map,
+                "ParallelMapError": ParallelMapError
+            })
+            sys.modules[EXEC_HELPER_MODULE] = helpers
+            
+            namespace = dict(globals())
+            namespace.update((k, v) for k, v in helpers.__dict__.items() if not k.startswith('__'))
+            self._exec_globals = namespace
+        return self._exec_globals
+    
+    def _run_on_ui_thread(self, func, *args, **kwargs):
+        """Run func on the UI thread and return its result (exposed to code as commit()).
+        
+        Background executions use this for the steps that touch the document.
+        On the UI thread itself func is simply called.
+        """
+        if not Rhino.RhinoApp.InvokeRequired:
+            return func(*args, **kwargs)
+        
+        done = threading.Event()
+        outcome = {}
+        
+        def action():
+            try:
+                outcome["value"] = func(*args, **kwargs)
+            except Exception as e:
+                outcome["error"] = e
+            finally:
+                done.set()
+        
+        Rhino.RhinoApp.InvokeOnUiThread(System.Action(action))
+        if not done.wait(COMMIT_TIMEOUT):
+            raise RuntimeError("Timed out after {0}s waiting for the UI thread".format(COMMIT_TIMEOUT))
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome.get("value")
+    
+    def _parallel_map(self, func, items, max_workers=None):
+        """Apply func to every item on .NET worker threads (exposed to code as parallel_map).
+        
+        Results keep the order of items. Failures do not stop the other items; they
+        are raised together as ParallelMapError afterwards. func must only use
+        thread-safe calls (RhinoCommon geometry), never the document or the UI.
+        Inside a job, remaining items are skipped once the job is cancelled.
+        """
+        items = list(items)
+        count = len(items)
+        results = [None] * count
+        errors = [None] * count
+        if not count:
+            return results
+        
+        job = getattr(self._job_context, "job", None)
+        workers = min(max_workers or PARALLEL_MAX_WORKERS, PARALLEL_MAX_WORKERS, count)
+        # Prints on worker threads go to the caller's output like its own prints
+        router = self._stdout_router
+        output = router.buffers.get(threading.current_thread().ident) if router is not None else None
+        
+        def body(index):
+            if job is not None and job.cancel_event.is_set():
+                return
+            previous = router.register(output) if output is not None else None
+            try:
+                results[index] = func(items[index])
+            except Exception as e:
+                errors[index] = e
+            finally:
+                if output is not None:
+                    router.unregister(previous)
+        
+        if workers <= 1:
+            for index in range(count):
+                body(index)
+        else:
+            options = System.Threading.Tasks.ParallelOptions()
+            options.MaxDegreeOfParallelism = workers
+            System.Threading.Tasks.Parallel.For(0, count, options, System.Action[int](body))
+        
+        self._check_cancel()
+        failed = [(index, error) for index, error in enumerate(errors) if error is not None]
+        if failed:
+            raise ParallelMapError(failed, results)
+        return results
+    
+    def _compile_code(self, code):
+        """Compile code, reusing cached code objects keyed by content hash"""
+        if isinstance(code, unicode):
+            key = hashlib.sha1(code.encode('utf-8')).hexdigest()
+        else:
+            key = hashlib.sha1(code).hexdigest()
+        
+        with self._code_cache_lock:
+            compiled = self._code_cache.pop(key, None)
+            if compiled is not None:
+                # Re-insert to mark as most recently used
+                self._code_cache[key] = compiled
+                return compiled, True
+        
+        compiled = compile(code, "<mcp-code>", "exec")
+        with self._code_cache_lock:
+            self._code_cache[key] = compiled
+            while len(self._code_cache) > CODE_CACHE_SIZE:
+                self._code_cache.popitem(last=False)
+        return compiled, False
+    
+    def _execute_code(self, params, emit=None):
+        """Execute arbitrary Python code.
+        
+        Prints are captured into the response's stdout field and, when emit is
+        given, streamed to the client as stdout frames while the code runs.
+        """
         try:
             code = params.get("code", "")
             if not code:
@@ -622,32 +1104,93 @@ class RhinoMCPServer:
             
             log_message("Executing code: {0}".format(code))
             
-            # Create a new scope for code execution
-            local_dict = {}
+            # A session runs in its own globals, so functions it defines see its variables
+            # and `global` stays inside it; other runs get a copy of the helper namespace
+            session_id = params.get("session_id")
+            session = None
+            if session_id:
+                session = self._get_session(session_id)
+                if session is None:
+                    return {"status": "error", "message": "Unknown or expired session: {0}".format(session_id)}
+                exec_globals = local_dict = session["namespace"]
+            else:
+                exec_globals = dict(self._get_exec_globals())
+                local_dict = {}
+            
+            background = params.get("mode") == "background"
+            if background and params.get("transaction"):
+                return {"status": "error", "message": "transaction is not supported in background mode, call commit() with your document edits instead"}
+            
+            # Transactions suppress redraws and collapse all edits into one undo step
+            transaction = None
+            if params.get("transaction"):
+                transaction = _DocTransaction(sc.doc, "MCP execute_code")
+            
+            # Capture prints of this execution (also feeding an enclosing job's output)
+            router = self._install_stdout_router()
+            output = _ExecutionOutput(EXEC_STDOUT_MAX_CHARS, emit, router.buffers.get(threading.current_thread().ident))
             
             try:
+                compiled, cache_hit = self._compile_code(code)
+                if cache_hit:
+                    log_message("Using cached compiled code")
+                
                 # Execute the code
-                exec(code, globals(), local_dict)
+                if transaction is not None:
+                    transaction.begin()
+                previous = router.register(output)
+                try:
+                    exec(compiled, exec_globals, local_dict)
+                finally:
+                    router.unregister(previous)
+                    output.flush_frames()
+                if transaction is not None:
+                    transaction.commit()
                 
                 # Get result from local_dict or use a default message
                 result = local_dict.get("result", "Code executed successfully")
-                log_message("Code execution completed. Result: {0}".format(result))
+                result_text = str(result)
+                if len(result_text) > EXPORT_MAX_TOTAL_BYTES:
+                    result_text = result_text[:EXPORT_MAX_TOTAL_BYTES] + "... [{0} more chars]".format(
+                        len(result_text) - EXPORT_MAX_TOTAL_BYTES)
+                log_message("Code execution completed. Result: {0}".format(result_text))
                 
                 response = {
                     "status": "success",
-                    "result": str(result),
-                    "variables": {k: str(v) for k, v in local_dict.items() if not k.startswith('__')}
+                    "result": result_text
                 }
                 
-                log_message("Sending response: {0}".format(json.dumps(response)))
+                # Variables are only exported when explicitly requested
+                export_names = params.get("export_variables")
+                if export_names:
+                    response.update(self._export_variables(
+                        self._session_variables(session) if session is not None else local_dict, export_names))
+                
+                if session is not None:
+                    response["session_id"] = session_id
+                    self._touch_session(session_id, ran=True)
+                if transaction is not None:
+                    response["transaction"] = transaction.info()
+                if background:
+                    response["mode"] = "background"
+                response.update(self._stdout_fields(output))
+                
+                log_message("Sending response: {0} variable(s) exported".format(len(response.get("variables", {}))))
                 return response
                 
             except Exception as e:
+                if transaction is not None:
+                    transaction.rollback()
                 hint = "Did you use f-string formatting? You have to use IronPython here that doesn't support this."
                 error_response = {
                     "status": "error",
                     "message": "{0} {1}".format(hint, str(e)),
                 }
+                if transaction is not None:
+                    error_response["transaction"] = transaction.info()
+                error_response.update(self._stdout_fields(output))
+                if session is not None:
+                    self._touch_session(session_id, ran=True)
                 log_message("Error: {0}".format(error_response))
                 return error_response
                 
@@ -660,6 +1203,477 @@ class RhinoMCPServer:
             log_message("System error: {0}".format(error_response))
             return error_response
 
+    def _register_function(self, params):
+        """Compile code once and keep the function it defines for call_function"""
+        try:
+            name = params.get("name")
+            code = params.get("code", "")
+            if not name or not code:
+                return {"status": "error", "message": "Both name and code are required"}
+            
+            compiled, _ = self._compile_code(code)
+            # One dict as globals and locals so helpers defined next to the function stay visible to it
+            namespace = dict(self._get_exec_globals())
+            exec(compiled, namespace)
+            func = namespace.get(name)
+            if not callable(func):
+                return {"status": "error", "message": "The code must define a function named {0}".format(name)}
+            
+            self._functions[name] = {
+                "func": func,
+                "registered_at": time.time(),
+                "calls": 0
+            }
+            log_message("Function registered: {0}".format(name))
+            return {"status": "success", "name": name, "functions": sorted(self._functions)}
+        except Exception as e:
+            return {"status": "error", "message": "{0}: {1}".format(type(e).__name__, str(e))}
+    
+    def _call_function(self, params):
+        """Call a registered function once, or for every argument set of a batch"""
+        name = params.get("name")
+        entry = self._functions.get(name)
+        if entry is None:
+            return {"status": "error", "message": "Unknown function: {0}".format(name),
+                    "functions": sorted(self._functions)}
+        
+        batch = params.get("batch")
+        calls = batch if batch is not None else [params.get("args") or []]
+        kwargs = params.get("kwargs") or {}
+        
+        transaction = None
+        if params.get("transaction"):
+            transaction = _DocTransaction(sc.doc, "MCP {0}".format(name))
+            transaction.begin()
+        
+        results = []
+        errors = 0
+        remaining = EXPORT_MAX_TOTAL_BYTES
+        try:
+            for call_args in calls:
+                try:
+                    if isinstance(call_args, dict):
+                        value = entry["func"](**call_args)
+                    elif isinstance(call_args, list):
+                        value = entry["func"](*call_args, **kwargs)
+                    else:
+                        value = entry["func"](call_args, **kwargs)
+                except Exception as e:
+                    errors += 1
+                    results.append({"ok": False, "error": "{0}: {1}".format(type(e).__name__, str(e))})
+                    continue
+                
+                item = {"ok": True}
+                if remaining > 0:
+                    data, info = self._export_value(value, min(EXPORT_MAX_VALUE_BYTES, remaining))
+                    item["result"] = data
+                    remaining -= len(json.dumps(data))
+                    if info is not None:
+                        item["truncated"] = info
+                else:
+                    item["truncated"] = {"reason": "total size limit reached"}
+                results.append(item)
+            if transaction is not None:
+                transaction.commit()
+        except Exception:
+            if transaction is not None:
+                transaction.rollback()
+            raise
+        
+        entry["calls"] += len(calls)
+        response = {"status": "success", "name": name, "errors": errors}
+        if batch is None:
+            response.update(results[0])
+            if not results[0]["ok"]:
+                response["status"] = "error"
+                response["message"] = results[0]["error"]
+        else:
+            response["results"] = results
+        if transaction is not None:
+            response["transaction"] = transaction.info()
+        return response
+    
+    def _stdout_fields(self, output):
+        """Response fields for the captured prints of an execution"""
+        text, _, dropped = output.read(0)
+        if not text:
+            return {}
+        fields = {"stdout": text}
+        if dropped:
+            fields["stdout_dropped"] = dropped
+        return fields
+    
+    def _to_jsonable(self, value, depth=0):
+        """Convert a value to JSON-compatible data, keeping geometry as numeric arrays"""
+        if value is None or isinstance(value, (bool, int, long, float)):
+            return value
+        if isinstance(value, basestring):
+            return value
+        if isinstance(value, (Rhino.Geometry.Point3d, Rhino.Geometry.Vector3d,
+                              Rhino.Geometry.Point3f, Rhino.Geometry.Vector3f)):
+            return [value.X, value.Y, value.Z]
+        if isinstance(value, (Rhino.Geometry.Point2d, Rhino.Geometry.Vector2d)):
+            return [value.X, value.Y]
+        if isinstance(value, System.Guid):
+            return str(value)
+        if isinstance(value, Rhino.Geometry.Line):
+            return [self._to_jsonable(value.From), self._to_jsonable(value.To)]
+        if isinstance(value, Rhino.Geometry.Plane):
+            return {
+                "origin": self._to_jsonable(value.Origin),
+                "x_axis": self._to_jsonable(value.XAxis),
+                "y_axis": self._to_jsonable(value.YAxis)
+            }
+        if isinstance(value, Rhino.Geometry.BoundingBox):
+            return [self._to_jsonable(value.Min), self._to_jsonable(value.Max)]
+        if isinstance(value, Rhino.Geometry.GeometryBase):
+            bbox = value.GetBoundingBox(True)
+            return {"type": value.GetType().Name, "bbox": self._to_jsonable(bbox)}
+        if depth >= EXPORT_MAX_DEPTH:
+            return str(value)
+        if isinstance(value, dict):
+            data = {}
+            for i, (k, v) in enumerate(value.items()):
+                if i >= EXPORT_MAX_ITEMS:
+                    break
+                data[str(k)] = self._to_jsonable(v, depth + 1)
+            return data
+        if isinstance(value, (list, tuple, set, frozenset)) or isinstance(value, System.Collections.IEnumerable):
+            data = []
+            for item in value:
+                if len(data) >= EXPORT_MAX_ITEMS:
+                    break
+                data.append(self._to_jsonable(item, depth + 1))
+            return data
+        return str(value)
+    
+    def _export_value(self, value, max_bytes):
+        """Serialize a value within max_bytes, returning (data, truncation info or None)"""
+        data = self._to_jsonable(value)
+        size = len(json.dumps(data))
+        try:
+            total_items = len(value)
+        except Exception:
+            total_items = len(data) if isinstance(data, (list, dict)) else None
+        
+        if size <= max_bytes and (not isinstance(data, list) or len(data) == total_items):
+            return data, None
+        
+        if isinstance(data, list):
+            # Keep the longest prefix that fits
+            low, high = 0, len(data)
+            while low < high:
+                mid = (low + high + 1) // 2
+                if len(json.dumps(data[:mid])) <= max_bytes:
+                    low = mid
+                else:
+                    high = mid - 1
+            return data[:low], {"total_items": total_items, "exported_items": low, "bytes": size}
+        
+        if isinstance(data, basestring):
+            keep = max(0, max_bytes - 2)
+            return data[:keep], {"total_chars": len(data), "exported_chars": keep}
+        
+        return None, {"bytes": size, "reason": "value exceeds size limit"}
+    
+    def _export_variables(self, local_dict, names):
+        """Export whitelisted variables with per-value and total size caps.
+        
+        names is a list of variable names, or ["*"] for every public variable that is
+        not a module, function or class.
+        """
+        if names == "*" or names == ["*"]:
+            names = sorted(k for k, v in local_dict.items()
+                           if not k.startswith('_') and k != "result"
+                           and not isinstance(v, (types.ModuleType, types.FunctionType, type)))
+        
+        variables = {}
+        truncated = {}
+        missing = []
+        remaining = EXPORT_MAX_TOTAL_BYTES
+        for name in names:
+            if name not in local_dict:
+                missing.append(name)
+                continue
+            if remaining <= 0:
+                truncated[name] = {"reason": "total size limit reached"}
+                continue
+            try:
+                data, info = self._export_value(local_dict[name], min(EXPORT_MAX_VALUE_BYTES, remaining))
+            except Exception as e:
+                data, info = None, {"reason": "not serializable: {0}".format(str(e))}
+            if info is None or data is not None:
+                variables[name] = data
+                remaining -= len(json.dumps(data))
+            if info is not None:
+                truncated[name] = info
+        
+        exported = {"variables": variables}
+        if truncated:
+            exported["truncated"] = truncated
+        if missing:
+            exported["missing"] = missing
+        return exported
+    
+    def _check_cancel(self):
+        """Raise JobCancelled if the job running on this thread was cancelled (exposed to code)"""
+        job = getattr(self._job_context, "job", None)
+        if job is not None and job.cancel_event.is_set():
+            raise JobCancelled("Job {0} was cancelled".format(job.id))
+    
+    def _job_progress(self, value, message=None):
+        """Report progress of the job running on this thread (exposed to code as job_progress)"""
+        job = getattr(self._job_context, "job", None)
+        if job is not None:
+            job.progress = value
+            if message is not None:
+                job.progress_message = str(message)
+        self._check_cancel()
+    
+    def _install_stdout_router(self):
+        with self._jobs_lock:
+            if self._stdout_router is None:
+                self._stdout_router = _ThreadRoutedStdout(sys.stdout)
+                sys.stdout = self._stdout_router
+            return self._stdout_router
+    
+    def _uninstall_stdout_router(self):
+        if self._stdout_router is not None and sys.stdout is self._stdout_router:
+            sys.stdout = self._stdout_router.original
+        self._stdout_router = None
+    
+    def _run_job(self, job):
+        """Execute a job on the current thread, capturing its prints and final response"""
+        router = self._install_stdout_router()
+        self._job_context.job = job
+        previous = router.register(job.output)
+        job.status = "running"
+        job.started_at = time.time()
+        try:
+            if job.cancel_event.is_set():
+                raise JobCancelled("Job {0} was cancelled".format(job.id))
+            job.response = self._execute_code(job.params)
+            if job.cancel_event.is_set() and job.response.get("status") == "error":
+                job.response["message"] = "Job {0} was cancelled".format(job.id)
+                job.status = "cancelled"
+            elif job.response.get("status") == "error":
+                job.status = "failed"
+            else:
+                job.status = "succeeded"
+        except JobCancelled as e:
+            job.response = {"status": "error", "message": str(e)}
+            job.status = "cancelled"
+        except Exception as e:
+            job.response = {"status": "error", "message": str(e)}
+            job.status = "failed"
+        finally:
+            router.unregister(previous)
+            self._job_context.job = None
+            job.finished_at = time.time()
+            log_message("Job {0} {1}".format(job.id, job.status))
+    
+    def _prune_jobs(self):
+        """Forget the oldest finished jobs beyond JOB_MAX_FINISHED"""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished_at is not None]
+        for job_id in finished[:max(0, len(finished) - JOB_MAX_FINISHED)]:
+            del self._jobs[job_id]
+    
+    def _submit_job(self, params):
+        """Start execute_code as a job and return its id immediately"""
+        try:
+            import uuid
+            if not params.get("code"):
+                return {"status": "error", "message": "No code provided"}
+            job = _Job(uuid.uuid4().hex[:12], dict(params))
+            if job.mode == "background":
+                job.params["mode"] = "background"
+            elif job.mode != "ui":
+                return {"status": "error", "message": "Unknown job mode: {0}".format(job.mode)}
+            
+            with self._jobs_lock:
+                self._prune_jobs()
+                self._jobs[job.id] = job
+            
+            if job.mode == "background":
+                worker = threading.Thread(target=self._run_job, args=(job,))
+                worker.daemon = True
+                worker.start()
+            else:
+                # UI jobs still run on the UI thread but nobody waits on the socket for them
+                Rhino.RhinoApp.InvokeOnUiThread(System.Action(lambda: self._run_job(job)))
+            
+            log_message("Job {0} submitted ({1})".format(job.id, job.mode))
+            return {"status": "success", "job_id": job.id, "mode": job.mode}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+    
+    def _find_job(self, params):
+        with self._jobs_lock:
+            return self._jobs.get(params.get("job_id"))
+    
+    def _get_job_status(self, params):
+        job = self._find_job(params)
+        if job is None:
+            return {"status": "error", "message": "Unknown job: {0}".format(params.get("job_id"))}
+        return {"status": "success", "job": job.info()}
+    
+    def _get_job_output(self, params):
+        """Return job output written after the given offset"""
+        job = self._find_job(params)
+        if job is None:
+            return {"status": "error", "message": "Unknown job: {0}".format(params.get("job_id"))}
+        text, next_offset, dropped = job.output.read(int(params.get("since") or 0))
+        return {
+            "status": "success",
+            "job_id": job.id,
+            "job_status": job.status,
+            "output": text,
+            "next": next_offset,
+            "dropped": dropped,
+            "finished": job.finished_at is not None
+        }
+    
+    def _cancel_job(self, params):
+        """Request cooperative cancellation, honoured at the job's next check_cancel()"""
+        job = self._find_job(params)
+        if job is None:
+            return {"status": "error", "message": "Unknown job: {0}".format(params.get("job_id"))}
+        if job.finished_at is None:
+            job.cancel_event.set()
+            log_message("Job {0} cancellation requested".format(job.id))
+        return {"status": "success", "job": job.info()}
+    
+    def _estimate_size(self, value, depth=0):
+        """Rough memory estimate of a value in bytes, recursing a little into containers"""
+        if isinstance(value, basestring):
+            return 40 + len(value) * 2
+        if isinstance(value, (int, long, float, bool)) or value is None:
+            return 24
+        if isinstance(value, (list, tuple, set, frozenset, dict)):
+            items = value.items() if isinstance(value, dict) else value
+            size = 64 + len(value) * 8
+            if depth >= 3:
+                return size + len(value) * 24
+            sample = 0
+            count = 0
+            for item in items:
+                sample += self._estimate_size(item, depth + 1)
+                count += 1
+                if count >= 100:
+                    # Extrapolate from the first items of large containers
+                    sample = sample * len(value) // count
+                    break
+            return size + sample
+        if isinstance(value, (types.ModuleType, types.FunctionType, type)):
+            return 0
+        return 64
+    
+    def _session_variables(self, session):
+        """Variables the session's code defined, without the seeded helper namespace"""
+        seed = self._get_exec_globals()
+        return dict((k, v) for k, v in session["namespace"].items()
+                    if not k.startswith('__') and (k not in seed or seed[k] is not v))
+    
+    def _session_info(self, session_id, session):
+        return {
+            "session_id": session_id,
+            "variables": sorted(self._session_variables(session)),
+            "created_at": session["created_at"],
+            "idle_seconds": round(time.time() - session["last_used"], 1),
+            "ttl": session["ttl"],
+            "exec_count": session["exec_count"],
+            "estimated_bytes": session["size"]
+        }
+    
+    def _evict_sessions(self, keep=None):
+        """Drop expired sessions, then least recently used ones over the count/memory budget"""
+        with self._sessions_lock:
+            now = time.time()
+            for session_id, session in list(self._sessions.items()):
+                if session_id != keep and now - session["last_used"] > session["ttl"]:
+                    del self._sessions[session_id]
+                    log_message("Session expired: {0}".format(session_id))
+            
+            while len(self._sessions) > 1:
+                total = sum(session["size"] for session in self._sessions.values())
+                if len(self._sessions) <= SESSION_MAX_COUNT and total <= SESSION_MAX_BYTES:
+                    break
+                oldest = next(iter(self._sessions))
+                if oldest == keep:
+                    # Never evict the session that is in use, move on to the next oldest
+                    self._sessions[keep] = self._sessions.pop(keep)
+                    oldest = next(iter(self._sessions))
+                del self._sessions[oldest]
+                log_message("Session evicted: {0}".format(oldest))
+    
+    def _get_session(self, session_id):
+        with self._sessions_lock:
+            self._evict_sessions(keep=session_id)
+            return self._sessions.get(session_id)
+    
+    def _touch_session(self, session_id, ran=False):
+        """Mark a session as most recently used and refresh its size estimate"""
+        with self._sessions_lock:
+            session = self._sessions.pop(session_id, None)
+            if session is None:
+                return
+            session["last_used"] = time.time()
+            if ran:
+                session["exec_count"] += 1
+                session["size"] = sum(self._estimate_size(v) for v in self._session_variables(session).values())
+            self._sessions[session_id] = session
+            self._evict_sessions(keep=session_id)
+    
+    def _create_session(self, params):
+        """Create a named namespace that persists between execute_code calls"""
+        try:
+            import uuid
+            session_id = params.get("session_id") or uuid.uuid4().hex[:8]
+            ttl = params.get("ttl") or SESSION_TTL
+            with self._sessions_lock:
+                if session_id in self._sessions:
+                    return {"status": "error", "message": "Session already exists: {0}".format(session_id)}
+                now = time.time()
+                self._sessions[session_id] = {
+                    # Seeded once; the session's code runs with this dict as its globals
+                    "namespace": dict(self._get_exec_globals()),
+                    "created_at": now,
+                    "last_used": now,
+                    "ttl": float(ttl),
+                    "exec_count": 0,
+                    "size": 0
+                }
+                self._evict_sessions(keep=session_id)
+                log_message("Session created: {0}".format(session_id))
+                return {"status": "success", "session": self._session_info(session_id, self._sessions[session_id])}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+    
+    def _list_sessions(self):
+        """List live sessions with their variables and memory estimate"""
+        try:
+            with self._sessions_lock:
+                self._evict_sessions()
+                sessions = [self._session_info(k, v) for k, v in self._sessions.items()]
+            return {
+                "status": "success",
+                "sessions": sessions,
+                "total_estimated_bytes": sum(info["estimated_bytes"] for info in sessions),
+                "max_bytes": SESSION_MAX_BYTES,
+                "max_count": SESSION_MAX_COUNT
+            }
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+    
+    def _drop_session(self, params):
+        """Drop a session and release its namespace"""
+        session_id = params.get("session_id")
+        with self._sessions_lock:
+            if self._sessions.pop(session_id, None) is None:
+                return {"status": "error", "message": "Unknown session: {0}".format(session_id)}
+        log_message("Session dropped: {0}".format(session_id))
+        return {"status": "success", "session_id": session_id}
+
     def _add_object_metadata(self, obj_id, name=None, description=None):
         """Add standardized metadata to an object"""
         try:
@@ -818,6 +1832,291 @@ class RhinoMCPServer:
                 "available_fields": all_fields
             }
 
+    def _get_capture_bbox(self):
+        """Bounding box of the selected objects, or of all visible objects if nothing is selected"""
+        bbox = Rhino.Geometry.BoundingBox.Empty
+        selected = list(sc.doc.Objects.GetSelectedObjects(False, False))
+        if selected:
+            for obj in selected:
+                bbox = Rhino.Geometry.BoundingBox.Union(bbox, obj.Geometry.GetBoundingBox(True))
+        else:
+            bbox = sc.doc.Objects.BoundingBoxVisible
+        if not bbox.IsValid:
+            return None
+        return bbox
+
+    def _capture_size(self, viewport, max_size):
+        """Output bitmap size with the viewport's aspect ratio and max_size on the long side"""
+        width, height = viewport.Size.Width, viewport.Size.Height
+        if width <= 0 or height <= 0:
+            width, height = 4, 3
+        if width > height:
+            return max_size, max(1, int(height * (float(max_size) / width)))
+        return max(1, int(width * (float(max_size) / height))), max_size
+
+    def _frame_viewport_info(self, info, bbox, width, height, padding=CAPTURE_PADDING):
+        """Fit a ViewportInfo camera around bbox without touching any on-screen view.
+
+        padding is the only margin applied; callers pass the raw bounding box.
+        """
+        info.ScreenPort = System.Drawing.Rectangle(0, 0, width, height)
+        info.FrustumAspect = float(width) / float(height)
+        if bbox is not None:
+            radius = max(bbox.Diagonal.Length * 0.5, 1e-3)
+            pad = radius * (max(padding, 1.0) - 1.0)
+            delta = Rhino.Geometry.Vector3d(pad, pad, pad)
+            padded = Rhino.Geometry.BoundingBox(bbox.Min - delta, bbox.Max + delta)
+            half_angle = math.atan(12.0 / PERSPECTIVE_LENS_LENGTH)
+            info.Extents(half_angle, padded)
+            info.TargetPoint = bbox.Center
+        return info
+
+    def _standard_view_info(self, view_key, bbox, width, height, padding=CAPTURE_PADDING):
+        """Derive a standard view camera analytically from the capture bbox"""
+        direction, up, is_perspective = STANDARD_VIEWS[view_key]
+        camera_dir = Rhino.Geometry.Vector3d(-direction[0], -direction[1], -direction[2])
+        camera_dir.Unitize()
+        center = bbox.Center if bbox is not None else Rhino.Geometry.Point3d.Origin
+        radius = max(bbox.Diagonal.Length * 0.5, 1.0) if bbox is not None else 100.0
+
+        info = Rhino.DocObjects.ViewportInfo()
+        if is_perspective:
+            info.ChangeToPerspectiveProjection(radius * 3.0, True, PERSPECTIVE_LENS_LENGTH)
+        else:
+            info.ChangeToParallelProjection(True)
+        info.SetCameraLocation(center - camera_dir * (radius * 3.0))
+        info.SetCameraDirection(camera_dir)
+        info.SetCameraUp(Rhino.Geometry.Vector3d(up[0], up[1], up[2]))
+        info.TargetPoint = center
+        return self._frame_viewport_info(info, bbox, width, height, padding)
+
+    def _has_standard_camera(self, viewport, view_key):
+        """Whether an existing viewport still looks the way the view_key preset would"""
+        direction, _, is_perspective = STANDARD_VIEWS[view_key]
+        if bool(viewport.IsPerspectiveProjection) != is_perspective:
+            return False
+        camera_dir = Rhino.Geometry.Vector3d(-direction[0], -direction[1], -direction[2])
+        camera_dir.Unitize()
+        current = Rhino.Geometry.Vector3d(viewport.CameraDirection)
+        if not current.Unitize():
+            return False
+        return current * camera_dir > 0.999
+
+    def _make_offscreen_viewport(self, view_name, max_size, bbox, should_zoom_extents, multiple_of=1, padding=CAPTURE_PADDING):
+        """Create a private RhinoViewport copy framed for view_name.
+
+        Standard view names get the analytic preset camera unless a view of
+        that name exists with a camera the user changed; such views keep
+        their camera and are only re-framed. Returns (viewport, width, height).
+        The caller owns and disposes the viewport.
+        """
+        view_key = view_name.lower() if view_name else None
+        named_view = sc.doc.Views.Find(view_name, False) if view_name else None
+        base_view = named_view
+        if base_view is None:
+            if view_name and view_key not in STANDARD_VIEWS:
+                log_message("Warning: View '{0}' not found. Using active view.".format(view_name))
+            base_view = sc.doc.Views.ActiveView
+        base_viewport = base_view.ActiveViewport
+
+        width, height = self._capture_size(base_viewport, max_size)
+        if multiple_of > 1:
+            width = max(multiple_of, width - width % multiple_of)
+            height = max(multiple_of, height - height % multiple_of)
+        if view_key in STANDARD_VIEWS and (named_view is None or (should_zoom_extents and self._has_standard_camera(base_viewport, view_key))):
+            info = self._standard_view_info(view_key, bbox if should_zoom_extents else self._get_capture_bbox(), width, height, padding)
+        else:
+            info = Rhino.DocObjects.ViewportInfo(base_viewport)
+            info = self._frame_viewport_info(info, bbox if should_zoom_extents else None, width, height, padding)
+
+        viewport = Rhino.Display.RhinoViewport(base_viewport)
+        viewport.Size = System.Drawing.Size(width, height)
+        viewport.SetViewProjection(info, True)
+        return viewport, width, height
+
+    def _capture_offscreen_view(self, view_name, max_size, bbox, should_zoom_extents, padding=CAPTURE_PADDING):
+        """Capture a view by drawing a copy of a viewport offscreen.
+
+        The user's views are never switched, zoomed or redrawn; the camera is
+        applied to a private RhinoViewport copy and drawn to a bitmap.
+        """
+        viewport, width, height = self._make_offscreen_viewport(view_name, max_size, bbox, should_zoom_extents, padding=padding)
+        try:
+            bitmap = Rhino.Display.DisplayPipeline.DrawToBitmap(viewport, width, height)
+            if bitmap is None:
+                raise Exception("DrawToBitmap returned no image")
+            try:
+                return self._encode_bitmap(bitmap, view_name)
+            finally:
+                bitmap.Dispose()
+        finally:
+            viewport.Dispose()
+
+    def _encode_bitmap(self, bitmap, label, image_format=None, media_type="image/jpeg"):
+        """Encode a bitmap as a base64 image entry (JPEG by default)"""
+        memory_stream = MemoryStream()
+        try:
+            bitmap.Save(memory_stream, image_format or ImageFormat.Jpeg)
+            bytes_array = memory_stream.ToArray()
+            image_data = base64.b64encode(bytes(bytearray(bytes_array))).decode('utf-8')
+        finally:
+            memory_stream.Dispose()
+        return {
+            "type": "base64",
+            "media_type": media_type,
+            "data": image_data,
+            "label": label or "Active"
+        }
+
+    def _resolve_capture_objects(self, ids, short_id_map):
+        """Resolve object GUIDs or short_ids to Rhino objects"""
+        objects = []
+        missing = []
+        for obj_id in ids:
+            obj_id = str(obj_id)
+            obj = None
+            try:
+                obj = sc.doc.Objects.FindId(System.Guid(obj_id))
+            except:
+                obj = None
+            if obj is None:
+                obj = short_id_map.get(obj_id)
+            if obj is None:
+                missing.append(obj_id)
+            else:
+                objects.append(obj)
+        return objects, missing
+
+    def _capture_regions(self, regions, padding, views_to_capture, max_size, emit=None):
+        """Capture one framed image per region (a GUID/short_id or a list of them) and view"""
+        # Build the short_id lookup once for all regions
+        short_id_map = {}
+        for obj in sc.doc.Objects:
+            short_id = obj.Attributes.GetUserString("short_id")
+            if short_id:
+                short_id_map[short_id] = obj
+
+        collector = _ImageCollector(len(regions) * len(views_to_capture), emit)
+        errors = []
+        for region in regions:
+            ids = region if isinstance(region, list) else [region]
+            label = ",".join(str(i) for i in ids)
+            objects, missing = self._resolve_capture_objects(ids, short_id_map)
+            if missing:
+                errors.append("Objects not found: {0}".format(", ".join(missing)))
+            if not objects:
+                continue
+
+            bbox = Rhino.Geometry.BoundingBox.Empty
+            for obj in objects:
+                bbox = Rhino.Geometry.BoundingBox.Union(bbox, obj.Geometry.GetBoundingBox(True))
+            if not bbox.IsValid:
+                errors.append("Region has no valid bounding box: {0}".format(label))
+                continue
+
+            for v_name in views_to_capture:
+                try:
+                    # The region padding replaces the default capture padding
+                    img_data = self._capture_offscreen_view(v_name, max_size, bbox, True, padding)
+                    img_data["label"] = "{0}: {1}".format(v_name or "Active", label)
+                    collector.add(img_data)
+                except Exception as e:
+                    errors.append("Failed to capture {0} for {1}: {2}".format(v_name or "Active", label, str(e)))
+
+        response = collector.response()
+        if errors:
+            response["errors"] = errors
+        return response
+
+    def _capture_depth(self, params):
+        """Capture the Z-buffer of a view offscreen.
+
+        precision 8 returns Rhino's grayscale Z-buffer as PNG; precision 16
+        returns the raw Z values as little-endian float32 so the MCP server
+        can normalize them without banding. precision 16 reads the buffer pixel
+        by pixel, so its max_size is capped at DEPTH_FLOAT_MAX_SIZE. Near/far
+        planes are included so perspective depth can be linearized.
+        """
+        view_name = params.get("view") or "Perspective"
+        if view_name.lower() == "active":
+            view_name = None
+        max_size = int(params.get("max_size", 1024))
+        precision = int(params.get("precision", 8))
+        should_zoom_extents = params.get("zoom_extents", True)
+        multiple_of = int(params.get("multiple_of", 1))
+        if precision >= 16:
+            max_size = min(max_size, DEPTH_FLOAT_MAX_SIZE)
+
+        bbox = self._get_capture_bbox() if should_zoom_extents else None
+        viewport, width, height = self._make_offscreen_viewport(view_name, max_size, bbox, should_zoom_extents, multiple_of)
+        zbuffer = None
+        try:
+            zbuffer = Rhino.Display.ZBufferCapture(viewport)
+            # Only shaded surfaces and meshes should contribute depth
+            for toggle in ("ShowCurves", "ShowIsocurves", "ShowPoints", "ShowText", "ShowAnnotations", "ShowLights"):
+                if hasattr(zbuffer, toggle):
+                    getattr(zbuffer, toggle)(False)
+            if hasattr(zbuffer, "CaptureZBuffer"):
+                zbuffer.CaptureZBuffer()
+
+            frustum = viewport.GetFrustum()
+            response = {
+                "status": "success",
+                "type": "depth",
+                "view": view_name or "Active",
+                "width": width,
+                "height": height,
+                "near": frustum[5],
+                "far": frustum[6],
+                "is_perspective": viewport.IsPerspectiveProjection,
+                "hit_count": zbuffer.HitCount()
+            }
+
+            if precision >= 16:
+                # ZBufferCapture only exposes per-pixel reads, so this costs one call per pixel
+                values = array.array('f')
+                for y in range(height):
+                    for x in range(width):
+                        values.append(zbuffer.ZValueAt(x, y))
+                response["encoding"] = "float32"
+                response["data"] = base64.b64encode(values.tostring()).decode('utf-8')
+            else:
+                bitmap = zbuffer.GrayscaleDib()
+                try:
+                    image = self._encode_bitmap(bitmap, view_name, ImageFormat.Png, "image/png")
+                finally:
+                    bitmap.Dispose()
+                response["encoding"] = "png8"
+                response["data"] = image["data"]
+            return response
+        finally:
+            if zbuffer is not None:
+                zbuffer.Dispose()
+            viewport.Dispose()
+
+    def _capture_view_in_ui(self, v_name, max_size, should_zoom_extents, show_annotations, layer_name):
+        """Fallback capture that manipulates the on-screen viewport"""
+        # Pre-switch active view for specific standard views to ensure correct base viewport is used
+        # This prevents e.g. "Left" being captured using "Top" viewport, which might leave "Top" viewport in a weird state
+        # The _capture_single_view function restores the active view to what it was when called.
+        if v_name:
+            v_lower = v_name.lower()
+            base_view = None
+            if v_lower == "bottom":
+                base_view = sc.doc.Views.Find("Top", False)
+            elif v_lower == "back":
+                base_view = sc.doc.Views.Find("Front", False)
+            elif v_lower == "left":
+                base_view = sc.doc.Views.Find("Right", False)
+            
+            if base_view:
+                sc.doc.Views.ActiveView = base_view
+
+        return self._capture_single_view(
+            v_name, max_size, should_zoom_extents, 
+            show_annotations, layer_name, temp_dots_created=True
+        )
+
     def _capture_single_view(self, view_name, max_size, should_zoom_extents, show_annotations, layer_name, temp_dots_created=False):
         """Helper to capture a single view. Assumes setup (layers etc) is done."""
         original_view = None
@@ -993,8 +2292,12 @@ class RhinoMCPServer:
             if original_view and original_view != sc.doc.Views.ActiveView:
                 sc.doc.Views.ActiveView = original_view
 
-    def _capture_viewport(self, params):
-        """Capture viewport(s) with optional annotations and layer filtering"""
+    def _capture_viewport(self, params, emit=None):
+        """Capture viewport(s) with optional annotations and layer filtering.
+
+        With emit, every image is streamed as its own frame as soon as it is
+        encoded and the final response only carries the frame count.
+        """
         original_layer_name = rs.CurrentLayer()
         temp_dots = []
         
@@ -1004,6 +2307,8 @@ class RhinoMCPServer:
             max_size = params.get("max_size", 800)
             target_view = params.get("view")
             should_zoom_extents = params.get("zoom_extents", True)
+            regions = params.get("object_ids")
+            padding = float(params.get("padding") or 1.2)
             
             # Setup annotations (once for all views)
             if show_annotations:
@@ -1049,38 +2354,29 @@ class RhinoMCPServer:
                     views_to_capture = [None]
                 else:
                     views_to_capture = [str(target_view)]
+            elif regions:
+                # Region captures default to a single perspective per region
+                views_to_capture = ["Perspective"]
             else:
                 # Default to standard 4-view layout if no view is specified
                 views_to_capture = ["Perspective", "Top", "Front", "Right"]
 
-            images = []
-            for v_name in views_to_capture:
-                # Pre-switch active view for specific standard views to ensure correct base viewport is used
-                # This prevents e.g. "Left" being captured using "Top" viewport, which might leave "Top" viewport in a weird state
-                # The _capture_single_view function restores the active view to what it was when called.
-                if v_name:
-                    v_lower = v_name.lower()
-                    base_view = None
-                    if v_lower == "bottom":
-                        base_view = sc.doc.Views.Find("Top", False)
-                    elif v_lower == "back":
-                        base_view = sc.doc.Views.Find("Front", False)
-                    elif v_lower == "left":
-                        base_view = sc.doc.Views.Find("Right", False)
-                    
-                    if base_view:
-                        sc.doc.Views.ActiveView = base_view
+            if regions:
+                return self._capture_regions(regions, padding, views_to_capture, max_size, emit)
 
-                img_data = self._capture_single_view(
-                    v_name, max_size, should_zoom_extents, 
-                    show_annotations, layer_name, temp_dots_created=True
-                )
-                images.append(img_data)
+            # Frame every view from one bounding box computed up front
+            capture_bbox = self._get_capture_bbox() if should_zoom_extents else None
+
+            collector = _ImageCollector(len(views_to_capture), emit)
+            for v_name in views_to_capture:
+                try:
+                    img_data = self._capture_offscreen_view(v_name, max_size, capture_bbox, should_zoom_extents)
+                except Exception as e:
+                    log_message("Offscreen capture failed for '{0}', falling back to viewport capture: {1}".format(v_name, str(e)))
+                    img_data = self._capture_view_in_ui(v_name, max_size, should_zoom_extents, show_annotations, layer_name)
+                collector.add(img_data)
             
-            return {
-                "type": "multi_image",
-                "images": images
-            }
+            return collector.response()
             
         except Exception as e:
             log_message("Error capturing viewport: " + str(e))
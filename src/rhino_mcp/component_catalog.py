@@ -0,0 +1,300 @@
+"""On-disk cache of the Grasshopper component catalog.
+
+The catalog only changes when plugins change, so it is pulled from the GH
+bridge once per fingerprint (Rhino/GH versions and loaded libraries) and kept
+in SQLite. Searches are answered locally with FTS5 when the SQLite build has
+it and with LIKE otherwise, so they work even while Grasshopper is solving.
+
+Pages only carry what the component proxies describe. Parameter signatures
+need an instance of the component on the GH UI thread, so they are fetched
+lazily for the components a search or lookup returns and cached alongside.
+"""
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger("ComponentCatalog")
+
+CACHE_DIR = Path(os.environ.get("RHINO_MCP_CACHE_DIR", Path.home() / ".rhino_mcp" / "cache"))
+CATALOG_FILE = "gh_component_catalog.sqlite3"
+
+# Seconds between fingerprint checks against the bridge
+CATALOG_CHECK_INTERVAL = 300
+
+# Components requested per bridge call while pulling the catalog
+CATALOG_PAGE_SIZE = 500
+
+# Signatures requested per bridge call (matches the bridge's SIGNATURE_BATCH_SIZE)
+SIGNATURE_BATCH_SIZE = 25
+
+# bm25 column weights: name, nickname, category, subcategory, description
+FTS_WEIGHTS = (10.0, 8.0, 2.0, 2.0, 1.0)
+
+SendCommand = Callable[[str, Dict[str, Any]], Dict[str, Any]]
+
+
+class ComponentCatalog:
+    """SQLite-backed component catalog with lazy background refresh"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else CACHE_DIR / CATALOG_FILE
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.has_fts = False
+        self.last_check = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._ensure_schema()
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """Connection that commits on success, rolls back on error and is always closed"""
+        conn = sqlite3.connect(str(self.path), timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+    def _ensure_schema(self):
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.execute("""CREATE TABLE IF NOT EXISTS components (
+                id INTEGER PRIMARY KEY,
+                guid TEXT, name TEXT, nickname TEXT, category TEXT, subcategory TEXT,
+                description TEXT, obsolete INTEGER, inputs TEXT, outputs TEXT)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS components_name ON components (name COLLATE NOCASE)")
+            try:
+                conn.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS components_fts USING fts5(
+                    name, nickname, category, subcategory, description,
+                    content='components', content_rowid='id')""")
+                self.has_fts = True
+            except sqlite3.OperationalError:
+                logger.info("SQLite has no FTS5, component search falls back to LIKE")
+
+    def fingerprint(self) -> Optional[str]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT value FROM meta WHERE key = 'fingerprint'").fetchone()
+        return row["value"] if row else None
+
+    def count(self) -> int:
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM components").fetchone()[0]
+
+    def is_ready(self) -> bool:
+        with self._connect() as conn:
+            row = conn.execute("""SELECT EXISTS (SELECT 1 FROM meta WHERE key = 'fingerprint')
+                                  AND EXISTS (SELECT 1 FROM components)""").fetchone()
+        return bool(row[0])
+
+    def store(self, fingerprint: str, components: List[Dict[str, Any]]):
+        """Replace the catalog with components pulled under fingerprint"""
+        # Signatures missing from the pulled components stay NULL until first requested
+        rows = [(c.get("guid"), c.get("name"), c.get("nickname"), c.get("category"), c.get("subcategory"),
+                 c.get("description"), int(bool(c.get("obsolete"))),
+                 json.dumps(c["inputs"]) if "inputs" in c else None,
+                 json.dumps(c["outputs"]) if "outputs" in c else None) for c in components]
+        with self._connect() as conn:
+            if self.has_fts:
+                conn.execute("INSERT INTO components_fts(components_fts) VALUES ('delete-all')")
+            conn.execute("DELETE FROM components")
+            conn.executemany("""INSERT INTO components
+                (guid, name, nickname, category, subcategory, description, obsolete, inputs, outputs)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""", rows)
+            if self.has_fts:
+                conn.execute("INSERT INTO components_fts(components_fts) VALUES ('rebuild')")
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('fingerprint', ?)", (fingerprint,))
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('updated', ?)", (str(time.time()),))
+        logger.info("Stored {0} components for catalog fingerprint {1}".format(len(rows), fingerprint))
+
+    def refresh(self, send_command: SendCommand) -> bool:
+        """Pull the catalog from the bridge if its fingerprint changed.
+
+        Returns:
+            True if the catalog was replaced
+        """
+        result = send_command("get_catalog_fingerprint", {})
+        if result.get("status") == "error":
+            raise RuntimeError(result.get("result", "Unknown error"))
+        fingerprint = result.get("result", {}).get("fingerprint")
+        self.last_check = time.time()
+        if not fingerprint or fingerprint == self.fingerprint():
+            return False
+
+        components = []
+        offset, total = 0, None
+        while total is None or offset < total:
+            page = send_command("get_component_catalog", {"offset": offset, "limit": CATALOG_PAGE_SIZE})
+            if page.get("status") == "error":
+                raise RuntimeError(page.get("result", "Unknown error"))
+            page = page.get("result", {})
+            if page.get("fingerprint") != fingerprint:
+                # Plugins changed while paging; the next check starts over
+                logger.info("Catalog fingerprint changed while pulling, retrying later")
+                self.last_check = 0.0
+                return False
+            total = page.get("total", 0)
+            if not page.get("components"):
+                break
+            components.extend(page["components"])
+            offset += len(page["components"])
+
+        self.store(fingerprint, components)
+        return True
+
+    def load_signatures(self, guids: List[str], send_command: SendCommand) -> Dict[str, Dict[str, Any]]:
+        """Fetch and cache the signatures of guids whose signatures are not cached yet.
+
+        Returns:
+            Signatures by guid for the components fetched by this call
+        """
+        if not guids:
+            return {}
+        with self._connect() as conn:
+            placeholders = ",".join("?" * len(guids))
+            missing = [row["guid"] for row in conn.execute(
+                "SELECT DISTINCT guid FROM components WHERE inputs IS NULL AND guid IN ({0})".format(placeholders),
+                list(guids))]
+        fetched = {}
+        for start in range(0, len(missing), SIGNATURE_BATCH_SIZE):
+            result = send_command("get_component_signatures", {"guids": missing[start:start + SIGNATURE_BATCH_SIZE]})
+            if result.get("status") == "error":
+                raise RuntimeError(result.get("result", "Unknown error"))
+            fetched.update(result.get("result") or {})
+        if fetched:
+            with self._connect() as conn:
+                conn.executemany("UPDATE components SET inputs = ?, outputs = ? WHERE guid = ?",
+                                 [(json.dumps(sig.get("inputs", [])), json.dumps(sig.get("outputs", [])), guid)
+                                  for guid, sig in fetched.items()])
+        return fetched
+
+    def _with_signatures(self, rows: List[sqlite3.Row], send_command: Optional[SendCommand]) -> List[Dict[str, Any]]:
+        """Rows as dicts with signatures, fetching uncached ones when send_command is given"""
+        fetched = {}
+        if send_command is not None:
+            try:
+                fetched = self.load_signatures([row["guid"] for row in rows if row["inputs"] is None], send_command)
+            except Exception as e:
+                logger.warning("Could not load component signatures: {0}".format(str(e)))
+        entries = []
+        for row in rows:
+            entry = dict(row)
+            if row["guid"] in fetched:
+                entry["inputs"] = json.dumps(fetched[row["guid"]].get("inputs", []))
+                entry["outputs"] = json.dumps(fetched[row["guid"]].get("outputs", []))
+            entries.append(entry)
+        return entries
+
+    def refresh_async(self, send_command: SendCommand, force: bool = False):
+        """Check the fingerprint in a background thread unless checked recently"""
+        with self._lock:
+            if self._refreshing or (not force and time.time() - self.last_check < CATALOG_CHECK_INTERVAL):
+                return
+            self._refreshing = True
+            # Count the attempt so an unreachable bridge is not polled on every call
+            self.last_check = time.time()
+
+        def _run():
+            try:
+                self.refresh(send_command)
+            except Exception as e:
+                logger.warning("Component catalog refresh failed: {0}".format(str(e)))
+            finally:
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=_run, name="gh-catalog-refresh", daemon=True).start()
+
+    @staticmethod
+    def _row_to_dict(row: Dict[str, Any], signatures: bool) -> Dict[str, Any]:
+        entry = {
+            "name": row["name"],
+            "nickname": row["nickname"],
+            "description": row["description"],
+            "category": row["category"],
+            "subcategory": row["subcategory"],
+            "guid": row["guid"],
+        }
+        if row["obsolete"]:
+            entry["obsolete"] = True
+        if row["inputs"] is None:
+            # Signature not fetched yet; leave it out rather than report no parameters
+            return entry
+        inputs, outputs = json.loads(row["inputs"]), json.loads(row["outputs"] or "[]")
+        if signatures:
+            entry["inputs"], entry["outputs"] = inputs, outputs
+        else:
+            entry["inputs"] = [p.get("nickName") or p.get("name") for p in inputs]
+            entry["outputs"] = [p.get("nickName") or p.get("name") for p in outputs]
+        return entry
+
+    def search(self, query: str, limit: int = 10, signatures: bool = False,
+               send_command: Optional[SendCommand] = None) -> List[Dict[str, Any]]:
+        """Components matching query, exact names first, then by relevance.
+
+        With send_command, signatures of the returned components that are not
+        cached yet are fetched from the bridge first.
+        """
+        q = (query or "").strip().lower()
+        terms = re.findall(r"\w+", q)
+        if not terms:
+            return []
+        with self._connect() as conn:
+            rows = []
+            if self.has_fts:
+                # All terms as prefixes first, any term if that finds nothing
+                for joiner in (" ", " OR "):
+                    match = joiner.join('"{0}"*'.format(t) for t in terms)
+                    rows = conn.execute("""
+                        SELECT c.* FROM components_fts JOIN components c ON c.id = components_fts.rowid
+                        WHERE components_fts MATCH ?
+                        ORDER BY lower(c.name) = ? DESC, lower(c.nickname) = ? DESC, c.obsolete,
+                                 bm25(components_fts, ?, ?, ?, ?, ?)
+                        LIMIT ?""", (match, q, q, *FTS_WEIGHTS, limit)).fetchall()
+                    if rows:
+                        break
+            if not rows:
+                like = "%{0}%".format(q)
+                rows = conn.execute("""
+                    SELECT * FROM components
+                    WHERE lower(name) LIKE ? OR lower(nickname) LIKE ? OR lower(description) LIKE ?
+                    ORDER BY lower(name) = ? DESC, lower(nickname) = ? DESC, lower(name) LIKE ? DESC,
+                             obsolete, length(name)
+                    LIMIT ?""", (like, like, like, q, q, like, limit)).fetchall()
+        return [self._row_to_dict(row, signatures) for row in self._with_signatures(rows, send_command)]
+
+    def lookup(self, names: List[str], send_command: Optional[SendCommand] = None) -> Dict[str, Dict[str, Any]]:
+        """Full signatures of components by exact name or nickname (case-insensitive)"""
+        matched = []
+        with self._connect() as conn:
+            for name in names:
+                row = conn.execute("""
+                    SELECT * FROM components WHERE lower(name) = lower(?) OR lower(nickname) = lower(?)
+                    ORDER BY lower(name) = lower(?) DESC, obsolete LIMIT 1""", (name, name, name)).fetchone()
+                if row:
+                    matched.append((name, row))
+        entries = self._with_signatures([row for _, row in matched], send_command)
+        return dict((name, self._row_to_dict(entry, True)) for (name, _), entry in zip(matched, entries))
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_component_catalog() -> ComponentCatalog:
+    """Get or create the shared component catalog"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = ComponentCatalog()
+        return _catalog
@@ -13,6 +13,9 @@ import re
 from urllib3.exceptions import InsecureRequestWarning
 import urllib3
 
+from .ironpython_check import ironpython_error
+from .component_catalog import get_component_catalog
+
 # Disable insecure HTTPS warnings
 urllib3.disable_warnings(InsecureRequestWarning)
 
@@ -475,6 +478,12 @@ def get_grasshopper_connection() -> GrasshopperConnection:
         _grasshopper_connection = GrasshopperConnection()
     return _grasshopper_connection
 
+def _dump_graph(graph: Dict[str, Any], format: str) -> str:
+    """Serialize a graph response; compact graphs skip indentation and whitespace"""
+    if format == "compact":
+        return json.dumps(graph, separators=(",", ":"))
+    return json.dumps(graph, indent=2)
+
 class GrasshopperTools:
     """Collection of tools for interacting with Grasshopper."""
     
@@ -489,11 +498,15 @@ class GrasshopperTools:
         self.app.tool()(self.get_gh_context)
         self.app.tool()(self.get_objects)
         self.app.tool()(self.get_selected)
+        self.app.tool()(self.get_gh_changes)
         self.app.tool()(self.update_script)
         self.app.tool()(self.update_script_with_code_reference)
         self.app.tool()(self.expire_and_get_info)
+        self.app.tool()(self.solve_now)
+        self.app.tool()(self.profile_gh_solution)
         self.app.tool()(self.create_component)
         self.app.tool()(self.search_components)
+        self.app.tool()(self.build_graph)
         self.app.tool()(self.connect_components)
         self.app.tool()(self.disconnect_components)
         self.app.tool()(self.set_component_value)
@@ -581,6 +594,12 @@ class GrasshopperTools:
             if not code or not isinstance(code, str):
                 return "Error: No valid code provided. Please provide Python code to execute."
             
+            # Reject Python 3 only syntax as written, before the result rewrite below
+            compat_error = ironpython_error(code, "Grasshopper")
+            if compat_error:
+                logger.info("Rejected code locally: not IronPython 2.7 compatible")
+                return compat_error
+            
             # Make sure code ends with a result variable if it doesn't have one
             if "result =" not in code and "result=" not in code:
                 # Extract the last line if it starts with "return"
@@ -609,7 +628,7 @@ class GrasshopperTools:
         except Exception as e:
             return f"Error executing code: {str(e)}"
 
-    def get_gh_context(self, ctx: Context, simplified: bool = False) -> str:
+    def get_gh_context(self, ctx: Context, simplified: bool = False, format: str = "full") -> str:
         """Grasshopper: Get current Grasshopper document state and definition graph, sorted by execution order.
         
         Returns a JSON string containing:
@@ -619,6 +638,8 @@ class GrasshopperTools:
         
         Args:
             simplified: When true, returns minimal component info without detailed properties
+            format: "full" (default) or "compact". Compact numbers objects, lists every GUID once in
+                "guids", encodes wires as [source_id, target_id] pairs and omits empty fields
         
         Returns:
             JSON string with grasshopper definition graph
@@ -627,23 +648,27 @@ class GrasshopperTools:
             logger.info("Getting Grasshopper context with simplified={0}".format(simplified))
             connection = get_grasshopper_connection()
             result = connection.send_command("get_context", {
-                "simplified": simplified
+                "simplified": simplified,
+                "format": format
             })
             
             if result.get("status") == "error":
                 return f"Error: {result.get('result', 'Unknown error')}"
-            return json.dumps(result.get("result", {}), indent=2)
+            return _dump_graph(result.get("result", {}), format)
                 
         except Exception as e:
             return f"Error getting context: {str(e)}"
 
-    def get_objects(self, ctx: Context, instance_guids: List[str], simplified: bool = False, context_depth: int = 0) -> str:
+    def get_objects(self, ctx: Context, instance_guids: List[str], simplified: bool = False, context_depth: int = 0,
+                    format: str = "full") -> str:
         """Grasshopper: Get information about specific components by their GUIDs.
         
         Args:
             instance_guids: List of component GUIDs to retrieve
             simplified: When true, returns minimal component info
             context_depth: How many levels of connected components to include (0-3), try to keep it small
+            format: "full" (default) or "compact". Compact numbers objects, lists every GUID once in
+                "guids", encodes wires as [source_id, target_id] pairs and omits empty fields
         
         Returns:
             JSON string with component information and optional context
@@ -654,22 +679,25 @@ class GrasshopperTools:
             result = connection.send_command("get_objects", {
                 "instance_guids": instance_guids,
                 "simplified": simplified,
-                "context_depth": context_depth
+                "context_depth": context_depth,
+                "format": format
             })
             
             if result.get("status") == "error":
                 return f"Error: {result.get('result', 'Unknown error')}"
-            return json.dumps(result.get("result", {}), indent=2)
+            return _dump_graph(result.get("result", {}), format)
                 
         except Exception as e:
             return f"Error getting objects: {str(e)}"
 
-    def get_selected(self, ctx: Context, simplified: bool = False, context_depth: int = 0) -> str:
+    def get_selected(self, ctx: Context, simplified: bool = False, context_depth: int = 0, format: str = "full") -> str:
         """Grasshopper: Get information about currently selected components.
         
         Args:
             simplified: When true, returns minimal component info
             context_depth: How many levels of connected components to include (0-3)
+            format: "full" (default) or "compact". Compact numbers objects, lists every GUID once in
+                "guids", encodes wires as [source_id, target_id] pairs and omits empty fields
         
         Returns:
             JSON string with selected component information and optional context
@@ -679,16 +707,43 @@ class GrasshopperTools:
             connection = get_grasshopper_connection()
             result = connection.send_command("get_selected", {
                 "simplified": simplified,
-                "context_depth": context_depth
+                "context_depth": context_depth,
+                "format": format
             })
             
             if result.get("status") == "error":
                 return f"Error: {result.get('result', 'Unknown error')}"
-            return json.dumps(result.get("result", {}), indent=2)
+            return _dump_graph(result.get("result", {}), format)
                 
         except Exception as e:
             return f"Error getting selected components: {str(e)}"
 
+    def get_gh_changes(self, ctx: Context, since: Optional[int] = None, limit: int = 500) -> str:
+        """Grasshopper: Get what changed in the definition since a revision, instead of re-reading the whole context.
+        
+        The bridge logs added/removed objects, wire changes, runtime message changes,
+        parameter/nickname changes and completed solutions under an increasing revision.
+        Call without since to get the current revision, make your edits, then call again
+        with that revision to see only their effects.
+        
+        Args:
+            since: Revision returned by a previous call; omit to only read the current revision
+            limit: Maximum number of changes to return; when "truncated" is true call again
+                with the returned revision
+        
+        Returns:
+            JSON string with "revision", "complete" and "changes". When "complete" is false,
+            changes after since were dropped from the log and get_gh_context should be used
+        """
+        try:
+            connection = get_grasshopper_connection()
+            result = connection.send_command("get_changes", {"since": since, "limit": limit})
+            if result.get("status") == "error":
+                return f"Error: {result.get('result', 'Unknown error')}"
+            return json.dumps(result.get("result", {}), separators=(",", ":"))
+        except Exception as e:
+            return f"Error getting changes: {str(e)}"
+
     def update_script(self, ctx: Context, instance_guid: str = None, code: str = None, description: str = None, 
                      message_to_user: str = None, param_definitions: List[Dict[str, Any]] = None) -> str:
         """Grasshopper: Update a script component with new code, description, user feedback message, and optionally redefine its parameters.
@@ -930,6 +985,51 @@ class GrasshopperTools:
         except Exception as e:
             return f"Error updating script with code reference: {str(e)}"
 
+    def solve_now(self, ctx: Context, expire_all: bool = False) -> str:
+        """Grasshopper: Solve the definition immediately.
+        
+        Edits (connections, values, states, script updates) only mark components as expired and
+        schedule one solution shortly afterwards. Call this to get up-to-date results and runtime
+        messages right away, e.g. before reading the context after a series of edits.
+        
+        Args:
+            expire_all: Recompute every component, not just the expired ones (default false)
+        
+        Returns:
+            JSON with the solve duration and the number of components with errors/warnings
+        """
+        try:
+            connection = get_grasshopper_connection()
+            result = connection.send_command("solve_now", {"expire_all": expire_all})
+            if result.get("status") == "error":
+                return f"Error: {result.get('result', 'Unknown error')}"
+            return json.dumps(result.get("result", {}), indent=2)
+        except Exception as e:
+            return f"Error solving: {str(e)}"
+
+    def profile_gh_solution(self, ctx: Context, top: int = 20) -> str:
+        """Grasshopper: Recompute the whole definition and report which components take the most time.
+        
+        Forces a full solution, then ranks components by their processor time and follows the
+        wires upstream to find the slowest chain (critical path). Use it to decide which
+        components to optimize, replace or disable. Large definitions can take a while to solve.
+        
+        Args:
+            top: Number of hotspots to return (default 20)
+        
+        Returns:
+            JSON with total and wall-clock solve time, "hotspots" (ms, percent, cumulative_ms along the
+            slowest upstream chain, output data count, runtime message level) and "critical_path"
+        """
+        try:
+            connection = get_grasshopper_connection()
+            result = connection.send_command("profile_solution", {"top": top})
+            if result.get("status") == "error":
+                return f"Error: {result.get('result', 'Unknown error')}"
+            return json.dumps(result.get("result", {}), indent=2)
+        except Exception as e:
+            return f"Error profiling solution: {str(e)}"
+
     def expire_and_get_info(self, ctx: Context, instance_guid: str) -> str:
         """Grasshopper: Expire a specific component and get its updated information.
 
@@ -996,30 +1096,81 @@ class GrasshopperTools:
             limit: Max results (default 10)
             
         Returns:
-            JSON list of matching components with names and categories
+            JSON list of matching components with names, categories and input/output names, best match first
         """
         try:
             connection = get_grasshopper_connection()
-            result = connection.send_command("search_components", {
-                "query": query,
-                "limit": limit
-            })
+            # Answer from the local catalog when it has been pulled; it refreshes in the background
+            catalog = get_component_catalog()
+            if catalog.is_ready():
+                catalog.refresh_async(connection.send_command)
+                return json.dumps(catalog.search(query, limit, send_command=connection.send_command), indent=2)
+            
+            # Cold cache: ask the bridge's in-memory index first and only then start
+            # the pull, so this search does not queue behind catalog pages
+            try:
+                result = connection.send_command("search_components", {
+                    "query": query,
+                    "limit": limit
+                })
+            finally:
+                catalog.refresh_async(connection.send_command)
             if result.get("status") == "error":
                 return f"Error: {result.get('result', 'Unknown error')}"
             return json.dumps(result.get("result", []), indent=2)
         except Exception as e:
             return f"Error searching components: {str(e)}"
 
-    def connect_components(self, ctx: Context, source_id: str, source_param: str, target_id: str, target_param: str) -> str:
+    def build_graph(self, ctx: Context, components: List[Dict[str, Any]], connections: Optional[List[Dict[str, Any]]] = None,
+                    values: Optional[List[Dict[str, Any]]] = None, solve: bool = True) -> str:
+        """Grasshopper: Create many components, wires and values in one step with a single solution.
+        
+        Much faster than separate create_component / connect_components / set_component_value
+        calls: everything is applied in one UI action and the definition is solved once at the
+        end. If anything fails, the created components and wires are removed again. The
+        "components" and "connections" of a get_available_patterns recipe can be passed as-is.
+        
+        Args:
+            components: List of {"alias": "pt", "name": "Construct Point", "x": 100, "y": 200, "value": ...}.
+                "id"/"type"/"settings" are accepted for "alias"/"name"/"value". x/y are optional.
+            connections: List of {"source": "pt", "sourceParam": "Pt", "target": "move", "targetParam": "G"}.
+                source/target are aliases from components or GUIDs of existing objects; params are
+                names, nicknames or index strings.
+            values: List of {"target": alias or GUID, "value": ...} for sliders, panels and toggles.
+                A slider value can be a number or {"min": 0, "max": 10, "value": 5, "decimals": 2}.
+            solve: Run one solution at the end (default true)
+        
+        Returns:
+            JSON with the alias -> GUID map, counts and runtime messages of the new components (only when solved)
+        """
+        try:
+            connection = get_grasshopper_connection()
+            result = connection.send_command("build_graph", {
+                "components": components,
+                "connections": connections or [],
+                "values": values or [],
+                "solve": solve
+            })
+            if result.get("status") == "error":
+                return f"Error: {result.get('result', 'Unknown error')}"
+            return json.dumps(result.get("result", {}), indent=2)
+        except Exception as e:
+            return f"Error building graph: {str(e)}"
+
+    def connect_components(self, ctx: Context, source_id: str, source_param: str, target_id: str, target_param: str,
+                           solve: bool = False) -> str:
         """Grasshopper: Connect two components.
         
         Connects an output parameter of the source component to an input parameter of the target component.
+        The definition is re-solved shortly afterwards, once for a burst of edits; pass solve=True
+        (or call solve_now) to solve immediately and get the target's runtime messages.
         
         Args:
             source_id: Instance GUID of the source component
             source_param: Name (or NickName) of the output parameter on source (e.g. "Result", "C", "Output"). Can also be an index string "0".
             target_id: Instance GUID of the target component
             target_param: Name (or NickName) of the input parameter on target (e.g. "Radius", "A", "Input"). Can also be an index string "0".
+            solve: Solve the definition before returning (default false)
             
         Returns:
             Result message indicating success or failure
@@ -1030,7 +1181,8 @@ class GrasshopperTools:
                 "source_id": source_id,
                 "source_param": source_param,
                 "target_id": target_id,
-                "target_param": target_param
+                "target_param": target_param,
+                "solve": solve
             })
             if result.get("status") == "error":
                 return f"Error: {result.get('result', 'Unknown error')}"
@@ -1231,13 +1383,39 @@ class GrasshopperTools:
         except Exception as e:
             return f"Error baking objects: {str(e)}"
 
-    def get_available_patterns(self, ctx: Context) -> str:
+    def get_available_patterns(self, ctx: Context, query: Optional[str] = None, limit: int = 20) -> str:
         """Grasshopper: Get a list of available patterns (recipes) for creating common Grasshopper definitions.
         
         These patterns provide templates for creating complex component networks.
-        Each pattern includes a list of components and their connections.
+        Each pattern includes a list of components and their connections. Component
+        signatures come from the locally cached catalog of installed components when
+        it is available, so parameter names match this Grasshopper installation.
+        
+        Args:
+            query: Optional keyword; also returns catalog components matching it with full signatures
+            limit: Max catalog components returned for query (default 20)
         
         Returns:
             JSON string containing available patterns
         """
-        return json.dumps(GH_PATTERNS, indent=2)
+        send_command = get_grasshopper_connection().send_command
+        catalog = get_component_catalog()
+        catalog.refresh_async(send_command)
+        if not catalog.is_ready():
+            return json.dumps(GH_PATTERNS, indent=2)
+        
+        try:
+            names = [c["name"] for c in GH_PATTERNS["components"]]
+            found = catalog.lookup(names, send_command=send_command)
+            patterns = {
+                # Keep the built-in entry where the installed signature could not be loaded
+                "components": [found[c["name"]] if "inputs" in found.get(c["name"], {}) else c
+                               for c in GH_PATTERNS["components"]],
+                "patterns": GH_PATTERNS["patterns"],
+            }
+            if query:
+                patterns["matches"] = catalog.search(query, limit, signatures=True, send_command=send_command)
+            return json.dumps(patterns, indent=2)
+        except Exception as e:
+            logger.warning("Component catalog lookup failed: {0}".format(str(e)))
+            return json.dumps(GH_PATTERNS, indent=2)
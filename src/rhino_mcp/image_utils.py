@@ -0,0 +1,259 @@
+"""Helpers for fitting captured images into byte and token budgets and for depth/normal control images."""
+import io
+import math
+import base64
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+from PIL import Image as PILImage
+
+# Configure logging
+logger = logging.getLogger("ImageUtils")
+
+# Vision models bill roughly one token per 750 pixels
+PIXELS_PER_TOKEN = 750
+
+# Quality search range and the quality used while searching for a resolution
+MIN_QUALITY = 30
+MAX_QUALITY = 90
+RESIZE_SEARCH_QUALITY = 60
+
+# Never shrink the longest side below this many pixels
+MIN_SIDE = 128
+
+# Encoders we support, mapped to their Pillow format names
+SUPPORTED_FORMATS = {
+    "jpeg": "JPEG",
+    "webp": "WEBP",
+}
+
+# Shared pool so that multi-view captures are encoded concurrently
+_encode_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="image-encode")
+
+
+def get_encode_pool() -> ThreadPoolExecutor:
+    """Get the thread pool used for image encoding"""
+    return _encode_pool
+
+
+def estimate_tokens(width: int, height: int) -> int:
+    """Estimate how many model tokens an image of the given size costs"""
+    return int(math.ceil((width * height) / float(PIXELS_PER_TOKEN)))
+
+
+def _encode(img: PILImage.Image, pil_format: str, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    if pil_format == "JPEG":
+        img.save(buffer, format=pil_format, quality=quality, optimize=True)
+    else:
+        img.save(buffer, format=pil_format, quality=quality, method=4)
+    return buffer.getvalue()
+
+
+def _resize(img: PILImage.Image, scale: float) -> PILImage.Image:
+    if scale >= 1.0:
+        return img
+    new_size = (max(1, int(img.width * scale)), max(1, int(img.height * scale)))
+    return img.resize(new_size, PILImage.Resampling.LANCZOS)
+
+
+def _best_quality(img: PILImage.Image, pil_format: str, max_bytes: int,
+                  low: int = MIN_QUALITY, high: int = MAX_QUALITY) -> Tuple[Optional[int], Optional[bytes]]:
+    """Binary search the highest quality whose encoding fits in max_bytes"""
+    best_quality, best_data = None, None
+    while low <= high:
+        quality = (low + high) // 2
+        data = _encode(img, pil_format, quality)
+        if len(data) <= max_bytes:
+            best_quality, best_data = quality, data
+            low = quality + 1
+        else:
+            high = quality - 1
+    return best_quality, best_data
+
+
+def encode_to_budget(image_bytes: bytes, max_bytes: Optional[int] = None, max_tokens: Optional[int] = None,
+                     image_format: str = "jpeg") -> Tuple[bytes, Dict[str, Any]]:
+    """Re-encode an image so that it fits a byte and/or token budget.
+
+    The token budget caps the resolution directly. The byte budget is met by
+    binary searching the encoder quality first and, if even the lowest quality
+    is too large, binary searching the resolution as well.
+
+    Args:
+        image_bytes: Encoded source image (any format Pillow can read)
+        max_bytes: Optional maximum size of the encoded image in bytes
+        max_tokens: Optional maximum number of vision tokens the image may cost
+        image_format: Output format, "jpeg" or "webp"
+
+    Returns:
+        Tuple of (encoded bytes, metadata dict describing the chosen settings)
+    """
+    fmt = (image_format or "jpeg").lower()
+    if fmt == "jpg":
+        fmt = "jpeg"
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError("Unsupported image format: {0}. Use one of {1}".format(image_format, sorted(SUPPORTED_FORMATS)))
+    pil_format = SUPPORTED_FORMATS[fmt]
+
+    img = PILImage.open(io.BytesIO(image_bytes))
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    source_size = (img.width, img.height)
+
+    # Token budget limits the pixel count
+    scale = 1.0
+    if max_tokens:
+        max_pixels = max_tokens * PIXELS_PER_TOKEN
+        if img.width * img.height > max_pixels:
+            scale = math.sqrt(max_pixels / float(img.width * img.height))
+    min_scale = min(1.0, MIN_SIDE / float(max(img.width, img.height)))
+    scale = max(scale, min_scale)
+
+    working = _resize(img, scale)
+    fits = True
+
+    if max_bytes:
+        quality, data = _best_quality(working, pil_format, max_bytes)
+        if data is None:
+            # Even the lowest quality is too large, so search for the largest resolution that fits
+            low, high = min_scale, scale
+            best_scale, best = None, None
+            for _ in range(8):
+                mid = (low + high) / 2.0
+                candidate = _resize(img, mid)
+                candidate_data = _encode(candidate, pil_format, RESIZE_SEARCH_QUALITY)
+                if len(candidate_data) <= max_bytes:
+                    best_scale, best = mid, candidate
+                    low = mid
+                else:
+                    high = mid
+            if best is None:
+                best_scale, best = min_scale, _resize(img, min_scale)
+            scale, working = best_scale, best
+            quality, data = _best_quality(working, pil_format, max_bytes)
+            if data is None:
+                # Nothing fits, return the smallest encoding we can produce
+                quality = MIN_QUALITY
+                data = _encode(working, pil_format, quality)
+                fits = False
+    else:
+        quality = MAX_QUALITY if fmt == "webp" else 85
+        data = _encode(working, pil_format, quality)
+
+    # MIN_SIDE can keep the image above the token budget
+    if max_tokens and estimate_tokens(working.width, working.height) > max_tokens:
+        fits = False
+
+    metadata = {
+        "format": fmt,
+        "width": working.width,
+        "height": working.height,
+        "source_width": source_size[0],
+        "source_height": source_size[1],
+        "scale": round(min(scale, 1.0), 4),
+        "quality": quality,
+        "bytes": len(data),
+        "estimated_tokens": estimate_tokens(working.width, working.height),
+        "fits_budget": fits,
+    }
+    if not fits:
+        logger.warning("Image could not be fitted into the budget (max_bytes={0}, max_tokens={1}), returning {2} bytes, ~{3} tokens".format(
+            max_bytes, max_tokens, len(data), metadata["estimated_tokens"]))
+    return data, metadata
+
+
+def decode_depth(result: Dict[str, Any]) -> np.ndarray:
+    """Decode a capture_depth response into a float32 array of raw Z-buffer values in [0, 1]"""
+    width, height = int(result["width"]), int(result["height"])
+    data = base64.b64decode(result["data"])
+    if result.get("encoding") == "float32":
+        return np.frombuffer(data, dtype="<f4").reshape(height, width).astype(np.float32)
+    img = PILImage.open(io.BytesIO(data)).convert("L")
+    return np.asarray(img, dtype=np.float32) / 255.0
+
+
+def normalize_depth(depth: np.ndarray, near: Optional[float] = None, far: Optional[float] = None,
+                    is_perspective: bool = False, invert: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """Linearize and normalize raw Z-buffer values.
+
+    Background pixels (at the far plane) are excluded from the range. With
+    invert, near surfaces are white and the background black, which is what
+    depth-conditioned diffusion models expect.
+
+    Returns:
+        Tuple of (normalized depth in [0, 1], foreground mask)
+    """
+    foreground = depth < 0.9999
+    linear = depth
+    if is_perspective and near and far and far > near:
+        # Perspective Z-buffers are hyperbolic in distance
+        linear = (near * far) / (far - depth * (far - near))
+
+    normalized = np.ones_like(linear, dtype=np.float32)
+    if foreground.any():
+        lo, hi = float(linear[foreground].min()), float(linear[foreground].max())
+        span = hi - lo if hi > lo else 1.0
+        normalized[foreground] = (linear[foreground] - lo) / span
+    if invert:
+        normalized = 1.0 - normalized
+    return normalized, foreground
+
+
+def depth_to_png(normalized: np.ndarray, bits: int = 16) -> bytes:
+    """Encode a normalized depth map as an 8 or 16-bit grayscale PNG"""
+    clipped = np.clip(normalized, 0.0, 1.0)
+    if bits >= 16:
+        img = PILImage.fromarray((clipped * 65535.0 + 0.5).astype(np.uint16))
+    else:
+        img = PILImage.fromarray((clipped * 255.0 + 0.5).astype(np.uint8), mode="L")
+    buffer = io.BytesIO()
+    img.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def depth_to_normal_png(distance: np.ndarray, foreground: np.ndarray) -> bytes:
+    """Derive a screen-space normal map (RGB = X right, Y up, Z to camera) from a depth map.
+
+    distance must grow away from the camera (i.e. a non-inverted normalized depth).
+    """
+    height, width = distance.shape
+    # Treat the depth range as roughly half the image width so slopes are comparable to pixels
+    strength = max(width, height) * 0.5
+    dzdy, dzdx = np.gradient(distance.astype(np.float32))
+    normals = np.dstack((dzdx * strength, -dzdy * strength, np.ones_like(distance, dtype=np.float32)))
+    normals /= np.linalg.norm(normals, axis=2, keepdims=True)
+    normals[~foreground] = (0.0, 0.0, 1.0)
+    rgb = ((normals + 1.0) * 127.5 + 0.5).astype(np.uint8)
+    buffer = io.BytesIO()
+    PILImage.fromarray(rgb, mode="RGB").save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def build_depth_images(result: Dict[str, Any], bits: int = 16, include_normals: bool = False,
+                       invert: bool = True) -> Tuple[bytes, Optional[bytes], Dict[str, Any]]:
+    """Turn a capture_depth response into a depth PNG and optional normal map PNG.
+
+    Returns:
+        Tuple of (depth PNG bytes, normal PNG bytes or None, metadata dict)
+    """
+    raw = decode_depth(result)
+    distance, foreground = normalize_depth(raw, result.get("near"), result.get("far"),
+                                           bool(result.get("is_perspective")), invert=False)
+    depth_png = depth_to_png(1.0 - distance if invert else distance, bits)
+    normal_png = depth_to_normal_png(distance, foreground) if include_normals else None
+
+    metadata = {
+        "view": result.get("view"),
+        "width": int(result["width"]),
+        "height": int(result["height"]),
+        "source_encoding": result.get("encoding"),
+        "bits": 16 if bits >= 16 else 8,
+        "inverted": invert,
+        "coverage": round(float(foreground.mean()), 4),
+        "depth_bytes": len(depth_png),
+    }
+    if normal_png is not None:
+        metadata["normal_bytes"] = len(normal_png)
+    return depth_png, normal_png, metadata
@@ -0,0 +1,224 @@
+"""Local IronPython 2.7 compatibility check for code sent to Rhino and Grasshopper.
+
+Rhino 7 and Grasshopper run scripts with IronPython 2.7, so Python 3 only syntax
+fails there after a full round trip. This module finds the common offenders
+locally with tokenize and a few AST rules so the tools can reject the code with
+precise positions before it is sent.
+"""
+import ast
+import io
+import logging
+import tokenize
+from typing import Dict, List, Optional
+
+logger = logging.getLogger("IronPythonCheck")
+
+# print() keywords that need `from __future__ import print_function` in Python 2.7
+PRINT_FUNCTION_KEYWORDS = {"sep", "end", "file", "flush"}
+
+# Issues reported back to the caller at most
+MAX_REPORTED_ISSUES = 10
+
+
+def _issue(line: int, col: int, message: str) -> Dict[str, object]:
+    return {"line": line, "col": col, "message": message}
+
+
+def _token_issues(code: str) -> List[Dict[str, object]]:
+    """Find Python 3 only syntax visible at the token level"""
+    issues = []
+    fstring_start = getattr(tokenize, "FSTRING_START", None)
+    try:
+        for tok in tokenize.generate_tokens(io.StringIO(code).readline):
+            line, col = tok.start[0], tok.start[1] + 1
+            if tok.type == fstring_start or (tok.type == tokenize.STRING and _is_fstring(tok.string)):
+                issues.append(_issue(line, col, 'f-strings are not supported, use "{0}".format(value) instead'))
+            elif tok.type == tokenize.OP and tok.string == ":=":
+                issues.append(_issue(line, col, "assignment expressions (:=) are not supported"))
+            elif tok.type == tokenize.OP and tok.string == "->":
+                issues.append(_issue(line, col, "return type annotations are not supported"))
+            elif tok.type == tokenize.OP and tok.string == "@=":
+                issues.append(_issue(line, col, "the matrix multiplication operator (@=) is not supported"))
+            elif tok.type == tokenize.NUMBER and "_" in tok.string:
+                issues.append(_issue(line, col, "underscores in numeric literals are not supported"))
+    except (tokenize.TokenError, IndentationError, SyntaxError) as e:
+        # Leave real syntax errors to the interpreter in Rhino
+        logger.debug("Tokenizing stopped early: {0}".format(str(e)))
+    return issues
+
+
+def _is_fstring(token: str) -> bool:
+    prefix = ""
+    for char in token:
+        if char in "'\"":
+            break
+        prefix += char
+    return "f" in prefix.lower()
+
+
+class _Py3SyntaxVisitor(ast.NodeVisitor):
+    """Collect Python 3 only constructs that tokens alone cannot identify"""
+
+    def __init__(self, print_function: bool):
+        self.issues = []
+        self.print_function = print_function
+        # ids of `...` nodes in subscripts, the only place Python 2 accepts them
+        self.slice_ellipses = set()
+
+    def _add(self, node: ast.AST, message: str):
+        self.issues.append(_issue(node.lineno, node.col_offset + 1, message))
+
+    def _check_arguments(self, node: ast.AST, args: ast.arguments):
+        for arg in args.args + args.kwonlyargs + getattr(args, "posonlyargs", []):
+            if arg.annotation is not None:
+                self._add(arg, "type hints on arguments are not supported")
+        for arg in (args.vararg, args.kwarg):
+            if arg is not None and arg.annotation is not None:
+                self._add(arg, "type hints on arguments are not supported")
+        if args.kwonlyargs:
+            self._add(node, "keyword-only arguments are not supported")
+        if getattr(args, "posonlyargs", None):
+            self._add(node, "positional-only arguments (/) are not supported")
+
+    def visit_FunctionDef(self, node):
+        self._check_arguments(node, node.args)
+        self.generic_visit(node)
+
+    def visit_Lambda(self, node):
+        self._check_arguments(node, node.args)
+        self.generic_visit(node)
+
+    def visit_AsyncFunctionDef(self, node):
+        self._add(node, "async functions are not supported")
+        self.generic_visit(node)
+
+    def visit_AsyncFor(self, node):
+        self._add(node, "async for is not supported")
+        self.generic_visit(node)
+
+    def visit_AsyncWith(self, node):
+        self._add(node, "async with is not supported")
+        self.generic_visit(node)
+
+    def visit_Await(self, node):
+        self._add(node, "await is not supported")
+        self.generic_visit(node)
+
+    def visit_AnnAssign(self, node):
+        self._add(node, "variable annotations are not supported")
+        self.generic_visit(node)
+
+    def visit_Nonlocal(self, node):
+        self._add(node, "nonlocal is not supported, use a mutable container instead")
+
+    def visit_Raise(self, node):
+        if node.cause is not None:
+            self._add(node, "raise ... from ... is not supported")
+        self.generic_visit(node)
+
+    def visit_YieldFrom(self, node):
+        self._add(node, "yield from is not supported")
+        self.generic_visit(node)
+
+    def visit_BinOp(self, node):
+        if isinstance(node.op, ast.MatMult):
+            self._add(node, "the matrix multiplication operator (@) is not supported")
+        self.generic_visit(node)
+
+    def visit_Starred(self, node):
+        # Starred nodes inside calls are handled in visit_Call
+        if isinstance(node.ctx, ast.Store):
+            self._add(node, "extended unpacking (a, *b = ...) is not supported")
+        else:
+            self._add(node, "star unpacking in literals is not supported")
+        self.visit(node.value)
+
+    def visit_Dict(self, node):
+        if any(key is None for key in node.keys):
+            self._add(node, "dict unpacking ({**a}) is not supported")
+        self.generic_visit(node)
+
+    def visit_ClassDef(self, node):
+        if node.keywords:
+            self._add(node, "class keywords (e.g. metaclass=) are not supported, use __metaclass__")
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        starred = [arg for arg in node.args if isinstance(arg, ast.Starred)]
+        if len(starred) > 1 or (starred and node.args[-1] is not starred[-1]):
+            self._add(node, "only one *args at the end of the positional arguments is supported")
+        if len([kw for kw in node.keywords if kw.arg is None]) > 1:
+            self._add(node, "only one **kwargs per call is supported")
+        if (not self.print_function and isinstance(node.func, ast.Name) and node.func.id == "print"
+                and any(kw.arg in PRINT_FUNCTION_KEYWORDS for kw in node.keywords)):
+            self._add(node, "print() keywords need `from __future__ import print_function`")
+
+        self.visit(node.func)
+        for arg in node.args:
+            self.visit(arg.value if isinstance(arg, ast.Starred) else arg)
+        for kw in node.keywords:
+            self.visit(kw.value)
+
+    def visit_Subscript(self, node):
+        items = node.slice.elts if isinstance(node.slice, ast.Tuple) else [node.slice]
+        for item in items:
+            if isinstance(item, ast.Constant) and item.value is Ellipsis:
+                self.slice_ellipses.add(id(item))
+        self.generic_visit(node)
+
+    def visit_Constant(self, node):
+        if node.value is Ellipsis and id(node) not in self.slice_ellipses:
+            self._add(node, "... is only supported inside subscripts, use pass or None instead")
+
+    def visit_Match(self, node):
+        self._add(node, "match statements are not supported")
+        self.generic_visit(node)
+
+
+def _has_print_function(tree: ast.AST) -> bool:
+    for node in tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module == "__future__":
+            if any(alias.name == "print_function" for alias in node.names):
+                return True
+    return False
+
+
+def check_ironpython_code(code: str) -> List[Dict[str, object]]:
+    """Check code for syntax that IronPython 2.7 rejects.
+
+    Valid Python 2 code (print statements, exec statements, ...) may not parse
+    as Python 3; in that case only the token-level checks are applied.
+
+    Returns:
+        List of issues with 1-based line/col and a message, sorted by position
+    """
+    issues = _token_issues(code)
+    try:
+        tree = ast.parse(code)
+    except (SyntaxError, ValueError):
+        tree = None
+    if tree is not None:
+        visitor = _Py3SyntaxVisitor(_has_print_function(tree))
+        visitor.visit(tree)
+        issues.extend(visitor.issues)
+
+    unique = {}
+    for issue in issues:
+        unique.setdefault((issue["line"], issue["col"], issue["message"]), issue)
+    return sorted(unique.values(), key=lambda i: (i["line"], i["col"]))
+
+
+def format_issues(issues: List[Dict[str, object]], target: str = "Rhino") -> str:
+    """Format issues as the error string returned by the tools"""
+    lines = ["Error: Code is not IronPython 2.7 compatible (nothing was sent to {0}):".format(target)]
+    for issue in issues[:MAX_REPORTED_ISSUES]:
+        lines.append("  line {0}, col {1}: {2}".format(issue["line"], issue["col"], issue["message"]))
+    if len(issues) > MAX_REPORTED_ISSUES:
+        lines.append("  ... and {0} more".format(len(issues) - MAX_REPORTED_ISSUES))
+    return "\n".join(lines)
+
+
+def ironpython_error(code: str, target: str = "Rhino") -> Optional[str]:
+    """Return a formatted error if code is not IronPython 2.7 compatible, else None"""
+    issues = check_ironpython_code(code)
+    return format_issues(issues, target) if issues else None
@@ -3,11 +3,15 @@ import os
 import requests
 import base64
 import io
-import time
+import json
+import asyncio
 import logging
+from typing import Optional
 from mcp.server.fastmcp import Context, Image
 from PIL import Image as PILImage
 
+from .image_utils import build_depth_images, encode_to_budget, get_encode_pool
+
 logger = logging.getLogger("ReplicateTools")
 
 class ReplicateTools:
@@ -18,43 +22,71 @@ class ReplicateTools:
             logger.warning("No Replicate API token found in environment")
         self.app.tool()(self.render_rhino_scene)
     
-    def render_rhino_scene(self, ctx: Context, prompt: str) -> Image:
+    async def render_rhino_scene(self, ctx: Context, prompt: str, max_bytes: Optional[int] = None,
+                                 max_tokens: Optional[int] = None, image_format: str = "jpeg",
+                                 control_mode: str = "depth", control_size: int = 1024):
         """Transform Rhino viewport with AI using the given prompt, ensure to display the result image in chat afterwads"
         
         Args:
             prompt: A prompt to guide the rendering of the scene
+            max_bytes: Optional byte budget for the returned image
+            max_tokens: Optional vision token budget for the returned image
+            image_format: Output format when a budget is given, "jpeg" (default) or "webp"
+            control_mode: "depth" (default) sends a Z-buffer depth map of the active view as control image,
+                "shaded" sends the shaded viewport capture and lets the model estimate depth itself
+            control_size: Longest side of the control image in pixels (default 1024, the model's native size)
         
         Returns:
-            An MCP Image object containing the rendered scene
+            An MCP Image object containing the rendered scene. When a budget is given,
+            a list of the image and a JSON text entry with the chosen size/quality.
         """
         try:
             # Get Rhino viewport image
             from .rhino_tools import get_rhino_connection
             connection = get_rhino_connection()
-            result = connection.send_command("capture_viewport", {
-                "layer": None, 
-                "show_annotations": False,
-                "max_size": 800
-            })
-            
-            if result.get("type") != "image":
-                return "Error: Failed to capture viewport"
+            loop = asyncio.get_running_loop()
+            if control_mode == "depth":
+                result = await asyncio.to_thread(connection.send_command, "capture_depth", {
+                    "view": "Active",
+                    "max_size": control_size,
+                    # Rhino's 8-bit Z-buffer image is captured in one call; 16-bit reads every pixel
+                    "precision": 8,
+                    "multiple_of": 16
+                })
+                if result.get("status") == "error":
+                    return "Error: Failed to capture depth map: {0}".format(result.get("message", "Unknown error"))
+                depth_png, _, _ = await loop.run_in_executor(get_encode_pool(), build_depth_images, result, 8)
+                control_image = "data:image/png;base64,{0}".format(base64.b64encode(depth_png).decode("ascii"))
+            else:
+                result = await asyncio.to_thread(connection.send_command, "capture_viewport", {
+                    "layer": None, 
+                    "show_annotations": False,
+                    "max_size": control_size,
+                    "view": "Active"
+                })
+                if result.get("type") == "image":
+                    base64_data = result["source"]["data"]
+                elif result.get("type") == "multi_image" and result.get("images"):
+                    base64_data = result["images"][0]["data"]
+                else:
+                    return "Error: Failed to capture viewport"
+                control_image = f"data:image/jpeg;base64,{base64_data}"
                 
-            # Get base64 data and prepare request
-            base64_data = result["source"]["data"]
+            # Prepare request
             headers = {
                 "Authorization": f"Token {self.api_token}",
                 "Content-Type": "application/json",
             }
             
             # Start prediction
-            response = requests.post(
+            response = await asyncio.to_thread(
+                requests.post,
                 "https://api.replicate.com/v1/predictions",
                 json={
                     "version": "black-forest-labs/flux-depth-dev",
                     "input": {
                         "prompt": prompt,
-                        "control_image": f"data:image/jpeg;base64,{base64_data}"
+                        "control_image": control_image
                     }
                 },
                 headers=headers
@@ -64,8 +96,8 @@ class ReplicateTools:
             
             # Poll until complete (max 60 seconds)
             for _ in range(30):
-                time.sleep(2)
-                response = requests.get(prediction_url, headers=headers)
+                await asyncio.sleep(2)
+                response = await asyncio.to_thread(requests.get, prediction_url, headers=headers)
                 prediction = response.json()
                 
                 # Check if complete
@@ -76,7 +108,14 @@ class ReplicateTools:
                         image_url = image_url[0]
                         
                     # Download and convert to MCP Image
-                    image_data = requests.get(image_url).content
+                    image_data = (await asyncio.to_thread(requests.get, image_url)).content
+                    
+                    if max_bytes or max_tokens:
+                        encoded, metadata = await loop.run_in_executor(
+                            get_encode_pool(), encode_to_budget, image_data, max_bytes, max_tokens, image_format
+                        )
+                        return [Image(data=encoded, format=metadata["format"]), json.dumps(metadata)]
+                    
                     img = PILImage.open(io.BytesIO(image_data))
                     
                     # Resize to max 800px while maintaining aspect ratio
@@ -3,18 +3,31 @@ from mcp.server.fastmcp import FastMCP, Context, Image
 import logging
 from dataclasses import dataclass
 from contextlib import asynccontextmanager
-from typing import AsyncIterator, Dict, Any, List, Optional, Union
+from typing import AsyncIterator, Callable, Dict, Any, List, Optional, Tuple, Union
 import json
 import socket
+import threading
 import time
 import base64
 import io
+import asyncio
+import functools
 from PIL import Image as PILImage
 
+from .image_utils import build_depth_images, encode_to_budget, get_encode_pool
+from .ironpython_check import ironpython_error
+
 
 # Configure logging
 logger = logging.getLogger("RhinoTools")
 
+class RhinoTimeoutError(Exception):
+    """Raised when a streamed command goes silent for too long, keeping the frames received so far"""
+    
+    def __init__(self, message: str, frames: Optional[List[Dict[str, Any]]] = None):
+        super().__init__(message)
+        self.frames = frames or []
+
 class RhinoConnection:
     def __init__(self, host='localhost', port=9876):
         self.host = host
@@ -22,6 +35,7 @@ class RhinoConnection:
         self.socket = None
         self.timeout = 30.0  # 30 second timeout
         self.buffer_size = 14485760  # 10MB buffer size for handling large images
+        self._lock = threading.RLock()  # One command at a time on the shared socket
     
     def connect(self):
         """Connect to the Rhino script's socket server"""
@@ -47,6 +61,10 @@ class RhinoConnection:
     
     def send_command(self, command_type: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
         """Send a command to the Rhino script and wait for response"""
+        with self._lock:
+            return self._send_command(command_type, params)
+    
+    def _send_command(self, command_type: str, params: Dict[str, Any] = None) -> Dict[str, Any]:
         if self.socket is None:
             self.connect()
         
@@ -107,8 +125,72 @@ class RhinoConnection:
             self.disconnect()  # Disconnect on error to force reconnection
             raise
 
-# Global connection instance
+    def send_command_stream(self, command_type: str, params: Dict[str, Any] = None,
+                            on_frame: Optional[Callable[[Dict[str, Any]], None]] = None,
+                            raise_on_error: bool = True) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """Send a command in streaming mode and collect its frames.
+        
+        Rhino answers with newline-delimited JSON: zero or more frames
+        ({"type": "frame", ...}) followed by the final response. on_frame is
+        called for every frame as it arrives. The timeout applies to silence
+        between messages, so long commands survive as long as they keep
+        streaming; on timeout RhinoTimeoutError carries the frames received.
+        With raise_on_error False an error response is returned instead of raised.
+        The connection stays locked for the whole stream, so tools must call this
+        (and send_command) through asyncio.to_thread, never on the event loop.
+        
+        Returns:
+            Tuple of (final response, list of frames)
+        """
+        with self._lock:
+            if self.socket is None:
+                self.connect()
+            
+            frames = []
+            try:
+                command = {
+                    "type": command_type,
+                    "params": dict(params or {}, stream=True)
+                }
+                command_json = json.dumps(command)
+                logger.info("Sending streaming command: {0}".format(command_type))
+                self.socket.sendall(command_json.encode('utf-8'))
+                
+                buffer = b''
+                while True:
+                    try:
+                        data = self.socket.recv(self.buffer_size)
+                    except socket.timeout:
+                        raise RhinoTimeoutError(
+                            "No response from Rhino for {0} seconds".format(self.timeout), frames)
+                    if not data:
+                        raise Exception("Connection closed by Rhino script")
+                    buffer += data
+                    
+                    while b"\n" in buffer:
+                        line, buffer = buffer.split(b"\n", 1)
+                        if not line.strip():
+                            continue
+                        message = json.loads(line.decode('utf-8'))
+                        if message.get("type") == "frame":
+                            frames.append(message)
+                            if on_frame:
+                                on_frame(message)
+                            continue
+                        
+                        if message.get("status") == "error" and raise_on_error:
+                            raise Exception(message.get("message", "Unknown error from Rhino"))
+                        return message, frames
+                        
+            except Exception as e:
+                logger.error("Error communicating with Rhino script: {0}".format(str(e)))
+                self.disconnect()  # Drop any unread frames by forcing reconnection
+                raise
+
+# Global connection instances
 _rhino_connection = None
+_rhino_background_connection = None
+_rhino_job_connection = None
 
 def get_rhino_connection() -> RhinoConnection:
     """Get or create the Rhino connection"""
@@ -117,6 +199,29 @@ def get_rhino_connection() -> RhinoConnection:
         _rhino_connection = RhinoConnection()
     return _rhino_connection
 
+def get_rhino_background_connection() -> RhinoConnection:
+    """Get or create the connection used for background executions.
+    
+    Background code runs on the bridge's client thread, so it gets its own socket
+    and does not hold up commands sent over the main connection.
+    """
+    global _rhino_background_connection
+    if _rhino_background_connection is None:
+        _rhino_background_connection = RhinoConnection()
+    return _rhino_background_connection
+
+def get_rhino_job_connection() -> RhinoConnection:
+    """Get or create the connection used for job control.
+    
+    Job commands are answered on the bridge's client thread, so a dedicated socket
+    lets status polls and cancellations through while the main connection is busy
+    streaming another command.
+    """
+    global _rhino_job_connection
+    if _rhino_job_connection is None:
+        _rhino_job_connection = RhinoConnection()
+    return _rhino_job_connection
+
 class RhinoTools:
     """Collection of tools for interacting with Rhino."""
     
@@ -130,9 +235,19 @@ class RhinoTools:
         self.app.tool()(self.get_layers)
         self.app.tool()(self.get_scene_objects_with_metadata)
         self.app.tool()(self.capture_viewport)
+        self.app.tool()(self.capture_depth_map)
         self.app.tool()(self.execute_rhino_code)
+        self.app.tool()(self.create_rhino_session)
+        self.app.tool()(self.list_rhino_sessions)
+        self.app.tool()(self.drop_rhino_session)
+        self.app.tool()(self.register_rhino_function)
+        self.app.tool()(self.call_rhino_function)
+        self.app.tool()(self.submit_rhino_job)
+        self.app.tool()(self.get_job_status)
+        self.app.tool()(self.get_job_output)
+        self.app.tool()(self.cancel_job)
     
-    def get_scene_info(self, ctx: Context) -> str:
+    async def get_scene_info(self, ctx: Context) -> str:
         """Get basic information about the current Rhino scene.
         
         This is a lightweight function that returns basic scene information:
@@ -145,23 +260,23 @@ class RhinoTools:
         """
         try:
             connection = get_rhino_connection()
-            result = connection.send_command("get_scene_info")
+            result = await asyncio.to_thread(connection.send_command, "get_scene_info")
             return json.dumps(result, indent=2)
         except Exception as e:
             logger.error("Error getting scene info from Rhino: {0}".format(str(e)))
             return "Error getting scene info: {0}".format(str(e))
 
-    def get_layers(self, ctx: Context) -> str:
+    async def get_layers(self, ctx: Context) -> str:
         """Get list of layers in Rhino"""
         try:
             connection = get_rhino_connection()
-            result = connection.send_command("get_layers")
+            result = await asyncio.to_thread(connection.send_command, "get_layers")
             return json.dumps(result, indent=2)
         except Exception as e:
             logger.error("Error getting layers from Rhino: {0}".format(str(e)))
             return "Error getting layers: {0}".format(str(e))
 
-    def get_scene_objects_with_metadata(self, ctx: Context, filters: Optional[Dict[str, Any]] = None, metadata_fields: Optional[List[str]] = None) -> str:
+    async def get_scene_objects_with_metadata(self, ctx: Context, filters: Optional[Dict[str, Any]] = None, metadata_fields: Optional[List[str]] = None) -> str:
         """Get detailed information about objects in the scene with their metadata.
         
         This is a CORE FUNCTION for scene context awareness. It provides:
@@ -192,7 +307,7 @@ class RhinoTools:
         """
         try:
             connection = get_rhino_connection()
-            result = connection.send_command("get_objects_with_metadata", {
+            result = await asyncio.to_thread(connection.send_command, "get_objects_with_metadata", {
                 "filters": filters or {},
                 "metadata_fields": metadata_fields
             })
@@ -201,7 +316,9 @@ class RhinoTools:
             logger.error("Error getting objects with metadata: {0}".format(str(e)))
             return "Error getting objects with metadata: {0}".format(str(e))
 
-    def capture_viewport(self, ctx: Context, layer: Optional[str] = None, show_annotations: bool = True, max_size: int = 800, view: Optional[Union[str, List[str]]] = None, zoom_extents: bool = True) -> list:
+    async def capture_viewport(self, ctx: Context, layer: Optional[str] = None, show_annotations: bool = True, max_size: int = 800, view: Optional[Union[str, List[str]]] = None, zoom_extents: bool = True,
+                               max_bytes: Optional[int] = None, max_tokens: Optional[int] = None, image_format: str = "jpeg",
+                               object_ids: Optional[List[Union[str, List[str]]]] = None, padding: float = 1.2) -> list:
         """Capture the current viewport as an image.
         
         Args:
@@ -209,9 +326,19 @@ class RhinoTools:
             show_annotations: Whether to show object annotations, this will display the short_id of the object in the viewport you can use the short_id to select specific objects with the get_objects_with_metadata function
             view: Optional view name(s) to capture. Can be a single string (e.g. "Top", "Active"), a list of strings, or "All" for 7-view capture. Defaults to 4-view capture (Perspective, Top, Front, Right).
             zoom_extents: Whether to perform Zoom Extents before capturing to fit all objects in view. Defaults to True.
+            max_bytes: Optional total byte budget for all returned images. Quality and resolution are reduced until the images fit.
+            max_tokens: Optional total vision token budget for all returned images (roughly one token per 750 pixels).
+            image_format: Output format when a budget is given, "jpeg" (default) or "webp".
+            object_ids: Optional regions of interest. Each entry is an object id/short_id, or a list of ids framed together.
+                One image per region (and view) is captured, framed tightly around the objects at max_size resolution.
+                Defaults to a single Perspective view per region when no view is given.
+            padding: Framing margin around each region as a factor of its size; replaces the default view padding (default 1.2).
         
         Returns:
-            A list of MCP Image objects containing the viewport capture(s)
+            A list of MCP Image objects containing the viewport capture(s). When a budget is given,
+            a JSON text entry with the chosen size/quality per image is appended. Views are streamed
+            as they are captured; if Rhino times out midway, the views received so far are returned
+            with a JSON entry marking the result as partial.
         """
         try:
             # Handle "All" shortcut for 7-side capture
@@ -221,40 +348,103 @@ class RhinoTools:
                 target_view = ["Top", "Bottom", "Front", "Back", "Right", "Left", "Perspective"]
             
             connection = get_rhino_connection()
-            result = connection.send_command("capture_viewport", {
-                "layer": layer,
-                "show_annotations": show_annotations,
-                "max_size": max_size,
-                "view": target_view,
-                "zoom_extents": zoom_extents
-            })
+            loop = asyncio.get_running_loop()
+            
+            def on_frame(frame: Dict[str, Any]):
+                # Called from the socket thread as each view arrives
+                asyncio.run_coroutine_threadsafe(
+                    ctx.report_progress(frame.get("index", 0) + 1, frame.get("total")), loop)
             
-            output_images = []
+            timed_out = False
+            try:
+                result, frames = await asyncio.to_thread(connection.send_command_stream, "capture_viewport", {
+                    "layer": layer,
+                    "show_annotations": show_annotations,
+                    "max_size": max_size,
+                    "view": target_view,
+                    "zoom_extents": zoom_extents,
+                    "object_ids": object_ids,
+                    "padding": padding
+                }, on_frame)
+            except RhinoTimeoutError as e:
+                # Keep the views that made it before Rhino went silent
+                if not e.frames:
+                    raise
+                logger.warning("Viewport capture timed out after {0} view(s)".format(len(e.frames)))
+                result, frames, timed_out = {"type": "multi_image", "images": []}, e.frames, True
+            
+            raw_images = []
+            for frame in frames:
+                img_data = frame["image"]
+                raw_images.append((img_data.get("label", "Active"), img_data["data"]))
             
             # Handle single image response (backward compatibility)
             if result.get("type") == "image":
-                base64_data = result["source"]["data"]
-                output_images.append(self._process_image_data(base64_data))
+                raw_images.append(("Active", result["source"]["data"]))
                 
             # Handle multi-image response
             elif result.get("type") == "multi_image":
                 for img_data in result.get("images", []):
-                    base64_data = img_data["data"]
-                    # We could also use img_data["label"] if needed
-                    output_images.append(self._process_image_data(base64_data))
+                    raw_images.append((img_data.get("label", "Active"), img_data["data"]))
             
             elif result.get("type") == "error":
                  raise Exception(result.get("message", "Unknown error"))
             
-            if not output_images:
-                raise Exception(result.get("text", "Failed to capture viewport"))
-                
-            return output_images
+            if not raw_images:
+                raise Exception("; ".join(result.get("errors", [])) or result.get("text", "Failed to capture viewport"))
+            
+            if not (max_bytes or max_tokens or image_format.lower() not in ("jpeg", "jpg")):
+                output = [self._process_image_data(data) for _, data in raw_images]
+            else:
+                output = await self._encode_images_to_budget(raw_images, max_bytes, max_tokens, image_format)
+            
+            if result.get("errors"):
+                output.append(json.dumps({"errors": result["errors"]}))
+            if timed_out:
+                output.append(json.dumps({
+                    "partial": True,
+                    "captured": len(frames),
+                    "expected": frames[-1].get("total") if frames else None,
+                    "message": "Rhino timed out before all views were captured"
+                }))
+            return output
                 
         except Exception as e:
             logger.error("Error capturing viewport: {0}".format(str(e)))
             raise
 
+    async def _encode_images_to_budget(self, raw_images: List[tuple], max_bytes: Optional[int], max_tokens: Optional[int], image_format: str) -> list:
+        """Re-encode base64 images in the encoding thread pool so that together they fit the budget"""
+        count = len(raw_images)
+        per_image_bytes = max(1, max_bytes // count) if max_bytes else None
+        per_image_tokens = max(1, max_tokens // count) if max_tokens else None
+        
+        loop = asyncio.get_running_loop()
+        tasks = [
+            loop.run_in_executor(
+                get_encode_pool(),
+                functools.partial(encode_to_budget, base64.b64decode(data), per_image_bytes, per_image_tokens, image_format)
+            )
+            for _, data in raw_images
+        ]
+        encoded = await asyncio.gather(*tasks)
+        
+        output = []
+        report = []
+        for (label, _), (image_bytes, metadata) in zip(raw_images, encoded):
+            output.append(Image(data=image_bytes, format=metadata["format"]))
+            metadata["label"] = label
+            report.append(metadata)
+        
+        output.append(json.dumps({
+            "images": report,
+            "total_bytes": sum(m["bytes"] for m in report),
+            "total_estimated_tokens": sum(m["estimated_tokens"] for m in report),
+            "max_bytes": max_bytes,
+            "max_tokens": max_tokens
+        }))
+        return output
+
     def _process_image_data(self, base64_data: str) -> Image:
         """Helper to convert base64 data to MCP Image"""
         # Convert base64 to bytes
@@ -263,7 +453,60 @@ class RhinoTools:
         # Return as MCP Image object in JPEG format (smaller size for VLM efficiency)
         return Image(data=image_bytes, format="jpeg")
 
-    def execute_rhino_code(self, ctx: Context, code: str) -> str:
+    async def capture_depth_map(self, ctx: Context, view: str = "Perspective", max_size: int = 1024, precision: int = 8,
+                                include_normals: bool = False, zoom_extents: bool = True, invert: bool = True) -> list:
+        """Capture a depth map (and optionally a normal map) of a view straight from Rhino's Z-buffer.
+        
+        Depth is linearized and normalized over the visible geometry. Useful as a control image
+        for depth-conditioned image models or for judging spatial relationships.
+        
+        Args:
+            view: View to capture, e.g. "Perspective", "Top" or "Active". Defaults to "Perspective".
+            max_size: Longest side of the captured map in pixels (default 1024)
+            precision: 8 (default) for an 8-bit PNG of Rhino's Z-buffer, 16 for a 16-bit PNG from float depth
+                values. 16-bit reads the Z-buffer pixel by pixel in Rhino and is capped at 512 px on the long side
+            include_normals: Whether to also return a screen-space normal map derived from the depth
+            zoom_extents: Whether to frame all visible objects before capturing. Defaults to True.
+            invert: Near surfaces white and background black (default). False gives near = black.
+        
+        Returns:
+            A list with the depth map image, the optional normal map image and a JSON text entry
+            describing the capture (size, near/far planes, coverage).
+        """
+        try:
+            connection = get_rhino_connection()
+            result = await asyncio.to_thread(connection.send_command, "capture_depth", {
+                "view": view,
+                "max_size": max_size,
+                "precision": precision,
+                "zoom_extents": zoom_extents
+            })
+            if result.get("status") == "error":
+                return ["Error capturing depth map: {0}".format(result.get("message", "Unknown error"))]
+            
+            loop = asyncio.get_running_loop()
+            depth_png, normal_png, metadata = await loop.run_in_executor(
+                get_encode_pool(),
+                functools.partial(build_depth_images, result, precision, include_normals, invert)
+            )
+            metadata.update({
+                "near": result.get("near"),
+                "far": result.get("far"),
+                "is_perspective": result.get("is_perspective")
+            })
+            
+            output = [Image(data=depth_png, format="png")]
+            if normal_png is not None:
+                output.append(Image(data=normal_png, format="png"))
+            output.append(json.dumps(metadata))
+            return output
+        except Exception as e:
+            logger.error("Error capturing depth map: {0}".format(str(e)))
+            return ["Error capturing depth map: {0}".format(str(e))]
+
+    async def execute_rhino_code(self, ctx: Context, code: str, session_id: Optional[str] = None,
+                           export_variables: Optional[List[str]] = None, transaction: bool = False,
+                           mode: str = "ui") -> str:
         """Execute arbitrary Python code in Rhino.
         
         IMPORTANT NOTES FOR CODE EXECUTION:
@@ -273,7 +516,8 @@ class RhinoTools:
         4. For user interaction, you can use RhinoCommon syntax (selected_objects = rs.GetObjects("Please select some objects") etc.) prompted the suer what to do 
            but prefer automated solutions unless user interaction is specifically requested
         
-        The add_object_metadata() function is provided in the code context and must be called
+        The add_object_metadata() function (along with rs, sc, json, time and datetime) is preloaded
+        in the code context by the Rhino bridge and must be called
         after creating any object. It adds standardized metadata including:
         - name (provided by you)
         - description (provided by you)
@@ -295,80 +539,327 @@ class RhinoTools:
 
         >>>
 
+        Sessions:
+        Pass a session_id from create_rhino_session to keep variables between calls. Top-level
+        names assigned in one call (curve divisions, lookup tables, imported data) are available
+        in the next call of the same session, so expensive setup only runs once.
+
+        Exporting variables:
+        Only the `result` variable is returned by default. Pass export_variables with the names
+        of variables to return (or ["*"] for all) and they come back as JSON, e.g. points as
+        [x, y, z] arrays and GUIDs as strings. Large values are cut to size and listed under
+        "truncated", so prefer exporting summaries over whole point lists.
+
+        Transactions:
+        Pass transaction=True for bulk generation (thousands of rs.AddBox / rs.SetUserText calls).
+        Redraws are suspended until the end, all changes become a single undo step, and if the
+        code raises, the changes are rolled back.
+
+        Parallel work:
+        parallel_map(func, items, max_workers=None) runs func over items on all CPU cores and
+        returns the results in order. Use it for independent, thread-safe RhinoCommon geometry
+        work (curve/surface intersections, meshing breps), never for document or rs.* calls.
+        Failed items are raised together as ParallelMapError (with .errors and .results).
+
+        Printed output:
+        print(...) output is streamed back while the code runs and appended to the response
+        after a "--- stdout ---" marker (the most recent 64k characters are kept).
+
+        Background mode:
+        Pass mode="background" for long pure computations (grid solving, point-cloud processing).
+        The code runs on a bridge worker thread so Rhino stays responsive and other commands keep
+        working. Only use RhinoCommon geometry types there; do anything that touches the document
+        (adding objects, rs.* calls, redraws) inside commit(func, *args), which runs func on the UI thread:
+        <<<python
+        pts = []
+        for i in range(200):
+            for j in range(200):
+                pts.append(Rhino.Geometry.Point3d(i, j, 0))
+        ids = commit(lambda: [sc.doc.Objects.AddPoint(p) for p in pts])
+        >>>
+        transaction=True is not available in background mode.
+
         DONT FORGET NO f-strings! No f-strings, No f-strings!
         """
         try:
-            code_template = """
-import rhinoscriptsyntax as rs
-import scriptcontext as sc
-import json
-import time
-from datetime import datetime
-
-def add_object_metadata(obj_id, name=None, description=None):
-    \"\"\"Add standardized metadata to an object\"\"\"
-    try:
-        # Generate short ID
-        short_id = datetime.now().strftime("%d%H%M%S")
-        
-        # Get bounding box
-        bbox = rs.BoundingBox(obj_id)
-        bbox_data = [[p.X, p.Y, p.Z] for p in bbox] if bbox else []
-        
-        # Get object type
-        obj = sc.doc.Objects.Find(obj_id)
-        obj_type = obj.Geometry.GetType().Name if obj else "Unknown"
-        
-        # Standard metadata
-        metadata = {
-            "short_id": short_id,
-            "created_at": time.time(),
-            "layer": rs.ObjectLayer(obj_id),
-            "type": obj_type,
-            "bbox": bbox_data
-        }
-        
-        # User-provided metadata
-        if name:
-            rs.ObjectName(obj_id, name)
-            metadata["name"] = name
-        else:
-            auto_name = "{0}_{1}".format(obj_type, short_id)
-            rs.ObjectName(obj_id, auto_name)
-            metadata["name"] = auto_name
+            # Reject Python 3 only syntax before paying for a round trip
+            compat_error = ironpython_error(code)
+            if compat_error:
+                logger.info("Rejected code locally: not IronPython 2.7 compatible")
+                return compat_error
             
-        if description:
-            metadata["description"] = description
+            logger.info("Sending code execution request to Rhino")
+            if mode == "background":
+                connection = get_rhino_background_connection()
+            else:
+                connection = get_rhino_connection()
+            params = {"code": code}
+            if session_id:
+                params["session_id"] = session_id
+            if export_variables:
+                params["export_variables"] = export_variables
+            if transaction:
+                params["transaction"] = True
+            if mode == "background":
+                params["mode"] = "background"
             
-        # Store metadata as user text
-        user_text_data = metadata.copy()
-        user_text_data["bbox"] = json.dumps(bbox_data)
-        
-        for key, value in user_text_data.items():
-            rs.SetUserText(obj_id, key, str(value))
+            loop = asyncio.get_running_loop()
             
-        return {"status": "success"}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
-
-""" + code
-            logger.info("Sending code execution request to Rhino")
-            connection = get_rhino_connection()
-            result = connection.send_command("execute_code", {"code": code_template})
+            def on_frame(frame: Dict[str, Any]):
+                # Printed output arrives while the code is still running
+                if frame.get("kind") == "stdout" and frame.get("text"):
+                    asyncio.run_coroutine_threadsafe(ctx.info(frame["text"].rstrip("\n")), loop)
             
-            logger.info("Received response from Rhino: {0}".format(result))
+            result, _ = await asyncio.to_thread(
+                connection.send_command_stream, "execute_code", params, on_frame, False)
+            
+            logger.info("Received response from Rhino: {0}".format(str(result)[:500]))
             
             # Simplified error handling
             if result.get("status") == "error":
                 error_msg = "Error: {0}".format(result.get("message", "Unknown error"))
                 logger.error("Code execution error: {0}".format(error_msg))
-                return error_msg
+                return self._append_stdout(error_msg, result)
             else:
                 response = result.get("result", "Code executed successfully")
-                logger.info("Code execution successful: {0}".format(response))
-                return response
+                logger.info("Code execution successful: {0}".format(response[:500]))
+                if export_variables:
+                    exported = {"result": response}
+                    for key in ("variables", "truncated", "missing", "stdout", "stdout_dropped"):
+                        if key in result:
+                            exported[key] = result[key]
+                    return json.dumps(exported, indent=2)
+                return self._append_stdout(response, result)
                 
         except Exception as e:
             error_msg = "Error executing code: {0}".format(str(e))
             logger.error(error_msg)
-            return error_msg
\ No newline at end of file
+            return error_msg
+
+    def _append_stdout(self, text: str, result: Dict[str, Any]) -> str:
+        """Append the printed output of an execution to a tool response"""
+        stdout = result.get("stdout")
+        if not stdout:
+            return text
+        if result.get("stdout_dropped"):
+            stdout = "[{0} earlier chars dropped]\n{1}".format(result["stdout_dropped"], stdout)
+        return "{0}\n\n--- stdout ---\n{1}".format(text, stdout)
+
+    async def create_rhino_session(self, ctx: Context, session_id: Optional[str] = None, ttl_seconds: Optional[int] = None) -> str:
+        """Create a named execution session whose variables persist between execute_rhino_code calls.
+        
+        Sessions expire after ttl_seconds without use (default 30 minutes). When too many sessions
+        exist or their estimated memory grows too large, the least recently used ones are dropped.
+        
+        Args:
+            session_id: Optional name for the session. A short random id is generated if omitted.
+            ttl_seconds: Optional idle lifetime of the session in seconds
+        
+        Returns:
+            JSON string with the session id and its state
+        """
+        try:
+            connection = get_rhino_connection()
+            result = await asyncio.to_thread(connection.send_command, "create_session", {"session_id": session_id, "ttl": ttl_seconds})
+            if result.get("status") == "error":
+                return "Error: {0}".format(result.get("message", "Unknown error"))
+            return json.dumps(result.get("session"), indent=2)
+        except Exception as e:
+            logger.error("Error creating session: {0}".format(str(e)))
+            return "Error creating session: {0}".format(str(e))
+
+    async def list_rhino_sessions(self, ctx: Context) -> str:
+        """List live execution sessions with their variable names, idle time and estimated memory use"""
+        try:
+            connection = get_rhino_connection()
+            result = await asyncio.to_thread(connection.send_command, "list_sessions")
+            return json.dumps(result, indent=2)
+        except Exception as e:
+            logger.error("Error listing sessions: {0}".format(str(e)))
+            return "Error listing sessions: {0}".format(str(e))
+
+    async def drop_rhino_session(self, ctx: Context, session_id: str) -> str:
+        """Drop an execution session and release its variables
+        
+        Args:
+            session_id: The session to drop
+        """
+        try:
+            connection = get_rhino_connection()
+            result = await asyncio.to_thread(connection.send_command, "drop_session", {"session_id": session_id})
+            if result.get("status") == "error":
+                return "Error: {0}".format(result.get("message", "Unknown error"))
+            return "Session {0} dropped".format(session_id)
+        except Exception as e:
+            logger.error("Error dropping session: {0}".format(str(e)))
+            return "Error dropping session: {0}".format(str(e))
+
+    async def register_rhino_function(self, ctx: Context, name: str, code: str) -> str:
+        """Register a reusable function in Rhino, compiled once and then called by name with call_rhino_function.
+        
+        Use this for repeated parametric operations ("make a box at x, y, z") instead of sending
+        near-identical code over and over. The code must define a function called `name`; helper
+        functions and imports in the same code are kept with it. The same IronPython 2.7 rules as
+        execute_rhino_code apply (no f-strings!) and rs, sc, Rhino and add_object_metadata are available.
+        Registering the same name again replaces the function.
+        
+        Example:
+        <<<python
+        def make_box(x, y, z, size=1.0):
+            base = [(x, y, z), (x + size, y, z), (x + size, y + size, z), (x, y + size, z)]
+            top = [(px, py, pz + size) for px, py, pz in base]
+            box = rs.AddBox(base + top)
+            add_object_metadata(box, "Box", "Box at {0},{1},{2}".format(x, y, z))
+            return box
+        >>>
+        
+        Args:
+            name: Name of the function defined in the code
+            code: IronPython code defining the function
+        """
+        try:
+            compat_error = ironpython_error(code)
+            if compat_error:
+                return compat_error
+            result = await asyncio.to_thread(get_rhino_connection().send_command, "register_function", {"name": name, "code": code})
+            if result.get("status") == "error":
+                return "Error: {0}".format(result.get("message", "Unknown error"))
+            return "Function {0} registered. Registered functions: {1}".format(name, ", ".join(result.get("functions", [])))
+        except Exception as e:
+            logger.error("Error registering function: {0}".format(str(e)))
+            return "Error registering function: {0}".format(str(e))
+
+    async def call_rhino_function(self, ctx: Context, name: str, args: Optional[List[Any]] = None,
+                                  kwargs: Optional[Dict[str, Any]] = None,
+                                  batch: Optional[List[Union[List[Any], Dict[str, Any]]]] = None,
+                                  transaction: bool = False) -> str:
+        """Call a function registered with register_rhino_function, sending only JSON arguments.
+        
+        Args:
+            name: Name of the registered function
+            args: Positional arguments for a single call
+            kwargs: Keyword arguments, added to every call that passes a list of positional arguments
+            batch: Call the function once per entry, in one request. Each entry is a list of positional
+                arguments or a dict of keyword arguments, e.g. [[0, 0, 0], [5, 0, 0], {"x": 10, "y": 0, "z": 0}]
+            transaction: Run the whole call/batch with redraw suspended as a single undo step
+        
+        Returns:
+            JSON string with the result (single call) or a "results" list with one
+            {"ok", "result"|"error"} entry per batch item. Return values are serialized like
+            exported variables (points as [x, y, z], GUIDs as strings).
+        """
+        try:
+            params = {"name": name, "args": args or [], "kwargs": kwargs or {}}
+            if batch is not None:
+                params["batch"] = batch
+            if transaction:
+                params["transaction"] = True
+            result = await asyncio.to_thread(get_rhino_connection().send_command, "call_function", params)
+            if result.get("status") == "error" and "results" not in result:
+                return "Error: {0}".format(result.get("message", "Unknown error"))
+            result.pop("status", None)
+            return json.dumps(result, indent=2)
+        except Exception as e:
+            logger.error("Error calling function: {0}".format(str(e)))
+            return "Error calling function: {0}".format(str(e))
+
+    async def submit_rhino_job(self, ctx: Context, code: str, mode: str = "background", session_id: Optional[str] = None,
+                               export_variables: Optional[List[str]] = None, transaction: bool = False) -> str:
+        """Start long-running Rhino code as a job and return its job id right away.
+        
+        Use this instead of execute_rhino_code for work that may take longer than ~30 seconds.
+        Poll get_job_status / get_job_output until the job finishes. The same IronPython 2.7
+        rules as execute_rhino_code apply (no f-strings!).
+        
+        Inside the job code these helpers are available:
+        - check_cancel(): raises if cancel_job was called, call it regularly inside loops
+        - job_progress(value, message=None): report progress (e.g. 0.0-1.0), also checks for cancellation
+        - print(...): output is captured and readable through get_job_output
+        - commit(func, *args): in background mode, run document edits on the UI thread
+        
+        Args:
+            code: The IronPython code to run
+            mode: "background" (default) runs on a worker thread and keeps Rhino responsive,
+                "ui" runs on the UI thread (needed for heavy document edits or transaction=True)
+            session_id: Optional session whose variables the job uses
+            export_variables: Optional variable names to include in the final job response
+            transaction: Run as a single undo step with redraw suspended (mode="ui" only)
+        
+        Returns:
+            JSON string with the job id
+        """
+        try:
+            compat_error = ironpython_error(code)
+            if compat_error:
+                return compat_error
+            
+            params = {"code": code, "mode": mode}
+            if session_id:
+                params["session_id"] = session_id
+            if export_variables:
+                params["export_variables"] = export_variables
+            if transaction:
+                params["transaction"] = True
+            result = await asyncio.to_thread(get_rhino_job_connection().send_command, "submit_job", params)
+            if result.get("status") == "error":
+                return "Error: {0}".format(result.get("message", "Unknown error"))
+            return json.dumps({"job_id": result.get("job_id"), "mode": result.get("mode")})
+        except Exception as e:
+            logger.error("Error submitting job: {0}".format(str(e)))
+            return "Error submitting job: {0}".format(str(e))
+
+    async def get_job_status(self, ctx: Context, job_id: str) -> str:
+        """Get the status of a job started with submit_rhino_job.
+        
+        Status is one of queued, running, succeeded, failed or cancelled. Finished jobs include
+        the final response (result, exported variables or error message).
+        
+        Args:
+            job_id: The job id returned by submit_rhino_job
+        """
+        try:
+            result = await asyncio.to_thread(get_rhino_job_connection().send_command, "get_job_status", {"job_id": job_id})
+            if result.get("status") == "error":
+                return "Error: {0}".format(result.get("message", "Unknown error"))
+            return json.dumps(result.get("job"), indent=2)
+        except Exception as e:
+            logger.error("Error getting job status: {0}".format(str(e)))
+            return "Error getting job status: {0}".format(str(e))
+
+    async def get_job_output(self, ctx: Context, job_id: str, since: int = 0) -> str:
+        """Get the printed output of a job incrementally.
+        
+        Args:
+            job_id: The job id returned by submit_rhino_job
+            since: Offset returned as "next" by the previous call, 0 for everything still buffered
+        
+        Returns:
+            JSON string with the new output, the "next" offset to pass on the following call,
+            the number of characters dropped from the buffer since the given offset, and the job status
+        """
+        try:
+            result = await asyncio.to_thread(get_rhino_job_connection().send_command, "get_job_output", {"job_id": job_id, "since": since})
+            if result.get("status") == "error":
+                return "Error: {0}".format(result.get("message", "Unknown error"))
+            result.pop("status", None)
+            return json.dumps(result, indent=2)
+        except Exception as e:
+            logger.error("Error getting job output: {0}".format(str(e)))
+            return "Error getting job output: {0}".format(str(e))
+
+    async def cancel_job(self, ctx: Context, job_id: str) -> str:
+        """Request cancellation of a running job.
+        
+        Cancellation is cooperative: the job stops at its next check_cancel() or job_progress() call.
+        
+        Args:
+            job_id: The job id returned by submit_rhino_job
+        """
+        try:
+            result = await asyncio.to_thread(get_rhino_job_connection().send_command, "cancel_job", {"job_id": job_id})
+            if result.get("status") == "error":
+                return "Error: {0}".format(result.get("message", "Unknown error"))
+            return json.dumps(result.get("job"), indent=2)
+        except Exception as e:
+            logger.error("Error cancelling job: {0}".format(str(e)))
+            return "Error cancelling job: {0}".format(str(e))
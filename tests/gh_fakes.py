@@ -0,0 +1,153 @@
+"""Grasshopper bridge loaded on CPython with a small fake GH object model.
+
+The bridge is loaded once with the stub modules of the component info
+benchmark; the fakes below add what the caches, the change log and the
+wire index use (events, top-level attributes, documents and proxies).
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "benchmarks"))
+
+from gh_component_info_benchmark import FakeComponent, FakeGuid, FakeParam, load_bridge  # noqa: E402
+
+bridge = load_bridge()
+
+
+class Point3d(object):
+    def __init__(self, x, y, z):
+        self.X, self.Y, self.Z = x, y, z
+
+
+# Pivots are real points so compact encoding can read them
+bridge.rg.Point3d = Point3d
+
+
+class Event(object):
+    """Stand-in for a .NET event supporting += / -="""
+
+    def __init__(self):
+        self.handlers = []
+
+    def __iadd__(self, handler):
+        self.handlers.append(handler)
+        return self
+
+    def __isub__(self, handler):
+        self.handlers.remove(handler)
+        return self
+
+    def fire(self, sender, args=None):
+        for handler in list(self.handlers):
+            handler(sender, args)
+
+
+class EventArgs(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class TopLevel(object):
+    def __init__(self, doc_object):
+        self.DocObject = doc_object
+
+
+class _Events(object):
+    def _init_events(self):
+        self.SolutionExpired = Event()
+        self.ObjectChanged = Event()
+        self.AttributesChanged = Event()
+        self.messages = []
+
+    def RuntimeMessages(self, level):
+        return list(self.messages)
+
+
+class Component(_Events, FakeComponent):
+    def __init__(self, name, inputs=(), outputs=()):
+        FakeComponent.__init__(self, name)
+        self._init_events()
+        self.Attributes.GetTopLevel = TopLevel(self)
+        for nick in inputs:
+            self.Params.Input.append(self._param(nick))
+        for nick in outputs:
+            self.Params.Output.append(self._param(nick))
+
+    def _param(self, nick):
+        param = Param(nick)
+        param.Attributes.Parent = self
+        param.Attributes.GetTopLevel = TopLevel(self)
+        return param
+
+    def input(self, nick):
+        return next(p for p in self.Params.Input if p.NickName == nick)
+
+    def output(self, nick):
+        return next(p for p in self.Params.Output if p.NickName == nick)
+
+
+class Param(_Events, FakeParam):
+    """Parameter; floating on the canvas unless created by a Component"""
+
+    def __init__(self, name):
+        FakeParam.__init__(self, name)
+        self._init_events()
+        self.Attributes.GetTopLevel = TopLevel(self)
+        self.RuntimeMessageLevel = "Blank"
+
+
+def wire(source, target):
+    """Connect an output (or floating) parameter to an input (or floating) parameter"""
+    target.Sources.append(source)
+    source.Recipients.append(target)
+
+
+def unwire(source, target):
+    target.Sources.remove(source)
+    source.Recipients.remove(target)
+
+
+class Document(object):
+    def __init__(self, *objects):
+        self.DocumentID = FakeGuid()
+        self.Objects = list(objects)
+        self.ObjectsAdded = Event()
+        self.ObjectsDeleted = Event()
+        self.SolutionEnd = Event()
+
+    def add(self, *objects):
+        self.Objects.extend(objects)
+        self.ObjectsAdded.fire(self, EventArgs(Objects=list(objects)))
+
+    def delete(self, *objects):
+        for obj in objects:
+            self.Objects.remove(obj)
+        self.ObjectsDeleted.fire(self, EventArgs(Objects=list(objects)))
+
+    def solve(self, *expired, **kwargs):
+        """Expire objects and end a solution like GH does"""
+        for obj in expired:
+            obj.SolutionExpired.fire(obj)
+        self.SolutionEnd.fire(self, EventArgs(Duration=None, **kwargs))
+
+
+class Desc(object):
+    def __init__(self, name, nickname, category="Maths", subcategory="Operators", description=""):
+        self.Name = name
+        self.NickName = nickname
+        self.Category = category
+        self.SubCategory = subcategory
+        self.Description = description
+
+
+class Proxy(object):
+    def __init__(self, name, nickname, **kwargs):
+        self.Guid = FakeGuid()
+        self.Obsolete = False
+        self.Desc = Desc(name, nickname, **kwargs)
+
+
+class ProxyList(list):
+    @property
+    def Count(self):
+        return len(self)
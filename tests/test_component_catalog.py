@@ -0,0 +1,177 @@
+"""Tests for the on-disk Grasshopper component catalog"""
+import pytest
+
+from rhino_mcp.component_catalog import CATALOG_PAGE_SIZE, SIGNATURE_BATCH_SIZE, ComponentCatalog
+
+COMPONENTS = [
+    {"guid": "g-add", "name": "Addition", "nickname": "A+B", "category": "Maths", "subcategory": "Operators",
+     "description": "Mathematical addition"},
+    {"guid": "g-sub", "name": "Subtraction", "nickname": "A-B", "category": "Maths", "subcategory": "Operators",
+     "description": "Mathematical subtraction"},
+    {"guid": "g-old", "name": "Addition", "nickname": "Add", "category": "Maths", "subcategory": "Operators",
+     "description": "Old addition", "obsolete": True},
+    {"guid": "g-pt", "name": "Construct Point", "nickname": "Pt", "category": "Vector", "subcategory": "Point",
+     "description": "Construct a point from coordinates",
+     "inputs": [{"name": "X coordinate", "nickName": "X"}], "outputs": [{"name": "Point", "nickName": "Pt"}]},
+]
+
+
+class FakeBridge(object):
+    """send_command stand-in serving a catalog and signatures"""
+
+    def __init__(self, components, fingerprint="fp-1"):
+        self.components = components
+        self.fingerprint = fingerprint
+        self.calls = []
+
+    def __call__(self, command_type, params):
+        self.calls.append((command_type, params))
+        if command_type == "get_catalog_fingerprint":
+            return {"status": "success", "result": {"fingerprint": self.fingerprint}}
+        if command_type == "get_component_catalog":
+            offset, limit = params["offset"], params["limit"]
+            return {"status": "success", "result": {
+                "fingerprint": self.fingerprint,
+                "total": len(self.components),
+                "offset": offset,
+                "components": self.components[offset:offset + limit]
+            }}
+        if command_type == "get_component_signatures":
+            return {"status": "success", "result": dict(
+                (guid, {"inputs": [{"name": "A"}, {"name": "B"}], "outputs": [{"name": "Result", "nickName": "R"}]})
+                for guid in params["guids"])}
+        return {"status": "error", "result": "Unknown command"}
+
+    def count(self, command_type):
+        return sum(1 for call in self.calls if call[0] == command_type)
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    return ComponentCatalog(tmp_path / "catalog.sqlite3")
+
+
+@pytest.fixture(params=[True, False], ids=["fts", "like"])
+def stored(request, catalog):
+    if not request.param:
+        # Searches then go through the LIKE fallback
+        catalog.has_fts = False
+    catalog.store("fp-1", COMPONENTS)
+    return catalog
+
+
+def test_empty_catalog_is_not_ready(catalog):
+    assert not catalog.is_ready()
+    assert catalog.fingerprint() is None
+    assert catalog.count() == 0
+
+
+def test_store_replaces_catalog(catalog):
+    catalog.store("fp-1", COMPONENTS)
+    catalog.store("fp-2", COMPONENTS[:2])
+    assert catalog.is_ready()
+    assert catalog.fingerprint() == "fp-2"
+    assert catalog.count() == 2
+    assert catalog.search("point") == []
+
+
+def test_search_ranks_exact_name_first(stored):
+    results = stored.search("addition")
+    assert [r["guid"] for r in results][:2] == ["g-add", "g-old"]
+    assert results[1]["obsolete"] is True
+
+
+def test_search_matches_prefixes_and_descriptions(stored):
+    assert [r["guid"] for r in stored.search("subtr")] == ["g-sub"]
+    assert "g-pt" in [r["guid"] for r in stored.search("coordinates")]
+
+
+def test_search_limit_and_empty_query(stored):
+    assert len(stored.search("mathematical", limit=1)) == 1
+    assert stored.search("  ") == []
+
+
+def test_search_leaves_out_unfetched_signatures(stored):
+    by_guid = dict((r["guid"], r) for r in stored.search("a"))
+    assert "inputs" not in by_guid["g-add"]
+    assert by_guid["g-pt"]["inputs"] == ["X"]
+    assert by_guid["g-pt"]["outputs"] == ["Pt"]
+
+
+def test_search_fetches_signatures_once(stored):
+    bridge = FakeBridge(COMPONENTS)
+    first = stored.search("subtraction", signatures=True, send_command=bridge)
+    assert first[0]["inputs"] == [{"name": "A"}, {"name": "B"}]
+    again = stored.search("subtraction", signatures=True, send_command=bridge)
+    assert again == first
+    assert bridge.count("get_component_signatures") == 1
+
+
+def test_signatures_are_fetched_in_batches(catalog):
+    components = [{"guid": "g{0}".format(i), "name": "Comp {0}".format(i), "nickname": "C{0}".format(i)}
+                  for i in range(SIGNATURE_BATCH_SIZE + 5)]
+    catalog.store("fp-1", components)
+    bridge = FakeBridge(components)
+    fetched = catalog.load_signatures([c["guid"] for c in components], bridge)
+    assert len(fetched) == len(components)
+    assert [len(params["guids"]) for _, params in bridge.calls] == [SIGNATURE_BATCH_SIZE, 5]
+    assert catalog.load_signatures([c["guid"] for c in components], bridge) == {}
+
+
+def test_signature_errors_leave_results_usable(stored):
+    def failing(command_type, params):
+        raise ConnectionError("bridge busy")
+    results = stored.search("subtraction", send_command=failing)
+    assert results[0]["guid"] == "g-sub"
+    assert "inputs" not in results[0]
+
+
+def test_lookup_by_name_or_nickname(stored):
+    bridge = FakeBridge(COMPONENTS)
+    found = stored.lookup(["addition", "Pt", "Missing"], send_command=bridge)
+    assert set(found) == {"addition", "Pt"}
+    assert found["addition"]["guid"] == "g-add"
+    assert found["addition"]["inputs"] == [{"name": "A"}, {"name": "B"}]
+    assert found["Pt"]["inputs"] == [{"name": "X coordinate", "nickName": "X"}]
+    # Only the component without a cached signature was requested
+    assert bridge.calls == [("get_component_signatures", {"guids": ["g-add"]})]
+
+
+def test_refresh_pulls_all_pages(catalog):
+    components = [{"guid": "g{0}".format(i), "name": "Comp {0}".format(i)} for i in range(CATALOG_PAGE_SIZE + 10)]
+    bridge = FakeBridge(components)
+    assert catalog.refresh(bridge) is True
+    assert catalog.fingerprint() == "fp-1"
+    assert catalog.count() == len(components)
+    assert bridge.count("get_component_catalog") == 2
+
+
+def test_refresh_skips_unchanged_fingerprint(catalog):
+    bridge = FakeBridge(COMPONENTS)
+    catalog.refresh(bridge)
+    assert catalog.refresh(bridge) is False
+    assert bridge.count("get_component_catalog") == 1
+
+    bridge.fingerprint = "fp-2"
+    assert catalog.refresh(bridge) is True
+    assert catalog.fingerprint() == "fp-2"
+
+
+def test_refresh_retries_when_fingerprint_changes_while_paging(catalog):
+    bridge = FakeBridge(COMPONENTS)
+    serve = bridge.__call__
+
+    def changing(command_type, params):
+        response = serve(command_type, params)
+        if command_type == "get_component_catalog":
+            response["result"]["fingerprint"] = "fp-other"
+        return response
+
+    assert catalog.refresh(changing) is False
+    assert not catalog.is_ready()
+    assert catalog.last_check == 0.0
+
+
+def test_refresh_raises_bridge_errors(catalog):
+    with pytest.raises(RuntimeError, match="no document"):
+        catalog.refresh(lambda command_type, params: {"status": "error", "result": "no document"})
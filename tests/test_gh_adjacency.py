@@ -0,0 +1,76 @@
+"""Tests for the wire index the GH bridge walks for context queries"""
+import pytest
+
+from gh_fakes import Component, Document, Param, bridge, unwire, wire
+
+
+@pytest.fixture
+def chain():
+    """Slider -> A -> B -> C, plus a lone component"""
+    slider = Param("Slider")
+    a = Component("A", ["x"], ["R"])
+    b = Component("B", ["y"], ["R"])
+    c = Component("C", ["z"], ["R"])
+    lone = Component("Lone", ["x"], ["R"])
+    wire(slider, a.input("x"))
+    wire(a.output("R"), b.input("y"))
+    wire(b.output("R"), c.input("z"))
+    return Document(slider, a, b, c, lone), slider, a, b, c, lone
+
+
+def guid(obj):
+    return str(obj.InstanceGuid)
+
+
+def test_sources_and_targets_are_owner_guids(chain):
+    doc, slider, a, b, c, lone = chain
+    adjacency = bridge.build_adjacency(doc)
+    assert set(adjacency) == set(guid(obj) for obj in doc.Objects)
+    assert adjacency[guid(a)] == (a, {guid(slider)}, {guid(b)})
+    assert adjacency[guid(slider)] == (slider, set(), {guid(a)})
+    assert adjacency[guid(lone)] == (lone, set(), set())
+
+
+def test_self_wires_are_ignored():
+    a = Component("A", ["x"], ["R"])
+    wire(a.output("R"), a.input("x"))
+    adjacency = bridge.build_adjacency(Document(a))
+    assert adjacency[guid(a)] == (a, set(), set())
+
+
+def test_sources_outside_the_document_are_not_indexed():
+    outside = Param("Outside")
+    a = Component("A", ["x"], ["R"])
+    wire(outside, a.input("x"))
+    adjacency = bridge.build_adjacency(Document(a))
+    assert set(adjacency) == {guid(a)}
+
+
+def test_adjacency_is_rebuilt_after_a_solution(chain):
+    doc, slider, a, b, c, lone = chain
+    cache = bridge.GHContextCache(doc)
+    first = cache.get_adjacency()
+    assert cache.get_adjacency() is first
+    # Neither object was ever serialized, so no object event reaches the cache
+    wire(c.output("R"), lone.input("x"))
+    unwire(slider, a.input("x"))
+    doc.solve()
+    adjacency = cache.get_adjacency()
+    assert adjacency is not first
+    assert adjacency[guid(lone)][1] == {guid(c)}
+    assert adjacency[guid(a)][1] == set()
+    cache.detach()
+
+
+@pytest.mark.parametrize("depth, expected", [
+    (0, ["B"]),
+    (1, ["A", "B", "C"]),
+    (2, ["A", "B", "C", "Slider"]),
+])
+def test_context_walks_wires_up_to_depth(chain, monkeypatch, depth, expected):
+    doc, slider, a, b, c, lone = chain
+    monkeypatch.setattr(bridge, "get_active_gh_doc", lambda: doc)
+    graph = bridge.get_objects_with_context([b.InstanceGuid], context_depth=depth)
+    assert sorted(info["name"] for info in graph.values()) == expected
+    assert [info["name"] for info in graph.values() if info["isSelected"]] == ["B"]
+    bridge.sc.sticky[bridge.CONTEXT_CACHE_KEY].detach()
@@ -0,0 +1,124 @@
+"""Tests for the revision counter and change log of the GH bridge"""
+import pytest
+
+from gh_fakes import Component, Document, EventArgs, Param, bridge, unwire, wire
+
+
+@pytest.fixture
+def setup():
+    slider = Param("Slider")
+    a = Component("A", ["x"], ["R"])
+    doc = Document(slider, a)
+    log = bridge.GHChangeLog(doc)
+    yield doc, slider, a, log
+    log.detach()
+
+
+def changes(log, since=0):
+    return log.get_changes(since)["changes"]
+
+
+def test_added_and_removed_objects_get_increasing_revisions(setup):
+    doc, slider, a, log = setup
+    b = Component("B", ["y"], ["R"])
+    doc.add(b)
+    doc.delete(b)
+    recorded = changes(log)
+    assert [(c["type"], c["rev"]) for c in recorded] == [("added", 1), ("removed", 2)]
+    assert recorded[0]["guid"] == str(b.InstanceGuid) and recorded[0]["name"] == "B"
+    assert log.get_changes()["revision"] == 2
+    # Deleted objects are no longer followed
+    assert not b.SolutionExpired.handlers
+
+
+def test_wires_are_logged_when_the_solution_ends(setup):
+    doc, slider, a, log = setup
+    wire(slider, a.input("x"))
+    a.SolutionExpired.fire(a)
+    assert changes(log) == []
+    doc.solve()
+    wires, solution = changes(log)
+    assert wires["type"] == "wires"
+    assert wires["guid"] == str(a.InstanceGuid)
+    assert wires["added"] == [["x", str(slider.InstanceGuid)]] and wires["removed"] == []
+    assert solution["type"] == "solution" and solution["count"] == 1
+
+    unwire(slider, a.input("x"))
+    doc.solve(a)
+    assert changes(log, solution["rev"])[0]["removed"] == [["x", str(slider.InstanceGuid)]]
+
+
+def test_unchanged_expired_objects_are_not_logged(setup):
+    doc, slider, a, log = setup
+    doc.solve(slider, a)
+    assert [c["type"] for c in changes(log)] == ["solution"]
+
+
+def test_runtime_messages_are_logged_when_they_change(setup):
+    doc, slider, a, log = setup
+    slider.RuntimeMessageLevel = "Warning"
+    slider.messages = ["Value out of range"]
+    doc.solve(slider)
+    recorded = changes(log)[0]
+    assert recorded == {"type": "messages", "guid": str(slider.InstanceGuid), "level": "Warning",
+                        "messages": ["Value out of range"], "rev": 1}
+    doc.solve(slider)
+    assert [c["type"] for c in changes(log, 1)] == ["solution"]
+
+
+def test_consecutive_solutions_are_merged(setup):
+    doc, slider, a, log = setup
+    for _ in range(3):
+        doc.solve(slider)
+    recorded = changes(log)
+    assert len(recorded) == 1
+    assert recorded[0]["count"] == 3 and recorded[0]["rev"] == 3
+    assert recorded[0]["duration_ms"] is None
+
+
+def test_repeated_changes_of_one_kind_are_recorded_once(setup):
+    doc, slider, a, log = setup
+    for _ in range(3):
+        a.ObjectChanged.fire(a, EventArgs(Type="NickName"))
+    a.ObjectChanged.fire(a, EventArgs(Type="Enabled"))
+    assert [c["what"] for c in changes(log)] == ["NickName", "Enabled"]
+
+
+def test_limit_truncates_and_continues(setup):
+    doc, slider, a, log = setup
+    doc.add(*[Param("P{0}".format(i)) for i in range(5)])
+    first = log.get_changes(0, limit=3)
+    assert [c["rev"] for c in first["changes"]] == [1, 2, 3]
+    assert first["truncated"] is True and first["revision"] == 3
+    rest = log.get_changes(first["revision"], limit=3)
+    assert [c["rev"] for c in rest["changes"]] == [4, 5]
+    assert "truncated" not in rest and rest["complete"] is True
+
+
+def test_overflowed_log_is_incomplete(monkeypatch):
+    monkeypatch.setattr(bridge, "CHANGE_LOG_SIZE", 3)
+    doc = Document()
+    log = bridge.GHChangeLog(doc)
+    doc.add(*[Param("P{0}".format(i)) for i in range(5)])
+    assert [c["rev"] for c in changes(log)] == [3, 4, 5]
+    assert log.get_changes(0)["complete"] is False
+    assert log.get_changes(2)["complete"] is True
+    log.detach()
+
+
+def test_revisions_continue_across_documents():
+    bridge.sc.sticky.pop(bridge.CHANGE_LOG_KEY, None)
+    first_doc = Document()
+    log = bridge.get_change_log(first_doc)
+    assert bridge.get_change_log(first_doc) is log
+    first_doc.add(Param("P"))
+
+    second_doc = Document()
+    switched = bridge.get_change_log(second_doc)
+    assert switched is not log and not first_doc.ObjectsAdded.handlers
+    second_doc.add(Param("Q"))
+    assert changes(switched, 1)[0]["rev"] == 2
+    # Revisions of the previous document cannot be continued from
+    assert switched.get_changes(0)["complete"] is False
+    assert switched.get_changes(0)["document_id"] == str(second_doc.DocumentID)
+    switched.detach()
@@ -0,0 +1,92 @@
+"""Tests for the compact graph encoding of the GH bridge"""
+from gh_fakes import Component, Document, Param, Point3d, bridge, wire
+
+
+def param(guid, nick, sources=(), **kwargs):
+    info = {"instanceGuid": guid, "nickName": nick, "name": nick, "sources": list(sources)}
+    info.update(kwargs)
+    return info
+
+
+GRAPH = {
+    "g-slider": {"name": "Number Slider", "nickName": "Slider", "kind": "param", "pivot": Point3d(10.4, 20.6, 0),
+                 "sources": [], "targets": ["g-add"], "slider": {"value": 5}},
+    "g-add": {"name": "Addition", "nickName": "Addition", "kind": "component", "isSelected": True,
+              "description": "Mathematical addition", "bounds": [0, 0, 10, 10],
+              "runtimeMessages": ["1. Input parameter B failed to collect data"],
+              "Inputs": [param("p-a", "A", ["g-slider"], dataType="Number", dataCount=1), param("p-b", "B")],
+              "Outputs": [param("p-r", "R", dataCount=1)],
+              "sources": ["g-slider"], "targets": ["p-x"]},
+    "g-neg": {"name": "Negative", "nickName": "Neg",
+              "Inputs": [param("p-x", "x", ["p-r", "p-y"])], "Outputs": [param("p-y", "y")],
+              "sources": ["p-r", "p-y"], "targets": ["p-x"]},
+}
+
+
+def encode():
+    encoded = bridge.encode_compact(GRAPH)
+    guids = encoded["guids"]
+    objects = dict((guids[entry["id"]], entry) for entry in encoded["objects"])
+    return encoded, guids, objects
+
+
+def test_every_guid_is_listed_once():
+    encoded, guids, objects = encode()
+    assert encoded["format"] == "compact"
+    assert len(guids) == len(set(guids))
+    assert set(objects) == set(GRAPH)
+    # Parameters of components are referred to through their owner
+    assert not set(guids) & {"p-a", "p-b", "p-r", "p-x", "p-y"}
+
+
+def test_edges_join_owners_without_self_loops():
+    encoded, guids, objects = encode()
+    edges = set((guids[s], guids[t]) for s, t in encoded["edges"])
+    assert edges == {("g-slider", "g-add"), ("g-add", "g-neg")}
+    assert encoded["edges"] == sorted(encoded["edges"])
+
+
+def test_input_sources_name_owner_and_output():
+    encoded, guids, objects = encode()
+    sources = dict((p["name"], p.get("from")) for p in objects["g-neg"]["in"])
+    assert sources["x"] == [[guids.index("g-add"), "R"], [guids.index("g-neg"), "y"]]
+    # Floating parameters have no output nickName
+    assert objects["g-add"]["in"][0]["from"] == [[guids.index("g-slider")]]
+    assert "from" not in objects["g-add"]["in"][1]
+
+
+def test_default_and_empty_fields_are_left_out():
+    encoded, guids, objects = encode()
+    add = objects["g-add"]
+    assert "nickName" not in add and "kind" not in add
+    assert "description" not in add and "bounds" not in add
+    assert add["in"][1] == {"name": "B"}
+    assert add["out"] == [{"name": "R", "count": 1}]
+    assert add["in"][0]["type"] == "Number"
+    assert objects["g-neg"]["nickName"] == "Neg"
+    assert "selected" not in objects["g-neg"] and "messages" not in objects["g-neg"]
+
+
+def test_flags_pivot_and_special_fields():
+    encoded, guids, objects = encode()
+    assert objects["g-add"]["selected"] is True
+    assert objects["g-add"]["messages"] == GRAPH["g-add"]["runtimeMessages"]
+    slider = objects["g-slider"]
+    assert slider["kind"] == "param"
+    assert slider["pivot"] == [10, 21]
+    assert slider["slider"] == {"value": 5}
+
+
+def test_encodes_document_graph():
+    slider = Param("Slider")
+    a = Component("A", ["x"], ["R"])
+    b = Component("B", ["y"], ["R"])
+    wire(slider, a.input("x"))
+    wire(a.output("R"), b.input("y"))
+    doc = Document(slider, a, b)
+    graph = bridge.get_all_relevant_objects_info(doc)
+    encoded = bridge.encode_compact(graph)
+    names = dict((entry["id"], entry["name"]) for entry in encoded["objects"])
+    assert sorted((names[s], names[t]) for s, t in encoded["edges"]) == [("A", "B"), ("Slider", "A")]
+    bridge.sc.sticky[bridge.CONTEXT_CACHE_KEY].detach()
+    assert bridge.encode_graph(graph, "json") is graph
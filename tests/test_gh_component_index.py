@@ -0,0 +1,89 @@
+"""Tests for the component proxy index of the GH bridge"""
+from types import SimpleNamespace
+
+import pytest
+
+from gh_fakes import Proxy, ProxyList, bridge
+
+PROXIES = ProxyList([
+    Proxy("Addition", "A+B", description="Mathematical addition"),
+    Proxy("Subtraction", "A-B", description="Mathematical subtraction"),
+    Proxy("Construct Point", "Pt", category="Vector", subcategory="Point",
+          description="Construct a point from X, Y and Z coordinates"),
+    Proxy("Point On Curve", "CurvePoint", category="Curve", subcategory="Analysis",
+          description="Evaluates a curve at a specific location"),
+    Proxy("Addition", "Add", description="Older addition"),
+])
+
+
+@pytest.fixture
+def index():
+    return bridge.ComponentIndex(PROXIES)
+
+
+def names(results):
+    return [record["name"] for record, score in results]
+
+
+def test_find_by_name_then_nickname(index):
+    assert index.find("Addition") is PROXIES[0]
+    assert index.find("construct point") is PROXIES[2]
+    assert index.find("Pt") is PROXIES[2]
+    assert index.find("curvepoint") is PROXIES[3]
+    # The first proxy of a duplicated name wins
+    assert index.find("addition") is PROXIES[0]
+    assert index.find("Add") is PROXIES[4]
+    assert index.find("Missing") is None
+
+
+def test_proxies_without_description_are_skipped():
+    proxies = ProxyList([SimpleNamespace(Desc=None), Proxy("Addition", "A+B")])
+    index = bridge.ComponentIndex(proxies)
+    assert index.count == 2
+    assert len(index.records) == 1
+
+
+def test_exact_name_ranks_first(index):
+    results = index.search("additio")
+    assert names(results) == ["Addition", "Addition"]
+    exact = index.search("addition")
+    assert [record["nickname"] for record, score in exact] == ["A+B", "Add"]
+    assert exact[0][1] > results[0][1]
+
+
+def test_exact_nickname_beats_prefix(index):
+    assert names(index.search("pt"))[0] == "Construct Point"
+    assert names(index.search("constr"))[0] == "Construct Point"
+
+
+def test_fuzzy_names_and_descriptions(index):
+    # A typo still shares most trigrams with the name
+    assert names(index.search("subtracton"))[0] == "Subtraction"
+    assert names(index.search("evaluates"))[0] == "Point On Curve"
+
+
+def test_scores_are_sorted_and_limited(index):
+    results = index.search("point", limit=10)
+    scores = [score for record, score in results]
+    assert scores == sorted(scores, reverse=True)
+    assert set(names(results)) == {"Construct Point", "Point On Curve"}
+    assert len(index.search("point", limit=1)) == 1
+
+
+def test_empty_query(index):
+    assert index.search("") == []
+    assert index.search("   ") == []
+    assert index.search(None) == []
+
+
+def test_index_is_rebuilt_when_proxies_are_added(monkeypatch):
+    proxies = ProxyList(PROXIES[:2])
+    server = SimpleNamespace(ComponentServer=SimpleNamespace(ObjectProxies=proxies))
+    monkeypatch.setattr(bridge.Grasshopper, "Instances", server, raising=False)
+    monkeypatch.setattr(bridge, "_component_index", None)
+    index = bridge.get_component_index()
+    assert bridge.get_component_index() is index
+    proxies.append(Proxy("Division", "A/B"))
+    rebuilt = bridge.get_component_index()
+    assert rebuilt is not index
+    assert rebuilt.find("Division") is proxies[-1]
@@ -0,0 +1,96 @@
+"""Tests for the event-invalidated per-object info cache of the GH bridge"""
+from gh_fakes import Component, Document, EventArgs, Param, bridge, wire
+
+
+def make_chain():
+    slider = Param("Slider")
+    a = Component("A", ["x"], ["R"])
+    b = Component("B", ["y"], ["R"])
+    wire(slider, a.input("x"))
+    wire(a.output("R"), b.input("y"))
+    doc = Document(slider, a, b)
+    return doc, slider, a, b, bridge.GHContextCache(doc)
+
+
+def test_entries_are_reused_until_invalidated():
+    doc, slider, a, b, cache = make_chain()
+    first = cache.get(a)
+    assert cache.get(a) is first
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 1}
+    # Simplified and full info are cached separately
+    assert cache.get(a, simplified=True) is not first
+
+
+def test_object_change_drops_object_and_wired_neighbours():
+    doc, slider, a, b, cache = make_chain()
+    infos = dict((obj.Name, cache.get(obj)) for obj in (slider, a, b))
+    a.ObjectChanged.fire(a, EventArgs(Type="NickName"))
+    assert cache.get(a) is not infos["A"]
+    assert cache.get(slider) is not infos["Slider"]
+    assert cache.get(b) is not infos["B"]
+
+
+def test_unrelated_objects_stay_cached():
+    doc, slider, a, b, cache = make_chain()
+    lone = Component("Lone", ["x"], ["R"])
+    doc.Objects.append(lone)
+    info = cache.get(lone)
+    a.ObjectChanged.fire(a, EventArgs(Type="NickName"))
+    assert cache.get(lone) is info
+
+
+def test_expired_objects_are_dropped_when_the_solution_ends():
+    doc, slider, a, b, cache = make_chain()
+    info = cache.get(b)
+    b.SolutionExpired.fire(b)
+    during = cache.get(b)
+    assert during is not info
+    doc.SolutionEnd.fire(doc, EventArgs(Duration=None))
+    # Data counts and messages are final only after the solution, so the entry is rebuilt
+    assert cache.get(b) is not during
+
+
+def test_entry_built_during_an_invalidation_is_not_kept(monkeypatch):
+    doc, slider, a, b, cache = make_chain()
+    build = bridge.build_object_info
+
+    def build_while_changing(obj, simplified=False):
+        info = build(obj, simplified)
+        doc.add(Component("New", ["x"], ["R"]))
+        return info
+
+    monkeypatch.setattr(bridge, "build_object_info", build_while_changing)
+    cache.get(a)
+    assert cache.stats()["entries"] == 0
+
+
+def test_deleted_objects_are_unsubscribed():
+    doc, slider, a, b, cache = make_chain()
+    cache.get(b)
+    assert b.ObjectChanged.handlers
+    doc.delete(b)
+    assert not b.ObjectChanged.handlers
+    assert not b.SolutionExpired.handlers
+
+
+def test_detach_removes_every_handler():
+    doc, slider, a, b, cache = make_chain()
+    for obj in (slider, a, b):
+        cache.get(obj)
+    cache.detach()
+    assert not doc.ObjectsAdded.handlers and not doc.SolutionEnd.handlers
+    assert not any(obj.ObjectChanged.handlers for obj in (slider, a, b))
+    assert cache.stats()["entries"] == 0
+
+
+def test_get_context_cache_replaces_cache_of_another_document():
+    doc, slider, a, b, unused = make_chain()
+    unused.detach()
+    bridge.sc.sticky.pop(bridge.CONTEXT_CACHE_KEY, None)
+    cache = bridge.get_context_cache(doc)
+    assert bridge.get_context_cache(doc) is cache
+    other = Document()
+    replacement = bridge.get_context_cache(other)
+    assert replacement is not cache
+    assert not doc.SolutionEnd.handlers
+    replacement.detach()
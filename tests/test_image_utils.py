@@ -0,0 +1,88 @@
+"""Tests for fitting captured images into byte and token budgets"""
+import io
+
+import numpy as np
+import pytest
+from PIL import Image as PILImage
+
+from rhino_mcp.image_utils import MIN_QUALITY, MIN_SIDE, PIXELS_PER_TOKEN, encode_to_budget, estimate_tokens
+
+
+def make_png(width, height, noise=True, mode="RGB"):
+    rng = np.random.default_rng(0)
+    if noise:
+        pixels = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    else:
+        pixels = np.full((height, width, 3), 128, dtype=np.uint8)
+    buffer = io.BytesIO()
+    PILImage.fromarray(pixels, mode="RGB").convert(mode).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def decoded_size(data):
+    return PILImage.open(io.BytesIO(data)).size
+
+
+def test_estimate_tokens_rounds_up():
+    assert estimate_tokens(PIXELS_PER_TOKEN, 1) == 1
+    assert estimate_tokens(PIXELS_PER_TOKEN + 1, 1) == 2
+
+
+def test_without_budget_keeps_resolution():
+    data, meta = encode_to_budget(make_png(320, 200, mode="RGBA"))
+    assert decoded_size(data) == (320, 200)
+    assert meta["format"] == "jpeg"
+    assert meta["scale"] == 1.0
+    assert meta["fits_budget"] is True
+    assert meta["bytes"] == len(data)
+
+
+def test_token_budget_caps_resolution():
+    data, meta = encode_to_budget(make_png(800, 600, noise=False), max_tokens=100)
+    assert meta["estimated_tokens"] <= 100
+    assert decoded_size(data) == (meta["width"], meta["height"])
+    assert meta["width"] / float(meta["height"]) == pytest.approx(800 / 600.0, rel=0.02)
+    assert meta["fits_budget"] is True
+
+
+def test_byte_budget_lowers_quality_first():
+    source = make_png(256, 256)
+    unlimited, _ = encode_to_budget(source)
+    data, meta = encode_to_budget(source, max_bytes=int(len(unlimited) * 0.6))
+    assert len(data) <= int(len(unlimited) * 0.6)
+    assert (meta["width"], meta["height"]) == (256, 256)
+    assert MIN_QUALITY <= meta["quality"] < 85
+    assert meta["fits_budget"] is True
+
+
+def test_byte_budget_shrinks_when_quality_is_not_enough():
+    data, meta = encode_to_budget(make_png(1024, 768), max_bytes=20000)
+    assert len(data) <= 20000
+    assert meta["width"] < 1024
+    assert meta["fits_budget"] is True
+
+
+def test_impossible_budget_is_reported():
+    data, meta = encode_to_budget(make_png(512, 512), max_bytes=100)
+    assert meta["fits_budget"] is False
+    assert max(meta["width"], meta["height"]) == MIN_SIDE
+    assert meta["quality"] == MIN_QUALITY
+
+
+def test_min_side_overriding_token_budget_is_reported():
+    data, meta = encode_to_budget(make_png(512, 512, noise=False), max_tokens=1)
+    assert max(meta["width"], meta["height"]) == MIN_SIDE
+    assert meta["estimated_tokens"] > 1
+    assert meta["fits_budget"] is False
+
+
+def test_webp_and_format_aliases():
+    data, meta = encode_to_budget(make_png(64, 64), image_format="webp")
+    assert meta["format"] == "webp"
+    assert PILImage.open(io.BytesIO(data)).format == "WEBP"
+    assert encode_to_budget(make_png(64, 64), image_format="JPG")[1]["format"] == "jpeg"
+
+
+def test_unsupported_format_raises():
+    with pytest.raises(ValueError, match="Unsupported image format"):
+        encode_to_budget(make_png(32, 32), image_format="gif")
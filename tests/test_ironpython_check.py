@@ -0,0 +1,65 @@
+"""Tests for the local IronPython 2.7 compatibility check"""
+import pytest
+
+from rhino_mcp.ironpython_check import MAX_REPORTED_ISSUES, check_ironpython_code, ironpython_error
+
+
+def messages(code):
+    return [issue["message"] for issue in check_ironpython_code(code)]
+
+
+@pytest.mark.parametrize("code", [
+    "import rhinoscriptsyntax as rs\nresult = rs.AddPoint(0, 0, 0)",
+    "print 'hello'",
+    "exec 'x = 1'",
+    "x = '{0}'.format(1)",
+    "def f(a, b=1, *args, **kwargs):\n    return a\nresult = f(1, *[2], **{'c': 3})",
+    "from __future__ import print_function\nprint('a', end='')",
+    "x = a[...]\ny = a[..., 0]\nz = a[1:2, ...]",
+])
+def test_accepts_ironpython_code(code):
+    assert check_ironpython_code(code) == []
+    assert ironpython_error(code) is None
+
+
+@pytest.mark.parametrize("code, fragment", [
+    ("x = f'{a}'", "f-strings"),
+    ("if (n := 10) > 5: pass", "assignment expressions"),
+    ("def f() -> int:\n    return 1", "return type annotations"),
+    ("def f(a: int):\n    return a", "type hints"),
+    ("def f(*, a):\n    return a", "keyword-only"),
+    ("x: int = 1", "variable annotations"),
+    ("def f():\n    x = 1\n    def g():\n        nonlocal x", "nonlocal"),
+    ("raise ValueError() from None", "raise ... from"),
+    ("def g():\n    yield from range(3)", "yield from"),
+    ("a, *b = [1, 2, 3]", "extended unpacking"),
+    ("x = {**a}", "dict unpacking"),
+    ("class A(metaclass=M):\n    pass", "class keywords"),
+    ("f(*a, *b)", "one *args"),
+    ("print('a', end='')", "print_function"),
+    ("n = 1_000", "underscores"),
+    ("async def f():\n    pass", "async functions"),
+    ("def f(): ...", "..."),
+    ("x = ...", "..."),
+])
+def test_rejects_python3_syntax(code, fragment):
+    found = messages(code)
+    assert found, code
+    assert any(fragment in message for message in found), found
+
+
+def test_issue_positions_are_one_based():
+    issues = check_ironpython_code("x = 1\ny = f'{x}'")
+    assert issues == [{"line": 2, "col": 5, "message": issues[0]["message"]}]
+
+
+def test_python2_only_code_still_gets_token_checks():
+    # print statements do not parse as Python 3, so only tokens are checked
+    assert any("f-strings" in message for message in messages("print 'a'\nx = f'{a}'"))
+
+
+def test_error_names_target_and_caps_reported_issues():
+    code = "\n".join("x{0} = f'{{a}}'".format(i) for i in range(MAX_REPORTED_ISSUES + 3))
+    error = ironpython_error(code, "Grasshopper")
+    assert error.startswith("Error: Code is not IronPython 2.7 compatible (nothing was sent to Grasshopper)")
+    assert "... and 3 more" in error